@@ -5,23 +5,248 @@ import time
 import json
 import os
 import re
+import math
+import asyncio
+import base64
+import hashlib
+import hmac
+import secrets
+import urllib.parse
+import glob
+import collections
+import queue
+import select
+import array
+import bisect
+import functools
+import itertools
+import random
+import shlex
+import tempfile
+import resource
+import http.server
+from contextlib import contextmanager
+import shutil
+import wave
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QSlider, QPushButton, QLabel, QDialog, QComboBox, QLineEdit,
     QFrame, QGraphicsDropShadowEffect, QScrollArea, QSystemTrayIcon, QMenu
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QObject, QMimeData, QSize, QTimer, QEvent
-from PyQt6.QtGui import QDrag, QIcon, QColor, QAction
+from PyQt6.QtCore import Qt, pyqtSignal, QObject, QMimeData, QSize, QTimer, QEvent, QRect
+from PyQt6.QtGui import QDrag, QIcon, QColor, QAction, QPixmap, QImage, QPainter
 from pynput import keyboard
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 CONFIG_FILE = os.path.expanduser("~/.mux_config.json")
 
-AUDIO_SINKS = ["Game", "Chat", "Media"]
+DEFAULT_CHANNELS = [
+    {"name": "Game", "label": "Game", "color": "#8CFF6A"},
+    {"name": "Chat", "label": "Chat", "color": "#B693FF"},
+    {"name": "Media", "label": "Media", "color": "#FF6B6B"},
+]
+AUDIO_SINKS = [d["name"] for d in DEFAULT_CHANNELS]
+CHANNEL_PALETTE = ["#8CFF6A", "#B693FF", "#FF6B6B", "#5EE7FF", "#FF9F43", "#F368E0", "#48DBFB", "#1DD1A1"]
+CARD_WIDTH = 300
+CARD_SPACING = 20
+CARD_RADIUS = 18
+SHADOW_BLUR = 28
+SHADOW_OFFSET = 6
+SHADOW_ALPHA = 90
+# Room around the card row for the blur, shifted down by the offset
+SHADOW_MARGINS = (SHADOW_BLUR, SHADOW_BLUR - SHADOW_OFFSET, SHADOW_BLUR, SHADOW_BLUR + SHADOW_OFFSET)
+_SHADOW_TILES = {}
 STREAM_MIX_NAME = "Stream_Mix"
 MIC_DISPLAY_NAME = "Mux Mic"
 MIC_INTERNAL_ID = "Mux_Mic"
 INTERNAL_MIC_PROCESSING = "Internal_Mic_Processing"
 
+MIC_CHAIN_SINK = "Mux_Mic_Chain"
+MIC_CHAIN_CONF = os.path.expanduser("~/.mux_mic_chain.conf")
+EQ_CONF_PREFIX = os.path.expanduser("~/.mux_eq_")
+# Off for headless bench/load-test mixers, which must not pkill the user's
+# own mic chain and EQ processes on startup
+HOST_CLEANUP = True
+LADSPA_DIRS = ["/usr/lib/ladspa", "/usr/lib64/ladspa", "/usr/lib/x86_64-linux-gnu/ladspa", "/usr/local/lib/ladspa"]
+
+# Stages in processing order. "controls" maps config fields to plugin control
+# names, "fixed" is always sent, "bypass" overrides the controls of a disabled
+# stage so it can be switched off live without rebuilding the graph. A stage
+# with no true bypass ("bypass": None) is left out of the graph instead, and
+# toggling it rebuilds the chain.
+MIC_CHAIN_STAGES = [
+    {
+        "key": "highpass", "type": "builtin", "plugin": None, "label": "bq_highpass",
+        "ports": ("In", "Out"), "latency_ms": 0.0,
+        "controls": {"freq": "Freq"},
+        "fixed": {"Q": 0.707},
+        "bypass": {"Freq": 5.0},
+    },
+    {
+        "key": "gate", "type": "ladspa", "plugin": "gate_1410", "label": "gate",
+        "ports": ("Input", "Output"), "latency_ms": 0.0,
+        "controls": {"threshold": "Threshold (dB)", "attack": "Attack (ms)", "hold": "Hold (ms)", "decay": "Decay (ms)", "range": "Range (dB)"},
+        "fixed": {"Output select (-1 = key listen, 0 = gate, 1 = bypass)": 0.0},
+        "bypass": {"Output select (-1 = key listen, 0 = gate, 1 = bypass)": 1.0},
+    },
+    {
+        "key": "suppression", "type": "ladspa", "plugin": "librnnoise_ladspa", "label": "noise_suppressor_mono",
+        "ports": ("Input", "Output"), "latency_ms": 10.0,
+        "controls": {"vad_threshold": "VAD Threshold (%)", "grace_ms": "VAD Grace Period (ms)"},
+        "fixed": {},
+        # A VAD threshold of 0 only stops gating: RNNoise still denoises
+        # and still adds its latency
+        "bypass": None,
+    },
+    {
+        "key": "compressor", "type": "ladspa", "plugin": "sc4m_1916", "label": "sc4m",
+        "ports": ("Input", "Output"), "latency_ms": 0.0,
+        "controls": {"threshold": "Threshold level (dB)", "ratio": "Ratio (1:n)", "attack": "Attack time (ms)", "release": "Release time (ms)", "makeup": "Makeup gain (dB)"},
+        "fixed": {"RMS/peak": 0.0, "Knee radius (dB)": 3.25},
+        "bypass": {"Ratio (1:n)": 1.0, "Makeup gain (dB)": 0.0},
+    },
+]
+
+MIC_CHAIN_DEFAULTS = {
+    "enabled": False,
+    "highpass": {"enabled": True, "freq": 80},
+    "gate": {"enabled": True, "threshold": -50, "attack": 5, "hold": 120, "decay": 200, "range": -60},
+    "suppression": {"enabled": True, "vad_threshold": 50, "grace_ms": 200},
+    "compressor": {"enabled": True, "threshold": -18, "ratio": 3, "attack": 10, "release": 120, "makeup": 4},
+}
+
+# (stage, field, label, min, max) for the MIC FX dialog
+MIC_CHAIN_UI = [
+    ("highpass", "freq", "High-pass (Hz)", 20, 300),
+    ("gate", "threshold", "Gate threshold (dB)", -80, 0),
+    ("gate", "range", "Gate range (dB)", -90, 0),
+    ("suppression", "vad_threshold", "Voice threshold (%)", 0, 99),
+    ("compressor", "threshold", "Comp threshold (dB)", -40, 0),
+    ("compressor", "ratio", "Comp ratio (1:n)", 1, 20),
+    ("compressor", "makeup", "Makeup gain (dB)", 0, 24),
+]
+
+EQ_NODE_PREFIX = "Mux_EQ_"
+EQ_BAND_LABELS = {"lowshelf": "bq_lowshelf", "peaking": "bq_peaking", "highshelf": "bq_highshelf"}
+EQ_DEFAULT_BANDS = [
+    {"type": "lowshelf", "freq": 100, "q": 0.7, "gain": 0},
+    {"type": "peaking", "freq": 400, "q": 1.0, "gain": 0},
+    {"type": "peaking", "freq": 1500, "q": 1.0, "gain": 0},
+    {"type": "peaking", "freq": 4000, "q": 1.0, "gain": 0},
+    {"type": "highshelf", "freq": 10000, "q": 0.7, "gain": 0},
+]
+
+RAMP_DEFAULT_MS = 30
+RAMP_MAX_STEPS = 6
+
+DUCK_RATE = 16000
+DUCK_BLOCK_MS = 10
+DUCK_DEFAULTS = {
+    "enabled": False,
+    "triggers": ["Chat"],
+    "targets": ["Game", "Media"],
+    "amount_db": -12,
+    "threshold_db": -45,
+    "attack_ms": 20,
+    "release_ms": 400,
+    "duck_stream": False,
+}
+
+REC_RATE = 48000
+REC_CHANNELS = 2
+REC_FRAME_BYTES = REC_CHANNELS * 2
+REC_BLOCK_MS = 20
+REC_RING_SECONDS = 10
+REC_WRITE_BYTES = 1 << 20
+REC_START_TIMEOUT = 2.0
+REC_DEFAULTS = {
+    "tracks": ["Stream"],
+    "format": "wav",
+    "dir": "~/Recordings",
+    "hotkey": "",
+}
+REPLAY_BLOCK_MS = 100
+REPLAY_DEFAULTS = {
+    "enabled": False,
+    "source": "Stream",
+    "seconds": 60,
+    "hotkey": "",
+}
+
+HOTPLUG_DEBOUNCE_MS = 40
+
+MIDI_DEVICE_GLOB = "/dev/snd/midiC*D*"
+MIDI_DISPATCH_MS = 10
+MIDI_ECHO_MS = 250
+MIDI_CONTINUOUS = ("volume", "stream_volume")
+MIDI_DEFAULTS = {
+    "enabled": False,
+    "device": "",
+    "map": {},
+}
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_MAX_MESSAGE = 1 << 16
+REMOTE_FLUSH_MS = 30
+REMOTE_LEVELS_MS = 100
+REMOTE_QUEUE = 32
+REMOTE_FIELDS = ("volume", "stream_volume", "muted", "stream_muted", "apps")
+REMOTE_DEFAULTS = {
+    "enabled": False,
+    "host": "127.0.0.1",
+    "port": 8765,
+    "token": "",
+}
+
+OBS_RPC_VERSION = 1
+OBS_EVENT_SCENES = 1 << 2
+OBS_RECONNECT_MAX_S = 10
+OBS_SOURCE_NAME = "Mux Stream Mix"
+OBS_DEFAULTS = {
+    "enabled": False,
+    "host": "127.0.0.1",
+    "port": 4455,
+    "password": "",
+    "stream_source": True,
+    "scene_map": {},
+}
+
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+METRICS_DEFAULTS = {
+    "enabled": False,
+    "mode": "http",
+    "host": "127.0.0.1",
+    "port": 9787,
+    "textfile": "~/.mux_metrics.prom",
+    "interval": 15,
+}
+
+TRACE_BUFFER_EVENTS = 200000
+TRACE_HOTKEY = "<ctrl>+<alt>+<shift>+t"
+TRACER = None
+
+ICON_SIZE = 20
+ICON_CACHE_SIZE = 256
+ICON_PROPS = ("pipewire.access.portal.app_id", "application.id", "application.process.binary", "application.name")
+ICON_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "mux_icons")
+# Last resort for streams that neither name an icon nor match a desktop file
+ICON_GUESSES = (
+    ("brave", "brave-browser"),
+    ("discord", "discord"),
+    ("firefox", "firefox"),
+    ("chrome", "google-chrome"),
+    ("spotify", "spotify-client"),
+)
+
+SYNC_CLASSES = ("sink", "source", "sink-input")
+SYNC_FAST_MS = 100
+SYNC_SLOW_MS = 4000
+SYNC_IDLE_MS = 30000
+
 THEME = {
     "Bg": "#0F1117",
     "Card": "#171A23",
@@ -35,9 +260,2702 @@ THEME = {
     "Muted": "#FF6B6B",
     "Stroke": "#2A3040"
 }
+# UI colours in THEME; channel colours are stored next to them by name, so
+# a channel may not take one of these names
+THEME_KEYS = ("Bg", "Card", "CardAlt", "Accent", "Text", "Muted", "Stroke")
+
+def load_channel_defs():
+    # Sink channels come from the "channels" list in the config; names double
+    # as sink names and Link_* suffixes, so they are reduced to [A-Za-z0-9].
+    raw = None
+    if os.path.exists(CONFIG_FILE):
+        try:
+            with open(CONFIG_FILE, 'r') as f:
+                raw = json.load(f).get("channels")
+        except:
+            raw = None
+    if not isinstance(raw, list) or not raw:
+        raw = DEFAULT_CHANNELS
+    defs = []
+    seen = set()
+    for i, entry in enumerate(raw):
+        if isinstance(entry, str):
+            entry = {"label": entry}
+        if not isinstance(entry, dict):
+            continue
+        label = str(entry.get("label") or entry.get("name") or "").strip()
+        name = re.sub(r"[^A-Za-z0-9]", "", str(entry.get("name") or label))
+        if not name or name in seen or name == "Mic":
+            continue
+        if name in THEME_KEYS:
+            print(f"Channel {name!r} skipped: the name is reserved for a theme colour")
+            continue
+        seen.add(name)
+        color = entry.get("color") or THEME.get(name) or CHANNEL_PALETTE[i % len(CHANNEL_PALETTE)]
+        defs.append({"name": name, "label": label or name, "color": color})
+    return defs or [dict(d) for d in DEFAULT_CHANNELS]
+
+def _tone_colors(buses=()):
+    # Every colour a card can be drawn in, keyed by the "tone" property:
+    # THEME entries (channels, Accent, Mic) plus "bus-<name>" per mix bus.
+    tones = {k: v for k, v in THEME.items() if k not in THEME_KEYS or k == "Accent"}
+    for bus in buses:
+        tones[f"bus-{bus['name']}"] = bus.get("color") or THEME['Accent']
+    return tones
+
+def compile_stylesheet(buses=()):
+    # The whole look as one sheet, parsed once. Widgets pick rules up by
+    # object name; colours and states are dynamic properties (tone, muted,
+    # selected, lit) so changing them never re-parses anything.
+    tones = _tone_colors(buses)
+    rules = [f"""
+        * {{ background-color: {THEME['Bg']}; font-family: 'Segoe UI', Sans-Serif; }}
+        QPushButton#TopButton {{
+            background: {THEME['CardAlt']}; color: {THEME['Text']}; font-weight: 800;
+            padding: 10px 18px; border-radius: 12px; border: none; font-size: 12px;
+        }}
+        QPushButton#TopButton[lit="accent"] {{ background: {THEME['Accent']}; color: #0B0C10; }}
+        QPushButton#TopButton[lit="mic"] {{ background: {THEME['Mic']}; color: #0B0C10; }}
+        QPushButton#TopButton[lit="rec"] {{ background: {THEME['Muted']}; color: white; }}
+        QScrollArea#MixerScroll {{ background: transparent; border: none; }}
+        QMenu {{ background: {THEME['Card']}; color: {THEME['Text']}; border: 1px solid {THEME['Stroke']}; }}
+        QMenu::item:selected {{ background: #262B3B; }}
+        QDialog#Panel, QDialog#Panel QWidget {{ background: {THEME['Card']}; color: white; border-radius: 12px; }}
+        QDialog#Panel QPushButton#ToggleButton {{
+            background: {THEME['CardAlt']}; color: {THEME['Text']}; font-weight: 800;
+            padding: 6px 12px; border-radius: 8px; border: 1px solid {THEME['Stroke']};
+        }}
+        QDialog#Panel QPushButton#ToggleButton[lit="rec"] {{ background: {THEME['Muted']}; color: white; border: none; }}
+        QFrame#ChannelCard {{ background: {THEME['Card']}; border-radius: {CARD_RADIUS}px; border: none; }}
+        QFrame#CardStrip {{ background: #1C2030; border-radius: 12px; }}
+        QFrame#SliderWrap {{ background: {THEME['CardAlt']}; border: none; border-radius: 18px; }}
+        QFrame#AppsContainer {{ background: rgba(255,255,255,0.04); border-radius: 10px; border: none; }}
+        QLabel#ChannelName {{ font-weight: 900; font-size: 18px; letter-spacing: 1px; border: none; background: transparent; }}
+        QLabel#ColumnLabel {{ color: {THEME['Text']}; font-size: 11px; font-weight: 700; border: none; background: transparent; }}
+        QLabel#NoApps {{ color: #4E5566; font-size: 10px; font-weight: bold; border: none; background: transparent; }}
+        QPushButton#RoundButton {{
+            background: {THEME['CardAlt']}; color: {THEME['Text']}; font-weight: 800; font-size: 11px;
+            border: 2px solid rgba(255,255,255,0.12); border-radius: 22px;
+        }}
+        QPushButton#RoundButton:hover {{ background: #262B3B; border: 2px solid {THEME['Accent']}; }}
+        QScrollArea#AppsScroll {{ background: transparent; border: none; }}
+        QScrollArea#AppsScroll QScrollBar:vertical {{ border: none; background: transparent; width: 6px; margin: 0px; border-radius: 3px; }}
+        QScrollArea#AppsScroll QScrollBar::handle:vertical {{ background: #1c2030; min-height: 20px; border-radius: 3px; }}
+        QScrollArea#AppsScroll QScrollBar::add-line:vertical, QScrollArea#AppsScroll QScrollBar::sub-line:vertical {{ height: 0px; background: none; }}
+        QScrollArea#AppsScroll QScrollBar::add-page:vertical, QScrollArea#AppsScroll QScrollBar::sub-page:vertical {{ background: none; }}
+        QSlider#Fader::groove:vertical {{
+            background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #272B3A, stop:1 #171A24);
+            width: 14px; border-radius: 7px; border: 1px solid rgba(255,255,255,0.08);
+        }}
+        QSlider#Fader::sub-page:vertical {{
+            background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #1E2230, stop:1 #141724);
+            border-radius: 7px;
+        }}
+        QSlider#Fader::handle:vertical {{
+            background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #FFFFFF, stop:1 #D3D7E4);
+            height: 30px; width: 30px; margin: 0 -8px; border-radius: 15px; border: 2px solid rgba(0,0,0,0.25);
+        }}
+        QPushButton#MuteButton {{ background: {THEME['CardAlt']}; border: 2px solid {THEME['Accent']}; border-radius: 22px; }}
+        QPushButton#MuteButton:hover {{ background: #262B3B; }}
+        QFrame#AppLabel {{ background: {THEME['CardAlt']}; border: 1px solid {THEME['Stroke']}; border-radius: 8px; }}
+        QFrame#AppLabel:hover {{ background: #262B3B; border: 1px solid {THEME['Accent']}; }}
+        QFrame#AppLabel[selected="true"] {{ background: #262B3B; border: 2px solid {THEME['Accent']}; }}
+        QFrame#AppLabel QLabel {{ color: {THEME['Text']}; font-size: 11px; font-weight: 600; border: none; background: transparent; }}
+    """]
+    for tone, color in tones.items():
+        rules.append(f"""
+        QLabel#ChannelName[tone="{tone}"] {{ color: {color}; }}
+        QSlider#Fader[tone="{tone}"]::add-page:vertical {{
+            background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 {color}, stop:1 rgba(255,255,255,0.2));
+            width: 14px; border-radius: 7px;
+        }}
+        QSlider#Fader[tone="{tone}"]::handle:vertical:hover {{ background: {color}; border: 2px solid rgba(255,255,255,0.9); }}
+        QPushButton#MuteButton[tone="{tone}"] {{ border: 2px solid {color}; }}
+        QDialog#Panel QPushButton#ToggleButton[lit="{tone}"] {{ background: {color}; color: #0B0C10; border: none; }}
+        """)
+    # After the tone rules so a muted button loses its channel border
+    rules.append(f"""
+        QPushButton#MuteButton[muted="true"] {{ background: {THEME['Muted']}; border: 2px solid rgba(255,255,255,0.75); }}
+        QPushButton#MuteButton[muted="true"]:hover {{ background: {THEME['Muted']}; border: 2px solid rgba(255,255,255,0.85); }}
+    """)
+    return "".join(rules)
+
+def set_toggle(btn, on, tone="Accent"):
+    # Dialog on/off buttons: drawn by the compiled sheet, lit in their tone
+    btn.setObjectName("ToggleButton")
+    set_style_state(btn, "lit", tone if on else "")
+
+def set_style_state(widget, name, value):
+    # A state change against the compiled sheet: flip the property and
+    # re-polish this one widget, only when the value actually moved. The
+    # style sheet style drops the widget's cached rules in polish(), so no
+    # unpolish() round trip is needed.
+    if widget.property(name) == value:
+        return
+    widget.setProperty(name, value)
+    widget.style().polish(widget)
+
+def _first_percent(line):
+    match = re.search(r"(\d+)%", line)
+    return int(match.group(1)) if match else None
+
+def parse_sinks(text):
+    sinks = []
+    current = None
+    for line in text.split('\n'):
+        stripped = line.strip()
+        if line.startswith("Sink #"):
+            current = {"index": line[6:].strip(), "name": "", "description": "", "volume": None, "muted": None}
+            sinks.append(current)
+        elif current is None:
+            continue
+        elif stripped.startswith("Name:"):
+            current["name"] = stripped.split(":", 1)[1].strip()
+        elif stripped.startswith("Description:"):
+            current["description"] = stripped.split(":", 1)[1].strip()
+        elif stripped.startswith("Mute:"):
+            current["muted"] = "yes" in stripped.lower()
+        elif stripped.startswith("Volume:") and current["volume"] is None:
+            current["volume"] = _first_percent(stripped)
+    return sinks
+
+def parse_sink_inputs(text):
+    inputs = []
+    for block in text.split("Sink Input #"):
+        if not block.strip():
+            continue
+        id_match = re.match(r"(\d+)", block.strip())
+        if not id_match:
+            continue
+        entry = {"id": id_match.group(1), "sink": None, "owner_module": None, "volume": None, "muted": None, "props": {}}
+        for line in block.split('\n'):
+            stripped = line.strip()
+            if stripped.startswith("Sink:"):
+                entry["sink"] = stripped.split(":", 1)[1].strip()
+            elif stripped.startswith("Owner Module:"):
+                entry["owner_module"] = stripped.split(":", 1)[1].strip()
+            elif stripped.startswith("Mute:"):
+                entry["muted"] = "yes" in stripped.lower()
+            elif stripped.startswith("Volume:") and entry["volume"] is None:
+                entry["volume"] = _first_percent(stripped)
+            else:
+                prop = re.match(r'([\w.]+) = "(.*)"$', stripped)
+                if prop:
+                    entry["props"][prop.group(1)] = prop.group(2)
+        inputs.append(entry)
+    return inputs
+
+def app_identity(props):
+    # Streams of one application share a key across restarts: the binary name
+    # when the client reports it, otherwise its id or display name.
+    for key in ("application.process.binary", "application.id", "application.name"):
+        value = props.get(key, "").strip().lower()
+        if value:
+            value = re.sub(r"\.exe$", "", value)
+            return re.sub(r"\s+", " ", value)
+    return ""
+
+class PactlBackend:
+    # Talks to the real server through the pactl CLI. run() raises on a
+    # non-zero exit, like check_output.
+    def run(self, cmd):
+        return subprocess.check_output(cmd, shell=True, stderr=subprocess.DEVNULL).decode().strip()
+
+    def events(self):
+        proc = subprocess.Popen(["pactl", "subscribe"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        return proc.stdout
+
+class FakeAudioServer:
+    # In-process stand-in for pactl: sinks, sources, modules and sink-inputs
+    # kept in dicts and answered in pactl's own text formats, so the real
+    # parsers run against it. latency_ms is added to every command; commands
+    # containing one of `faults`, or losing a fault_rate draw, fail the way a
+    # non-zero pactl exit does.
+    def __init__(self, latency_ms=0, fault_rate=0.0, faults=(), seed=0):
+        self.latency_ms = latency_ms
+        self.fault_rate = fault_rate
+        self.faults = list(faults)
+        self.random = random.Random(seed)
+        self.lock = threading.RLock()
+        self.counters = {"sink": 0, "source": 0, "module": 0, "sink-input": 0}
+        self.sinks = {}
+        self.sources = {}
+        self.modules = {}
+        self.inputs = {}
+        self.default_sink = None
+        self.default_source = None
+        self.commands = 0
+        self.subscribers = []
+        self.add_sink("alsa_output.fake", "Fake Speakers")
+        self.add_source("alsa_input.fake", "Fake Microphone")
+
+    def _next(self, kind):
+        index = self.counters[kind]
+        self.counters[kind] += 1
+        return index
+
+    def _emit(self, event, kind, index):
+        line = f"Event '{event}' on {kind} #{index}\n"
+        for q in self.subscribers:
+            q.put(line)
+
+    def events(self):
+        q = queue.Queue()
+        with self.lock:
+            self.subscribers.append(q)
+        def lines():
+            while True:
+                line = q.get()
+                if line is None:
+                    return
+                yield line
+        return lines()
+
+    def close(self):
+        with self.lock:
+            for q in self.subscribers:
+                q.put(None)
+            self.subscribers = []
+
+    def add_sink(self, name, description, module=None):
+        with self.lock:
+            index = self._next("sink")
+            self.sinks[index] = {"name": name, "description": description, "volume": 100, "muted": False, "module": module}
+            if self.default_sink is None:
+                self.default_sink = name
+            self._emit("new", "sink", index)
+            self.add_source(f"{name}.monitor", f"Monitor of {description}", module)
+            return index
+
+    def add_source(self, name, description, module=None):
+        with self.lock:
+            index = self._next("source")
+            self.sources[index] = {"name": name, "description": description, "volume": 100, "muted": False, "module": module}
+            if self.default_source is None and not name.endswith(".monitor"):
+                self.default_source = name
+            self._emit("new", "source", index)
+            return index
+
+    def add_stream(self, app_name, sink=None, props=None, module=None):
+        # A synthetic application stream; returns its sink-input id
+        with self.lock:
+            index = self._next("sink-input")
+            stream_props = {"media.name": "Playback", "application.name": app_name, "application.process.binary": app_name.lower().replace(" ", "-")}
+            stream_props.update(props or {})
+            self.inputs[index] = {"sink": self._sink_index(sink or self.default_sink), "volume": 100, "muted": False, "module": module, "props": stream_props}
+            self._emit("new", "sink-input", index)
+            return str(index)
+
+    def remove_stream(self, stream_id):
+        with self.lock:
+            if self.inputs.pop(int(stream_id), None) is not None:
+                self._emit("remove", "sink-input", int(stream_id))
+
+    def _sink_index(self, ref):
+        if str(ref).isdigit() and int(ref) in self.sinks:
+            return int(ref)
+        for index, sink in self.sinks.items():
+            if sink["name"] == ref:
+                return index
+        raise KeyError(ref)
+
+    def _source_index(self, ref):
+        if str(ref).isdigit() and int(ref) in self.sources:
+            return int(ref)
+        for index, source in self.sources.items():
+            if source["name"] == ref:
+                return index
+        raise KeyError(ref)
+
+    def run(self, cmd):
+        # The volume writer sends " ; "-joined batches; like a shell, every
+        # command runs and the batch fails if the last one did.
+        outputs = []
+        failed = False
+        for part in cmd.split(" ; "):
+            try:
+                outputs.append(self._run_one(part.strip()))
+                failed = False
+            except (KeyError, ValueError, IndexError):
+                failed = True
+        if failed:
+            raise subprocess.CalledProcessError(1, cmd)
+        return "\n".join(out for out in outputs if out).strip()
+
+    def _run_one(self, cmd):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        with self.lock:
+            self.commands += 1
+            if any(fault in cmd for fault in self.faults) or (self.fault_rate and self.random.random() < self.fault_rate):
+                raise ValueError("injected fault")
+            args = shlex.split(cmd)
+            if len(args) < 2 or args[0] != "pactl":
+                return ""  # pkill and friends have nothing to act on here
+            verb, rest = args[1], args[2:]
+            if verb == "list":
+                return self._list(rest)
+            if verb == "load-module":
+                return self._load(rest[0], dict(arg.split("=", 1) for arg in rest[1:] if "=" in arg))
+            if verb == "unload-module":
+                self._unload(int(rest[0]))
+                return ""
+            if verb == "move-sink-input":
+                index = int(rest[0])
+                self.inputs[index]["sink"] = self._sink_index(rest[1])
+                self._emit("change", "sink-input", index)
+                return ""
+            if verb == "set-default-sink":
+                self.default_sink = self.sinks[self._sink_index(rest[0])]["name"]
+                return ""
+            if verb == "set-default-source":
+                self.default_source = self.sources[self._source_index(rest[0])]["name"]
+                return ""
+            match = re.match(r"(get|set)-(sink-input|sink|source)-(volume|mute)$", verb)
+            if not match:
+                raise ValueError(f"unsupported command: {verb}")
+            action, kind, field = match.groups()
+            if kind == "sink-input":
+                index, obj = int(rest[0]), self.inputs[int(rest[0])]
+            elif kind == "sink":
+                index = self._sink_index(rest[0])
+                obj = self.sinks[index]
+            else:
+                index = self._source_index(rest[0])
+                obj = self.sources[index]
+            if action == "get":
+                return self._volume_text(obj["volume"]) if field == "volume" else f"Mute: {'yes' if obj['muted'] else 'no'}"
+            value = rest[1]
+            if field == "volume":
+                obj["volume"] = int(value[:-1]) if value.endswith("%") else round(int(value) * 100 / 65536)
+            else:
+                obj["muted"] = not obj["muted"] if value == "toggle" else value in ("1", "yes", "true")
+            self._emit("change", kind, index)
+            return ""
+
+    def _volume_text(self, volume):
+        raw = round(volume * 65536 / 100)
+        return f"Volume: front-left: {raw} / {volume}% / 0.00 dB,   front-right: {raw} / {volume}% / 0.00 dB"
+
+    def _list(self, rest):
+        short = rest[:1] == ["short"]
+        kind = rest[-1]
+        if kind == "modules":
+            return "\n".join(f"{i}\t{name}\t{' '.join(f'{k}={v}' for k, v in args.items())}" for i, (name, args) in self.modules.items())
+        if kind in ("sinks", "sources"):
+            objects = self.sinks if kind == "sinks" else self.sources
+            if short:
+                return "\n".join(f"{i}\t{o['name']}\tmodule-null-sink.c\ts16le 2ch 48000Hz\tRUNNING" for i, o in objects.items())
+            title = "Sink" if kind == "sinks" else "Source"
+            return "\n".join(
+                f"{title} #{i}\n\tState: RUNNING\n\tName: {o['name']}\n\tDescription: {o['description']}\n"
+                f"\tOwner Module: {o['module'] if o['module'] is not None else 'n/a'}\n\tMute: {'yes' if o['muted'] else 'no'}\n\t{self._volume_text(o['volume'])}\n"
+                for i, o in objects.items())
+        if kind == "sink-inputs":
+            if short:
+                return "\n".join(f"{i}\t{s['sink']}\t-\tprotocol-native.c\ts16le 2ch 48000Hz" for i, s in self.inputs.items())
+            blocks = []
+            for i, s in self.inputs.items():
+                props = "".join(f'\t\t{k} = "{v}"\n' for k, v in s["props"].items())
+                blocks.append(
+                    f"Sink Input #{i}\n\tOwner Module: {s['module'] if s['module'] is not None else 'n/a'}\n\tSink: {s['sink']}\n"
+                    f"\tMute: {'yes' if s['muted'] else 'no'}\n\t{self._volume_text(s['volume'])}\n\tProperties:\n{props}")
+            return "\n".join(blocks)
+        raise ValueError(f"unsupported listing: {kind}")
+
+    def _load(self, name, args):
+        def prop(text, key):
+            match = re.search(key + r"='([^']*)'", text or "")
+            return match.group(1) if match else None
+        # Validate before the module exists, so a failed load leaves nothing behind
+        if name == "module-loopback":
+            source = self._source_index(args["source"])
+            sink = self._sink_index(args["sink"])
+        elif name == "module-remap-source":
+            self._source_index(args["master"])
+        module = self._next("module")
+        self.modules[module] = (name, args)
+        self._emit("new", "module", module)
+        if name == "module-null-sink":
+            sink_name = args.get("sink_name", f"null{module}")
+            self.add_sink(sink_name, prop(args.get("sink_properties"), "device.description") or sink_name, module)
+        elif name == "module-remap-source":
+            source_name = args.get("source_name", f"remap{module}")
+            self.add_source(source_name, prop(args.get("source_properties"), "device.description") or source_name, module)
+        elif name == "module-loopback":
+            props = dict(p.split("=", 1) for p in args.get("sink_input_properties", "").split() if "=" in p)
+            props.setdefault("media.name", f"Loopback from {self.sources[source]['description']}")
+            index = self._next("sink-input")
+            self.inputs[index] = {"sink": sink, "volume": 100, "muted": False, "module": module, "props": props}
+            self._emit("new", "sink-input", index)
+        return str(module)
+
+    def _unload(self, module):
+        del self.modules[module]
+        for kind, objects in (("sink-input", self.inputs), ("sink", self.sinks), ("source", self.sources)):
+            for index in [i for i, o in objects.items() if o["module"] == module]:
+                del objects[index]
+                self._emit("remove", kind, index)
+        # Streams on a removed sink fall back to the default one
+        fallback = next((i for i, s in self.sinks.items() if s["name"] == self.default_sink), next(iter(self.sinks), None))
+        for index, stream in self.inputs.items():
+            if stream["sink"] not in self.sinks:
+                stream["sink"] = fallback
+                self._emit("change", "sink-input", index)
+        self._emit("remove", "module", module)
+        # A loopback whose ends went away unloads itself
+        names = {s["name"] for s in self.sinks.values()} | {s["name"] for s in self.sources.values()}
+        for index, (name, args) in list(self.modules.items()):
+            if index in self.modules and name == "module-loopback" and (args.get("source") not in names or args.get("sink") not in names):
+                self._unload(index)
+
+def desktop_dirs():
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    data_dirs = (os.environ.get("XDG_DATA_DIRS") or "/usr/local/share:/usr/share").split(":")
+    roots = [data_home, os.path.join(data_home, "flatpak/exports/share")] + data_dirs + ["/var/lib/flatpak/exports/share", "/var/lib/snapd/desktop"]
+    dirs = []
+    for root in roots:
+        path = os.path.join(root, "applications")
+        if root and path not in dirs:
+            dirs.append(path)
+    return dirs
+
+def parse_desktop_file(path):
+    entry = {}
+    in_main = False
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("["):
+                    in_main = line == "[Desktop Entry]"
+                elif in_main and "=" in line:
+                    key, value = line.split("=", 1)
+                    entry.setdefault(key.strip(), value.strip())
+    except OSError:
+        pass
+    return entry
+
+class IconResolver:
+    # Stream -> icon name, and icon name -> rendered 20x20 pixmap. A stream
+    # that names its icon is taken at its word; otherwise the .desktop files
+    # (desktop id, StartupWMClass, Exec binary) are indexed once on a worker
+    # thread and each app identity is resolved there, once. Both maps persist
+    # under ICON_CACHE_DIR, so a restart neither scans nor renders again
+    # until the desktop files or the icon theme change.
+    def __init__(self, on_resolved=None, cache_dir=None):
+        self.on_resolved = on_resolved
+        self.cache_dir = cache_dir or ICON_CACHE_DIR
+        self.names = {}
+        self.pixmaps = collections.OrderedDict()
+        self.pending = queue.Queue()
+        self.queued = set()
+        self.desktop = None
+        self.thread = None
+        self.stamp = self._dirs_stamp()
+        self._load_index()
+
+    def _dirs_stamp(self):
+        # A directory's mtime moves whenever a file is added or removed
+        stamps = []
+        for path in desktop_dirs():
+            try:
+                stamps.append(f"{path}:{os.stat(path).st_mtime_ns}")
+            except OSError:
+                pass
+        return "|".join(stamps)
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.cache_dir, "index.json")) as f:
+                data = json.load(f)
+            if data.get("stamp") == self.stamp and isinstance(data.get("names"), dict):
+                self.names = {str(k): str(v) for k, v in data["names"].items()}
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def _save_index(self):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = os.path.join(self.cache_dir, "index.json.tmp")
+            with open(tmp, "w") as f:
+                json.dump({"stamp": self.stamp, "names": dict(self.names)}, f)
+            os.replace(tmp, os.path.join(self.cache_dir, "index.json"))
+        except OSError:
+            pass
+
+    def _identity(self, props):
+        # Everything _resolve looks at: electron apps share a binary, and
+        # many streams share a generic name
+        return "|".join(props.get(key, "").strip().lower() for key in ICON_PROPS)
+
+    def _guess(self, app_name):
+        lowered = app_name.lower()
+        for needle, icon_name in ICON_GUESSES:
+            if needle in lowered:
+                return icon_name
+        return "audio-card"
+
+    def icon_for(self, props):
+        # Cheap enough for every sync: a dict lookup, or the old guess while
+        # the worker looks the app up.
+        explicit = props.get("application.icon_name")
+        if explicit:
+            return explicit
+        identity = self._identity(props)
+        name = self.names.get(identity)
+        if name is None and identity.strip("|") and identity not in self.queued:
+            self.queued.add(identity)
+            self.pending.put((identity, dict(props)))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+        return name or self._guess(props.get("application.name", ""))
+
+    def _run(self):
+        self.desktop = self._scan_desktop_files()
+        while True:
+            identity, props = self.pending.get()
+            self.names[identity] = self._resolve(props)
+            if self.pending.empty():
+                self._save_index()
+                if self.on_resolved:
+                    self.on_resolved()
+
+    def _scan_desktop_files(self):
+        # Earlier directories win, so user entries override system ones
+        index = {}
+        for path in desktop_dirs():
+            try:
+                files = sorted(e.path for e in os.scandir(path) if e.name.endswith(".desktop"))
+            except OSError:
+                continue
+            for file_path in files:
+                entry = parse_desktop_file(file_path)
+                icon_name = entry.get("Icon")
+                if not icon_name:
+                    continue
+                desktop_id = os.path.basename(file_path)[:-len(".desktop")].lower()
+                keys = [desktop_id, desktop_id.rsplit(".", 1)[-1], entry.get("StartupWMClass", "").lower()]
+                exec_line = entry.get("Exec", "").split()
+                if exec_line and exec_line[0] not in ("env", "flatpak", "sh", "bash"):
+                    keys.append(os.path.basename(exec_line[0]).lower())
+                for key in keys:
+                    if key:
+                        index.setdefault(key, icon_name)
+        return index
+
+    def _resolve(self, props):
+        for key in ICON_PROPS:
+            value = props.get(key, "").strip().lower()
+            value = re.sub(r"\.exe$", "", value)
+            if value and value in self.desktop:
+                return self.desktop[value]
+        return ""
+
+    def pixmap(self, icon_name):
+        # GUI thread only. Memory LRU first, then a PNG rendered on an
+        # earlier run, and only then the icon theme.
+        pix = self.pixmaps.get(icon_name)
+        if pix is not None:
+            self.pixmaps.move_to_end(icon_name)
+            return pix
+        digest = hashlib.sha1(f"{QIcon.themeName()}:{ICON_SIZE}:{icon_name}".encode()).hexdigest()
+        path = os.path.join(self.cache_dir, digest + ".png")
+        pix = QPixmap(path) if os.path.exists(path) else QPixmap()
+        if pix.isNull():
+            icon = QIcon(icon_name) if os.path.isabs(icon_name) else QIcon.fromTheme(icon_name)
+            if icon.isNull():
+                icon = QIcon.fromTheme("audio-card")
+            pix = icon.pixmap(QSize(ICON_SIZE, ICON_SIZE))
+            if not pix.isNull():
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    pix.save(path, "PNG")
+                except OSError:
+                    pass
+        self.pixmaps[icon_name] = pix
+        if len(self.pixmaps) > ICON_CACHE_SIZE:
+            self.pixmaps.popitem(last=False)
+        return pix
+
+def bench_channels(counts=(4, 8, 16, 32), apps_per_channel=3, ticks=50):
+    # Sync cost: MuxHome.sync_once with every class due, over FakeAudioServer
+    # with N channels (store batch, loopback ids, stream placement, icons
+    # and per-channel store updates included). Render cost: N cards getting
+    # new state every tick plus an app list rebuild every tenth tick,
+    # painted synchronously.
+    print(f"{'channels':>8} {'sync_once':>10} {'render/tick':>12}")
+    for count in counts:
+        server = FakeAudioServer()
+        channels = [{"name": f"Ch{i}", "label": f"Ch{i}"} for i in range(count)]
+        app, win = _headless_mixer(server, "alsa_output.fake", "alsa_input.fake", channels=channels)
+        win.sync_timer.stop()
+        for i in range(count):
+            for a in range(apps_per_channel):
+                server.add_stream(f"App {a}", f"Ch{i}")
+        win.sync_once()
+        started = time.perf_counter()
+        for _ in range(ticks):
+            win.sync_once()
+        sync_ms = (time.perf_counter() - started) * 1000 / ticks
+
+        cards = [win.widgets[f"Ch{i}"] for i in range(count)]
+        mapping = win.fetch_app_mapping()
+        started = time.perf_counter()
+        for tick in range(ticks):
+            for i, card in enumerate(cards):
+                card.update_state((tick + i) % 100, 50, tick % 2 == 0, False)
+                if tick % 10 == 0:
+                    card.update_apps_list(mapping.get(f"Ch{i}", []))
+            win.repaint()
+            app.processEvents()
+        render_ms = (time.perf_counter() - started) * 1000 / ticks
+        win.shutdown()
+        server.close()
+        win.deleteLater()
+        app.processEvents()
+        print(f"{count:>8} {sync_ms:>8.2f}ms {render_ms:>10.2f}ms")
+
+def _legacy_mute_sheet(muted, border_color):
+    # The per-button sheet mute buttons used to get on every update_state
+    if muted:
+        return f"QPushButton {{ background: {THEME['Muted']}; border: 2px solid rgba(255,255,255,0.75); border-radius: 22px; }} QPushButton:hover {{ background: {THEME['Muted']}; border: 2px solid rgba(255,255,255,0.85); }}"
+    return f"QPushButton {{ background: {THEME['CardAlt']}; border: 2px solid {border_color}; border-radius: 22px; }} QPushButton:hover {{ background: #262B3B; border: 2px solid {border_color}; }}"
+
+def bench_style(counts=(4, 16, 64), ticks=50):
+    # Style recalculation for N cards' worth of mute buttons and app labels,
+    # a fresh per-widget sheet each time (the old way) against property
+    # flips on the compiled application sheet. Every tick re-applies the
+    # state of every widget, as a sync does; "all" changes every widget on
+    # every tick, "one" changes a single card. When everything changes the
+    # two cost about the same; the flips win by skipping unchanged widgets.
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication.instance() or QApplication(sys.argv)
+    started = time.perf_counter()
+    sheet = compile_stylesheet()
+    app.setStyleSheet(sheet)
+    app.processEvents()
+    print(f"compiled sheet: {len(sheet)} chars, applied in {(time.perf_counter() - started) * 1000:.2f}ms")
+    print(f"{'widgets':>8} {'changing':>8} {'setStyleSheet/tick':>19} {'property flip/tick':>19}")
+    for count, changing in itertools.product(counts, ("all", "one")):
+        results = []
+        for flip in (False, True):
+            host = QWidget()
+            row = QHBoxLayout(host)
+            widgets = []
+            for i in range(count):
+                btn = QPushButton()
+                btn.setObjectName("MuteButton")
+                btn.setProperty("tone", "Accent")
+                label = QFrame()
+                label.setObjectName("AppLabel")
+                row.addWidget(btn)
+                row.addWidget(label)
+                widgets.append((btn, label))
+            host.show()
+            app.processEvents()
+            started = time.perf_counter()
+            for tick in range(ticks):
+                for i, (btn, label) in enumerate(widgets):
+                    state = tick % 2 == 0 and (changing == "all" or i == 0)
+                    if flip:
+                        set_style_state(btn, "muted", state)
+                        set_style_state(label, "selected", state)
+                    else:
+                        btn.setStyleSheet(_legacy_mute_sheet(state, THEME['Accent']))
+                        label.setStyleSheet(f"QFrame {{ background: {'#262B3B' if state else THEME['CardAlt']}; border: 1px solid {THEME['Stroke']}; border-radius: 8px; }}")
+                app.processEvents()
+            results.append((time.perf_counter() - started) * 1000 / ticks)
+            host.close()
+            host.deleteLater()
+            app.processEvents()
+        print(f"{count * 2:>8} {changing:>8} {results[0]:>17.2f}ms {results[1]:>17.2f}ms")
+
+def bench_shadow(counts=(4, 8, 16), ticks=50):
+    # Paint cost with the old per-card QGraphicsDropShadowEffect against the
+    # cached nine-slice shadows: one slider per card moving every tick (a
+    # drag), and a full repaint of the row.
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication.instance() or QApplication(sys.argv)
+    app.setStyleSheet(compile_stylesheet())
+    class _Parent:
+        is_dragging_app = False
+        icons = IconResolver()
+    noop = lambda *args: None
+    started = time.perf_counter()
+    shadow_tile()
+    print(f"shadow tile rendered in {(time.perf_counter() - started) * 1000:.1f}ms")
+    print(f"{'cards':>6} {'shadow':>7} {'slider drag/tick':>17} {'full repaint':>13}")
+    for count in counts:
+        for cached in (False, True):
+            host = CardShadowHost() if cached else QWidget()
+            row = QHBoxLayout(host)
+            row.setContentsMargins(*SHADOW_MARGINS)
+            cards = []
+            for i in range(count):
+                card = AudioChannel(f"Ch{i}", noop, noop, noop, noop, noop, noop, _Parent(), False, 280, 220)
+                card.setFixedWidth(CARD_WIDTH)
+                if not cached:
+                    effect = QGraphicsDropShadowEffect(card)
+                    effect.setBlurRadius(SHADOW_BLUR)
+                    effect.setColor(QColor(0, 0, 0, SHADOW_ALPHA))
+                    effect.setOffset(0, SHADOW_OFFSET)
+                    card.setGraphicsEffect(effect)
+                row.addWidget(card)
+                cards.append(card)
+            host.resize(count * (CARD_WIDTH + CARD_SPACING) + 2 * SHADOW_BLUR, 735 + 2 * SHADOW_BLUR)
+            host.show()
+            app.processEvents()
+            started = time.perf_counter()
+            for tick in range(ticks):
+                for card in cards:
+                    card.user_slider.setValue(tick * 2 % 100)
+                    card.user_slider.repaint()
+            drag_ms = (time.perf_counter() - started) * 1000 / ticks
+            started = time.perf_counter()
+            for tick in range(ticks):
+                host.repaint()
+            full_ms = (time.perf_counter() - started) * 1000 / ticks
+            host.close()
+            host.deleteLater()
+            app.processEvents()
+            print(f"{count:>6} {'cached' if cached else 'effect':>7} {drag_ms:>15.2f}ms {full_ms:>11.2f}ms")
+
+def _headless_mixer(backend=None, output=None, mic=None, state_dir=None, channels=None):
+    # A real MuxHome, offscreen, whose config, filter-chain confs and icon
+    # cache all live in state_dir, and which leaves the host's processes be
+    global CONFIG_FILE, MIC_CHAIN_CONF, EQ_CONF_PREFIX, ICON_CACHE_DIR, HOST_CLEANUP
+    state_dir = state_dir or tempfile.mkdtemp(prefix="mux_bench_")
+    CONFIG_FILE = os.path.join(state_dir, "config.json")
+    MIC_CHAIN_CONF = os.path.join(state_dir, "mic_chain.conf")
+    EQ_CONF_PREFIX = os.path.join(state_dir, "eq_")
+    ICON_CACHE_DIR = os.path.join(state_dir, "icons")
+    HOST_CLEANUP = False
+    with open(CONFIG_FILE, "w") as f:
+        json.dump({"selected_output": output, "selected_input": mic, "channels": channels}, f)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication.instance() or QApplication(sys.argv)
+    win = MuxHome(backend=backend)
+    win.show()
+    app.processEvents()
+    return app, win
+
+def start_private_server(runtime_dir):
+    # A sound server nobody else uses: PulseAudio when installed, otherwise
+    # PipeWire with its pulse frontend. Returns (processes, PULSE_SERVER).
+    env = dict(os.environ, XDG_RUNTIME_DIR=runtime_dir, PULSE_RUNTIME_PATH=runtime_dir)
+    env.pop("PULSE_SERVER", None)
+    procs = []
+    if shutil.which("pulseaudio"):
+        socket = os.path.join(runtime_dir, "native")
+        script = os.path.join(runtime_dir, "default.pa")
+        with open(script, "w") as f:
+            f.write(f"load-module module-native-protocol-unix auth-anonymous=1 socket={socket}\n")
+        procs.append(subprocess.Popen(["pulseaudio", "-n", "-F", script, "--daemonize=no", "--exit-idle-time=-1", "--use-pid-file=no"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+    elif shutil.which("pipewire") and shutil.which("pipewire-pulse"):
+        socket = os.path.join(runtime_dir, "pulse", "native")
+        for binary in ("pipewire", "wireplumber", "pipewire-pulse"):
+            if shutil.which(binary):
+                procs.append(subprocess.Popen([binary], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+                time.sleep(0.2)
+    else:
+        return [], None
+    server = f"unix:{socket}"
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if subprocess.run(["pactl", "info"], env=dict(env, PULSE_SERVER=server), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0:
+            return procs, server
+        time.sleep(0.1)
+    for proc in procs:
+        proc.terminate()
+    return [], None
+
+def _tone_file(path, seconds, freq=440.0, rate=48000):
+    # One second of a -20 dBFS stereo sine, repeated
+    amp = int(32767 * 0.1)
+    second = array.array("h")
+    for i in range(rate):
+        v = int(amp * math.sin(2 * math.pi * freq * i / rate))
+        second.append(v)
+        second.append(v)
+    with open(path, "wb") as f:
+        for _ in range(int(seconds) + 1):
+            second.tofile(f)
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def load_test(steps=(10, 40, 100, 200), tone=False, window_s=5.0, report_path=None):
+    # Scaling report for N real playback clients on a private server: mixer
+    # CPU (own + pactl children) and RSS, sync tick, UI frame time, and how
+    # long a move or a volume change takes to show up on the server.
+    if not shutil.which("pactl") or not shutil.which("pacat"):
+        print("The load test needs pactl and pacat")
+        return None
+    runtime_dir = tempfile.mkdtemp(prefix="mux_load_")
+    procs, server = start_private_server(runtime_dir)
+    if not server:
+        print("Could not start a private PulseAudio or PipeWire server")
+        return None
+    previous_server = os.environ.get("PULSE_SERVER")
+    os.environ["PULSE_SERVER"] = server
+    backend = PactlBackend()
+    backend.run("pactl load-module module-null-sink sink_name=LoadTest_Speakers sink_properties=device.description=LoadTestSpeakers")
+    backend.run("pactl load-module module-null-sink sink_name=LoadTest_MicIn sink_properties=device.description=LoadTestMicIn")
+    backend.run("pactl load-module module-remap-source master=LoadTest_MicIn.monitor source_name=LoadTest_Mic source_properties=device.description=LoadTestMic")
+    app, win = _headless_mixer(backend, "LoadTest_Speakers", "LoadTest_Mic", runtime_dir)
+    win.sync_timer.stop()
+    targets = [name for name in ("Game", "Chat", "Media") if name in win.sinks] or list(win.sinks)
+    source = "/dev/zero"
+    if tone:
+        source = os.path.join(runtime_dir, "tone.raw")
+        _tone_file(source, window_s * len(steps) * 4 + 60)
+    clients = []
+    rows = []
+    try:
+        for count in steps:
+            while len(clients) < count:
+                i = len(clients)
+                clients.append(subprocess.Popen(
+                    ["pacat", "--playback", "--raw", "--rate=48000", "--channels=2", "--format=s16le",
+                     f"--device={targets[i % len(targets)]}", f"--client-name=Load {i}",
+                     f"--property=application.name=Load {i}", source],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+            deadline = time.monotonic() + 15
+            while time.monotonic() < deadline:
+                if sum(len(apps) for apps in win.fetch_app_mapping().values()) >= count:
+                    break
+                time.sleep(0.1)
+
+            # Sync tick with every class due, as after a burst of events
+            sync_ms = []
+            for _ in range(5):
+                started = time.perf_counter()
+                win.sync_once()
+                sync_ms.append((time.perf_counter() - started) * 1000)
+
+            # UI frames: a 60 Hz timer repainting the window, for window_s
+            frame_ms = []
+            def frame():
+                started = time.perf_counter()
+                win.repaint()
+                frame_ms.append((time.perf_counter() - started) * 1000)
+            timer = QTimer()
+            timer.timeout.connect(frame)
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            children = resource.getrusage(resource.RUSAGE_CHILDREN)
+            wall = time.perf_counter()
+            timer.start(16)
+            while time.perf_counter() - wall < window_s:
+                app.processEvents()
+                time.sleep(0.002)
+            timer.stop()
+            wall = time.perf_counter() - wall
+            usage_after = resource.getrusage(resource.RUSAGE_SELF)
+            children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            cpu_self = (usage_after.ru_utime + usage_after.ru_stime - usage.ru_utime - usage.ru_stime) / wall * 100
+            cpu_children = (children_after.ru_utime + children_after.ru_stime - children.ru_utime - children.ru_stime) / wall * 100
+
+            # Move latency: one stream hopping between channels until pactl shows it
+            move_ms = []
+            mapping = win.fetch_app_mapping()
+            stream = next((apps[0][1] for apps in mapping.values() if apps), None)
+            for hop in range(6 if stream else 0):
+                target = targets[hop % len(targets)]
+                sink_index = next((s["index"] for s in parse_sinks(backend.run("pactl list sinks")) if s["name"] == win.sinks[target]), None)
+                started = time.perf_counter()
+                win.move_apps_to_sink([stream], target)
+                while time.perf_counter() - started < 2:
+                    app.processEvents()
+                    entry = next((e for e in parse_sink_inputs(backend.run("pactl list sink-inputs")) if e["id"] == stream), None)
+                    if entry is None or entry["sink"] == sink_index:
+                        break
+                move_ms.append((time.perf_counter() - started) * 1000)
+
+            # Volume latency: the channel's sink reaching the value that was set
+            volume_ms = []
+            channel = targets[0]
+            for step in range(6):
+                value = 40 + 10 * (step % 3)
+                started = time.perf_counter()
+                win.set_user_volume(channel, value)
+                while time.perf_counter() - started < 2:
+                    app.processEvents()
+                    if _first_percent(backend.run(f"pactl get-sink-volume {win.sinks[channel]}")) == value:
+                        break
+                volume_ms.append((time.perf_counter() - started) * 1000)
+
+            with open("/proc/self/statm") as f:
+                rss_mb = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1 << 20)
+            row = {
+                "clients": count,
+                "cpu_percent": round(cpu_self, 1),
+                "pactl_cpu_percent": round(cpu_children, 1),
+                "rss_mb": round(rss_mb, 1),
+                "sync_ms_p50": round(_percentile(sync_ms, 0.5), 2),
+                "frame_ms_p50": round(_percentile(frame_ms, 0.5), 2),
+                "frame_ms_p95": round(_percentile(frame_ms, 0.95), 2),
+                "move_ms_p50": round(_percentile(move_ms, 0.5), 1),
+                "volume_ms_p50": round(_percentile(volume_ms, 0.5), 1),
+            }
+            rows.append(row)
+            if len(rows) == 1:
+                print(" ".join(f"{key:>17}" for key in row))
+            print(" ".join(f"{value:>17}" for value in row.values()))
+    finally:
+        for client in clients:
+            client.terminate()
+        win.shutdown()
+        win.deleteLater()
+        for proc in procs:
+            proc.terminate()
+        if previous_server is None:
+            os.environ.pop("PULSE_SERVER", None)
+        else:
+            os.environ["PULSE_SERVER"] = previous_server
+        shutil.rmtree(runtime_dir, ignore_errors=True)
+    report = {"server": "pulseaudio" if shutil.which("pulseaudio") else "pipewire", "tone": tone, "window_s": window_s, "steps": rows}
+    report_path = report_path or os.path.expanduser(time.strftime("~/mux_load_%Y%m%d-%H%M%S.json"))
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {report_path}")
+    return report
+
+def bench_backend(stream_counts=(100, 1000, 5000), ticks=10, latency_ms=0):
+    # A real MuxHome, offscreen, over FakeAudioServer: the hot paths timed
+    # against N synthetic application streams.
+    print(f"{'streams':>8} {'sync_once':>10} {'fetch_map':>10} {'rebuild':>10} {'app lists':>10} {'cmds/sync':>10}")
+    for count in stream_counts:
+        server = FakeAudioServer(latency_ms=latency_ms)
+        app, win = _headless_mixer(server, "alsa_output.fake", "alsa_input.fake")
+        win.sync_timer.stop()
+        names = list(win.sinks)
+        for i in range(count):
+            server.add_stream(f"App {i % 40}", names[i % len(names)])
+
+        def timed(fn, runs):
+            started = time.perf_counter()
+            for _ in range(runs):
+                fn()
+            return (time.perf_counter() - started) * 1000 / runs
+        before = server.commands
+        sync_ms = timed(win.sync_once, ticks)
+        cmds = (server.commands - before) / ticks
+        map_ms = timed(win.fetch_app_mapping, ticks)
+        rebuild_ms = timed(win.rebuild_routing, 2)
+        mapping = win.fetch_app_mapping()
+        def rebuild_lists():
+            for name, widget in win.widgets.items():
+                widget.update_apps_list(mapping.get(name, []))
+            app.processEvents()
+        lists_ms = timed(rebuild_lists, 3)
+        print(f"{count:>8} {sync_ms:>8.1f}ms {map_ms:>8.1f}ms {rebuild_ms:>8.1f}ms {lists_ms:>8.1f}ms {cmds:>10.1f}")
+        win.shutdown()
+        server.close()
+        win.deleteLater()
+        app.processEvents()
 
 class AudioDataSignaler(QObject):
     update_apps = pyqtSignal(dict)
+    poke_sync = pyqtSignal(tuple)
+    recall_scene = pyqtSignal(str)
+    toggle_recording = pyqtSignal()
+    save_replay = pyqtSignal()
+    hotplug = pyqtSignal()
+    state_changed = pyqtSignal(object, str)
+    remote_command = pyqtSignal(object)
+    midi_learned = pyqtSignal(str)
+    midi_control = pyqtSignal(str, float)
+    obs_scene = pyqtSignal(str)
+    obs_status = pyqtSignal(bool)
+    server_events = pyqtSignal(bool)
+
+class TraceSpan:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        tracer = TRACER
+        if tracer is not None:
+            tracer.complete(self.name, self.start, self.args)
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+_NO_SPAN = _NoSpan()
+
+class Tracer:
+    # --trace: spans are appended to a bounded deque owned by the recording
+    # thread, so recording never takes a lock (the registry lock is taken
+    # once per thread). The Chrome trace-event JSON is only built on write.
+    def __init__(self, path=None):
+        self.path = path
+        self.local = threading.local()
+        self.buffers = {}
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.t0 = time.perf_counter_ns()
+
+    def _buffer(self):
+        buf = getattr(self.local, "buffer", None)
+        if buf is None:
+            buf = collections.deque(maxlen=TRACE_BUFFER_EVENTS)
+            self.local.buffer = buf
+            with self.lock:
+                self.buffers[threading.get_ident()] = (threading.current_thread().name, buf)
+        return buf
+
+    def complete(self, name, start_ns, args=None):
+        self._buffer().append(("X", name, start_ns, time.perf_counter_ns() - start_ns, args))
+
+    def deferred(self, name, start_ns):
+        # Time spent waiting in the event loop: drawn as an async slice so it
+        # does not have to nest with the spans around it.
+        self._buffer().append(("A", name, start_ns, time.perf_counter_ns() - start_ns, None))
+
+    def events(self):
+        events = []
+        with self.lock:
+            buffers = list(self.buffers.items())
+        async_id = 0
+        for tid, (thread_name, buf) in buffers:
+            events.append({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": thread_name}})
+            for kind, name, start, dur, args in list(buf):
+                ts = (start - self.t0) / 1000
+                if kind == "X":
+                    event = {"name": name, "ph": "X", "ts": ts, "dur": dur / 1000, "pid": self.pid, "tid": tid}
+                    if args:
+                        event["args"] = args
+                    events.append(event)
+                else:
+                    async_id += 1
+                    events.append({"name": name, "cat": "deferred", "ph": "b", "id": async_id, "ts": ts, "pid": self.pid, "tid": tid})
+                    events.append({"name": name, "cat": "deferred", "ph": "e", "id": async_id, "ts": ts + dur / 1000, "pid": self.pid, "tid": tid})
+        return events
+
+    def write(self, path=None):
+        path = path or self.path or os.path.expanduser(time.strftime("~/mux_trace_%Y%m%d-%H%M%S.json"))
+        try:
+            with open(path, "w") as f:
+                json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, f)
+        except OSError:
+            return None
+        print(f"Trace written to {path}")
+        return path
+
+def trace(name, **args):
+    # `with trace("name"):` records a span when --trace is on, else costs a
+    # global lookup.
+    if TRACER is None:
+        return _NO_SPAN
+    return TraceSpan(name, args or None)
+
+def traced(fn):
+    name = fn.__qualname__
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        tracer = TRACER
+        if tracer is None:
+            return fn(*args, **kwargs)
+        start = time.perf_counter_ns()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            tracer.complete(name, start)
+    return wrapper
+
+def trace_deferred(name, fn):
+    # Wraps a callback handed to a timer so the wait shows up in the trace
+    if TRACER is None:
+        return fn
+    start = time.perf_counter_ns()
+    def fire():
+        TRACER.deferred(name, start)
+        fn()
+    return fire
+
+class Histogram:
+    # Fixed buckets in preallocated arrays; observe() only bumps numbers in
+    # place, so the hot paths it sits in never allocate.
+    __slots__ = ("bounds", "counts", "total", "lock")
+
+    def __init__(self, bounds=METRICS_BUCKETS):
+        self.bounds = bounds
+        self.counts = array.array("Q", bytes(8 * (len(bounds) + 1)))
+        self.total = array.array("d", [0.0])
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect.bisect_left(self.bounds, seconds)
+        with self.lock:
+            self.counts[i] += 1
+            self.total[0] += seconds
+
+    def snapshot(self):
+        with self.lock:
+            return self.counts.tolist(), self.total[0]
+
+def sample_xruns():
+    # pw-top's ERR column is a running xrun count per node; the second
+    # iteration is the one with settled numbers.
+    try:
+        out = subprocess.check_output(["pw-top", "-b", "-n", "2"], stderr=subprocess.DEVNULL, timeout=3).decode()
+    except:
+        return None
+    xruns = {}
+    for line in out.split('\n'):
+        cols = line.split()
+        if len(cols) >= 10 and cols[8].isdigit() and "loopback" in cols[-1]:
+            xruns[cols[-1]] = int(cols[8])
+    return xruns
+
+def _metric_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Metrics:
+    # Timings are observed into preallocated histograms from whichever thread
+    # measured them. Volumes, levels and RSS are gauges read only when
+    # scraped, so there is nothing to keep up to date between scrapes.
+    def __init__(self, gauges=None):
+        self.gauges = gauges
+        self.pactl = {"cmd": Histogram(), "write": Histogram()}
+        self.sync_tick = Histogram()
+        self.hotkey = Histogram()
+        self.xruns = {}
+
+    def render(self, openmetrics=False):
+        out = []
+        def family(name, kind, help_text):
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+        def histogram(name, hist, label=""):
+            counts, total = hist.snapshot()
+            prefix = label + "," if label else ""
+            suffix = "{" + label + "}" if label else ""
+            running = 0
+            for bound, count in zip(hist.bounds, counts):
+                running += count
+                out.append(f'{name}_bucket{{{prefix}le="{bound}"}} {running}')
+            running += counts[-1]
+            out.append(f'{name}_bucket{{{prefix}le="+Inf"}} {running}')
+            out.append(f"{name}_sum{suffix} {total}")
+            out.append(f"{name}_count{suffix} {running}")
+
+        state = self.gauges() if self.gauges else {}
+        channels = state.get("channels", {})
+        for field, kind_help in [
+            ("volume", "Channel volume in percent"),
+            ("muted", "1 while the channel is muted"),
+            ("stream_volume", "Stream mix volume in percent"),
+            ("stream_muted", "1 while the channel is muted in the stream mix"),
+        ]:
+            family(f"mux_channel_{field}", "gauge", kind_help)
+            for name, values in channels.items():
+                out.append(f'mux_channel_{field}{{channel="{_metric_label(name)}"}} {int(values[field])}')
+        # Levels come from the ducker's envelope followers: block RMS, and
+        # only for the channels that trigger ducking
+        levels = state.get("levels", {})
+        if levels:
+            family("mux_channel_level_dbfs", "gauge", f"Last {DUCK_BLOCK_MS} ms RMS level of each channel that triggers ducking")
+            for name, db in levels.items():
+                out.append(f'mux_channel_level_dbfs{{channel="{_metric_label(name)}"}} {db:.1f}')
+
+        xruns = self.xruns
+        if xruns:
+            # OpenMetrics names the family without the _total suffix
+            base = "mux_loopback_xruns" if openmetrics else "mux_loopback_xruns_total"
+            family(base, "counter", "Xruns reported by PipeWire for loopback nodes")
+            for node, count in xruns.items():
+                out.append(f'mux_loopback_xruns_total{{node="{_metric_label(node)}"}} {count}')
+
+        family("mux_pactl_duration_seconds", "histogram", "Time spent in pactl calls; cmd is a query or module change, write a volume writer flush")
+        for kind, hist in self.pactl.items():
+            histogram("mux_pactl_duration_seconds", hist, f'kind="{kind}"')
+        family("mux_sync_tick_duration_seconds", "histogram", "Time to read back and apply server state")
+        histogram("mux_sync_tick_duration_seconds", self.sync_tick)
+        family("mux_hotkey_dispatch_seconds", "histogram", "From hotkey callback to the change being queued")
+        histogram("mux_hotkey_dispatch_seconds", self.hotkey)
+
+        try:
+            with open("/proc/self/statm") as f:
+                rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            family("process_resident_memory_bytes", "gauge", "Resident memory size in bytes")
+            out.append(f"process_resident_memory_bytes {rss}")
+        except (OSError, ValueError, IndexError):
+            pass
+        if openmetrics:
+            out.append("# EOF")
+        return "\n".join(out) + "\n"
+
+class MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if urllib.parse.urlparse(self.path).path not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+        body = self.server.metrics.render(openmetrics).encode()
+        self.send_response(200)
+        if openmetrics:
+            self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8")
+        else:
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class MetricsExporter:
+    # Serves Metrics over HTTP or rewrites a node_exporter textfile. One
+    # background thread samples xruns (pw-top is slow, so never per scrape)
+    # and, in textfile mode, writes the file with an atomic rename.
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.server = None
+        self.threads = []
+        self.stopped = threading.Event()
+        self.mode = None
+
+    def running(self):
+        return self.mode is not None
+
+    def start(self, settings):
+        self.stop()
+        self.stopped = threading.Event()
+        mode = settings.get("mode")
+        interval = max(1, int(settings.get("interval", METRICS_DEFAULTS["interval"])))
+        if mode == "http":
+            try:
+                self.server = http.server.ThreadingHTTPServer((settings["host"], int(settings["port"])), MetricsRequestHandler)
+            except (OSError, ValueError, TypeError):
+                return False
+            self.server.daemon_threads = True
+            self.server.metrics = self.metrics
+            self.threads.append(threading.Thread(target=self.server.serve_forever, daemon=True))
+            path = None
+        elif mode == "textfile":
+            path = os.path.expanduser(settings.get("textfile") or METRICS_DEFAULTS["textfile"])
+        else:
+            return False
+        self.threads.append(threading.Thread(target=self._sample_loop, args=(interval, path), daemon=True))
+        for thread in self.threads:
+            thread.start()
+        self.mode = mode
+        return True
+
+    def _sample_loop(self, interval, path):
+        while not self.stopped.is_set():
+            xruns = sample_xruns()
+            if xruns is not None:
+                self.metrics.xruns = xruns
+            if path:
+                try:
+                    tmp = path + ".tmp"
+                    with open(tmp, "w") as f:
+                        f.write(self.metrics.render())
+                    os.replace(tmp, path)
+                except OSError:
+                    pass
+            self.stopped.wait(interval)
+
+    def stop(self):
+        self.stopped.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        for thread in self.threads:
+            # A sampler stuck in pw-top just finishes on its own
+            thread.join(1.0)
+        self.threads = []
+        self.mode = None
+
+class FilterChain:
+    # One filter-chain graph hosted in its own pipewire process. Subclasses
+    # describe the graph; controls are changed live on the capture node.
+    def __init__(self, conf_path, control_node, ready_kind, ready_name):
+        self.conf_path = conf_path
+        self.control_node = control_node
+        self.ready_kind = ready_kind
+        self.ready_name = ready_name
+        self.proc = None
+        self.node_id = None
+
+    def graph_nodes(self):
+        return []
+
+    def graph_links(self):
+        return []
+
+    def module_args(self):
+        return []
+
+    def render_config(self):
+        nodes = []
+        for key, kind, plugin, label, controls in self.graph_nodes():
+            control_str = " ".join(f'"{k}" = {v}' for k, v in controls.items())
+            plugin_str = f" plugin = {plugin}" if plugin else ""
+            nodes.append(f"{{ type = {kind} name = {key}{plugin_str} label = {label} control = {{ {control_str} }} }}")
+        links = [f'{{ output = "{out}" input = "{inp}" }}' for out, inp in self.graph_links()]
+        return "\n".join([
+            "context.properties = { log.level = 0 }",
+            "context.spa-libs = { audio.convert.* = audioconvert/libspa-audioconvert support.* = support/libspa-support }",
+            "context.modules = [",
+            "  { name = libpipewire-module-rt flags = [ ifexists nofail ] }",
+            "  { name = libpipewire-module-protocol-native }",
+            "  { name = libpipewire-module-client-node }",
+            "  { name = libpipewire-module-adapter }",
+            "  { name = libpipewire-module-filter-chain",
+            "    args = {",
+            "      filter.graph = {",
+            "        nodes = [ " + " ".join(nodes) + " ]",
+            "        links = [ " + " ".join(links) + " ]",
+            "      }",
+        ] + [f"      {line}" for line in self.module_args()] + [
+            "    }",
+            "  }",
+            "]",
+        ]) + "\n"
+
+    def running(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self):
+        if self.running():
+            return True
+        with open(self.conf_path, 'w') as f:
+            f.write(self.render_config())
+        try:
+            self.proc = subprocess.Popen(["pipewire", "-c", self.conf_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except:
+            self.proc = None
+            return False
+        for _ in range(20):
+            time.sleep(0.05)
+            if not self.running():
+                break
+            listing = subprocess.run(["pactl", "list", "short", self.ready_kind], capture_output=True, text=True).stdout
+            if f"{self.ready_name}\t" in listing:
+                self.node_id = None
+                return True
+        self.stop()
+        return False
+
+    def stop(self):
+        if self.proc is not None:
+            try:
+                self.proc.terminate()
+                self.proc.wait(timeout=2)
+            except:
+                pass
+        self.proc = None
+        self.node_id = None
+
+    def _find_node_id(self):
+        if self.node_id is not None:
+            return self.node_id
+        try:
+            out = subprocess.check_output(["pw-cli", "ls", "Node"], stderr=subprocess.DEVNULL).decode()
+        except:
+            return None
+        current = None
+        for line in out.split('\n'):
+            id_match = re.match(r"\s*id (\d+),", line)
+            if id_match:
+                current = id_match.group(1)
+            elif f'node.name = "{self.control_node}"' in line:
+                self.node_id = current
+                break
+        return self.node_id
+
+    def set_controls(self, controls):
+        # All values go out in a single Props update, so the graph switches
+        # over on one cycle boundary instead of passing through mixed states.
+        node_id = self._find_node_id()
+        if not node_id or not controls:
+            return False
+        params = " ".join(f'"{name}" {value}' for name, value in controls.items())
+        props = "{ params = [ " + params + " ] }"
+        result = subprocess.run(["pw-cli", "set-param", node_id, "Props", props], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return result.returncode == 0
+
+    def busy_time(self):
+        try:
+            out = subprocess.check_output(["pw-top", "-b", "-n", "2"], stderr=subprocess.DEVNULL, timeout=3).decode()
+        except:
+            return None, None
+        busy_us = None
+        busy_ratio = None
+        for line in out.split('\n'):
+            cols = line.split()
+            if len(cols) >= 8 and cols[-1] == self.control_node:
+                busy = re.match(r"([\d.]+)(us|ms)", cols[5])
+                if busy:
+                    busy_us = float(busy.group(1)) * (1000 if busy.group(2) == "ms" else 1)
+                try:
+                    busy_ratio = float(cols[7])
+                except ValueError:
+                    pass
+        return busy_us, busy_ratio
+
+class MicChain(FilterChain):
+    def __init__(self, settings):
+        super().__init__(MIC_CHAIN_CONF, MIC_CHAIN_SINK, "sinks", MIC_CHAIN_SINK)
+        self.settings = settings
+        self.stages = [stage for stage in MIC_CHAIN_STAGES if self._stage_available(stage)]
+
+    def _stage_available(self, stage):
+        if stage["type"] == "builtin":
+            return True
+        return any(os.path.exists(os.path.join(d, stage["plugin"] + ".so")) for d in LADSPA_DIRS)
+
+    def stage_enabled(self, stage):
+        return self.settings.get(stage["key"], {}).get("enabled", True)
+
+    def graph_stages(self):
+        # Available stages that are in the graph: enabled or live-bypassable
+        return [st for st in self.stages if st["bypass"] is not None or self.stage_enabled(st)]
+
+    def stage_controls(self, stage):
+        cfg = self.settings.get(stage["key"], {})
+        controls = dict(stage["fixed"])
+        for field, control in stage["controls"].items():
+            if field in cfg:
+                controls[control] = float(cfg[field])
+        if not self.stage_enabled(stage):
+            controls.update(stage["bypass"])
+        return controls
+
+    def graph_nodes(self):
+        return [(st["key"], st["type"], st["plugin"], st["label"], self.stage_controls(st)) for st in self.graph_stages()]
+
+    def graph_links(self):
+        stages = self.graph_stages()
+        return [(f'{prev["key"]}:{prev["ports"][1]}', f'{nxt["key"]}:{nxt["ports"][0]}') for prev, nxt in zip(stages, stages[1:])]
+
+    def module_args(self):
+        return [
+            'node.description = "Mux Mic Chain"',
+            'media.name = "Mux Mic Chain"',
+            "audio.channels = 1",
+            "audio.position = [ MONO ]",
+            f'capture.props = {{ node.name = "{MIC_CHAIN_SINK}" media.class = Audio/Sink }}',
+            f'playback.props = {{ node.name = "{MIC_CHAIN_SINK}.output" node.passive = true target.object = "{INTERNAL_MIC_PROCESSING}" }}',
+        ]
+
+    def apply(self, key=None):
+        controls = {}
+        for stage in self.graph_stages():
+            if key and stage["key"] != key:
+                continue
+            for control, value in self.stage_controls(stage).items():
+                controls[f'{stage["key"]}:{control}'] = value
+        return self.set_controls(controls)
+
+    def update(self, key, field, value):
+        # Returns True when the graph changed shape: the chain is stopped
+        # and the caller has to route the mic into it again.
+        before = self.graph_stages()
+        self.settings.setdefault(key, {})[field] = value
+        if not self.running():
+            return False
+        if self.graph_stages() != before:
+            self.stop()
+            return True
+        self.apply(key)
+        return False
+
+    def report(self):
+        stages = []
+        graph = self.graph_stages()
+        for stage in MIC_CHAIN_STAGES:
+            available = stage in self.stages
+            stages.append({
+                "stage": stage["key"],
+                "available": available,
+                "enabled": available and self.stage_enabled(stage),
+                "in_graph": stage in graph,
+                "latency_ms": stage["latency_ms"] if stage in graph else 0.0,
+            })
+        busy_us = None
+        busy_ratio = None
+        if self.running():
+            # The filter-chain runs every stage inside one node, so the server
+            # only exposes CPU time for the chain as a whole.
+            busy_us, busy_ratio = self.busy_time()
+        return {
+            "stages": stages,
+            "latency_ms": sum(st["latency_ms"] for st in stages),
+            "busy_us": busy_us,
+            "busy_ratio": busy_ratio,
+        }
+
+class EqChain(FilterChain):
+    def __init__(self, channel, settings, source=None, name=None):
+        name = name or f"{EQ_NODE_PREFIX}{channel}"
+        super().__init__(f"{EQ_CONF_PREFIX}{channel.lower()}.conf", f"{name}_in", "sources", name)
+        self.channel = channel
+        self.name = name
+        self.source = source or channel
+        self.settings = settings
+
+    def band_controls(self, index, band, flat=False):
+        gain = 0.0 if flat else float(band.get("gain", 0))
+        return {
+            f"band{index}:Freq": float(band.get("freq", 1000)),
+            f"band{index}:Q": float(band.get("q", 0.707)),
+            f"band{index}:Gain": gain,
+        }
+
+    def controls(self):
+        flat = not self.settings.get("enabled")
+        controls = {}
+        for i, band in enumerate(self.settings["bands"]):
+            controls.update(self.band_controls(i, band, flat))
+        return controls
+
+    def graph_nodes(self):
+        nodes = []
+        for i, band in enumerate(self.settings["bands"]):
+            label = EQ_BAND_LABELS.get(band.get("type"), "bq_peaking")
+            band_controls = self.band_controls(i, band, not self.settings.get("enabled"))
+            nodes.append((f"band{i}", "builtin", None, label, {k.split(":", 1)[1]: v for k, v in band_controls.items()}))
+        return nodes
+
+    def graph_links(self):
+        count = len(self.settings["bands"])
+        return [(f"band{i}:Out", f"band{i + 1}:In") for i in range(count - 1)]
+
+    def module_args(self):
+        return [
+            f'node.description = "Mux EQ {self.channel}"',
+            f'media.name = "Mux EQ {self.channel}"',
+            "audio.channels = 2",
+            "audio.position = [ FL FR ]",
+            f'capture.props = {{ node.name = "{self.name}_in" stream.capture.sink = true target.object = "{self.source}" node.passive = true }}',
+            f'playback.props = {{ node.name = "{self.name}" media.class = Audio/Source }}',
+        ]
+
+    def apply(self):
+        return self.set_controls(self.controls())
+
+    def update_band(self, index, field, value):
+        self.settings["bands"][index][field] = value
+        if self.running():
+            self.set_controls(self.band_controls(index, self.settings["bands"][index], not self.settings.get("enabled")))
+
+    def load_bands(self, bands):
+        # Preset swap: band count is fixed by the running graph, every band
+        # is replaced in one update.
+        for band, new in zip(self.settings["bands"], bands):
+            band.update(new)
+        if self.running():
+            self.apply()
+
+async def _bench_client(port, done_value, received):
+    reader, writer = await ws_connect("127.0.0.1", port)
+    messages = 0
+    last_volume = None
+    while last_volume != done_value:
+        _, payload = await ws_read_frame(reader, masked=False)
+        message = json.loads(payload)
+        messages += 1
+        if message["type"] == "diff":
+            last_volume = message["channels"].get("Ch0", {}).get("volume", last_volume)
+    received.append(messages)
+    writer.close()
+
+def bench_remote(client_counts=(1, 10, 50), updates=500, channels=8):
+    # Fan-out cost of the control server with local clients only: a writer
+    # thread hammers the store, every client waits for the final value.
+    async def run(count):
+        store = StateStore([f"Ch{i}" for i in range(channels)])
+        server = ControlServer(store, lambda message: None)
+        server.start("127.0.0.1", 0)
+        port = server.server.sockets[0].getsockname()[1]
+        store.subscribe(server.publish)
+        received = []
+        tasks = [asyncio.ensure_future(_bench_client(port, -1, received)) for _ in range(count)]
+        while len(server.clients) < count:
+            await asyncio.sleep(0.01)
+        started = time.perf_counter()
+        def hammer():
+            for v in range(updates):
+                store.update(f"Ch{v % channels}", volume=v % 101)
+            store.update("Ch0", volume=-1)
+        threading.Thread(target=hammer).start()
+        await asyncio.wait_for(asyncio.gather(*tasks), 30)
+        elapsed = (time.perf_counter() - started) * 1000
+        server.stop()
+        return elapsed, sum(received) / max(1, len(received))
+    print(f"{'clients':>8} {'updates':>8} {'ms':>9} {'msgs/client':>12}")
+    for count in client_counts:
+        elapsed, per_client = asyncio.run(run(count))
+        print(f"{count:>8} {updates:>8} {elapsed:>9.1f} {per_client:>12.1f}")
+
+def remote_bind(settings):
+    # Where the control server listens: (host, port, token). A LAN bind
+    # always gets a token, generated and stored in settings if missing.
+    host = settings.get("host") or REMOTE_DEFAULTS["host"]
+    if host != "127.0.0.1" and not settings.get("token"):
+        settings["token"] = secrets.token_urlsafe(12)
+    try:
+        port = int(settings.get("port"))
+    except (TypeError, ValueError):
+        port = REMOTE_DEFAULTS["port"]
+    return host, port, settings.get("token", "")
+
+def bench_obs(switches=200):
+    # The bridge against the stand-in server: time to connect (handshake,
+    # auth and the first batch), then how long a scene switch in "OBS" takes
+    # to reach the mixer-side callback.
+    server = FakeObsServer(password="bench")
+    port = server.start()
+    arrivals = queue.Queue()
+    bridge = ObsBridge(lambda name: arrivals.put((name, time.perf_counter())))
+    bridge.source = (OBS_SOURCE_NAME, f"{STREAM_MIX_NAME}.monitor")
+    started = time.perf_counter()
+    bridge.start("127.0.0.1", port, "bench")
+    arrivals.get(timeout=5)
+    connect_ms = (time.perf_counter() - started) * 1000
+    latencies = []
+    for i in range(switches):
+        scene = server.scenes[(i + 1) % len(server.scenes)]
+        sent = time.perf_counter()
+        server.switch(scene)
+        name, arrived = arrivals.get(timeout=2)
+        latencies.append((arrived - sent) * 1000)
+    bridge.stop()
+    server.stop()
+    latencies.sort()
+    print(f"connect {connect_ms:.1f}ms, {server.requests} requests in {server.batches} batch(es), source created: {OBS_SOURCE_NAME in server.inputs}")
+    print(f"scene switch -> callback over {switches}: p50 {latencies[len(latencies) // 2]:.3f}ms  p99 {latencies[int(len(latencies) * 0.99)]:.3f}ms  max {latencies[-1]:.3f}ms")
+
+def run_fake_obs(port=OBS_DEFAULTS["port"], interval=5.0):
+    server = FakeObsServer()
+    if server.start("127.0.0.1", port) is None:
+        print(f"Port {port} is busy")
+        return
+    print(f"Stand-in OBS on ws://127.0.0.1:{port}, no password; switching scenes every {interval:g}s (Ctrl+C quits)")
+    try:
+        i = 0
+        while True:
+            time.sleep(interval)
+            i += 1
+            scene = server.scenes[i % len(server.scenes)]
+            server.switch(scene)
+            print(f"program scene: {scene}")
+    except KeyboardInterrupt:
+        pass
+    server.stop()
+
+def bench_midi(faders=4, rate_hz=1000, seconds=2.0):
+    # Feeds a pipe standing in for a virtual MIDI port with `faders` faders
+    # each sending rate_hz CCs (running status, like real hardware) and
+    # counts how many actions reach the mixer side.
+    read_fd, write_fd = os.pipe()
+    fb_read, fb_write = os.pipe()
+    mapping = {f"cc:0:{i}": {"action": "volume", "channel": f"Ch{i}"} for i in range(faders)}
+    mapping["cc:0:48"] = {"action": "mute", "channel": "Ch0"}
+    calls = []
+    controller = MidiController(mapping, lambda key, value: calls.append((key, value)))
+    controller.start(fds=(read_fd, fb_write))
+    started = time.perf_counter()
+    sent = 0
+    tick = 0
+    while time.perf_counter() - started < seconds:
+        burst = bytearray([0xB0])
+        for i in range(faders):
+            burst += bytes([i, tick % 128])
+        if tick % 500 == 0:
+            burst += bytes([48, 127, 48, 0])
+            sent += 2
+        os.write(write_fd, bytes(burst))
+        sent += faders
+        tick += 1
+        time.sleep(1 / rate_hz)
+    time.sleep(0.05)
+    controller.send_feedback("cc:0:7", 0.5)
+    time.sleep(0.05)
+    controller.stop()
+    os.close(write_fd)
+    feedback = os.read(fb_read, 64)
+    os.close(fb_read)
+    presses = sum(1 for key, value in calls if key == "cc:0:48")
+    print(f"messages in {sent}, parsed {controller.received}, actions out {len(calls)} ({len(calls) / seconds:.0f}/s), button events kept {presses}, feedback {feedback.hex()}")
+
+def bench_eq(band_counts=(1, 2, 4, 8, 16), rate=48000):
+    # Measures the server-side cost of the biquad chain: a silent stereo
+    # stream is played into a scratch sink that an EQ with N bands captures.
+    bench_sink = "Mux_EQ_Bench"
+    mod_id = subprocess.run(["pactl", "load-module", "module-null-sink", f"sink_name={bench_sink}", f"rate={rate}"], capture_output=True, text=True).stdout.strip()
+    player = subprocess.Popen(["pacat", "--raw", f"--rate={rate}", "--channels=2", "--format=s16le", f"--device={bench_sink}", "/dev/zero"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    rows = []
+    try:
+        for count in band_counts:
+            settings = {"enabled": True, "bands": [{"type": "peaking", "freq": 1000, "q": 1.0, "gain": 3} for _ in range(count)]}
+            chain = EqChain("Bench", settings, source=bench_sink, name=f"{EQ_NODE_PREFIX}Bench")
+            if not chain.start():
+                print(f"{count:>5} bands: failed to start filter-chain")
+                continue
+            time.sleep(0.5)
+            busy_us, busy_ratio = chain.busy_time()
+            chain.stop()
+            rows.append((count, busy_us, busy_ratio))
+    finally:
+        player.terminate()
+        if mod_id:
+            subprocess.run(["pactl", "unload-module", mod_id], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    print(f"EQ biquad cost at {rate} Hz, stereo")
+    print(f"{'bands':>5} {'busy/cycle':>12} {'per band':>10} {'of quantum':>11}")
+    for count, busy_us, busy_ratio in rows:
+        if busy_us is None:
+            print(f"{count:>5} {'n/a':>12}")
+            continue
+        ratio = f"{busy_ratio * 100:.2f}%" if busy_ratio is not None else "n/a"
+        print(f"{count:>5} {busy_us:>10.1f}us {busy_us / count:>8.2f}us {ratio:>11}")
+    return rows
+
+class VolumeWriter:
+    # Owns every volume/mute write. Immediate sets are latest-value-wins;
+    # ramped sets become at most max_steps evenly spaced updates. Each tick's
+    # commands run as a single shell so their order is kept.
+    def __init__(self, ramp_ms=RAMP_DEFAULT_MS, max_steps=RAMP_MAX_STEPS, backend=None):
+        self.backend = backend or PactlBackend()
+        self.ramp_ms = ramp_ms
+        self.max_steps = max_steps
+        self.current = {}
+        self.levels = {}
+        self.muted = {}
+        self.ramps = {}
+        self.pending = {}
+        self.extra = []
+        self.timing = None
+        self.cond = threading.Condition()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _vol_cmd(self, key, value):
+        return f"pactl set-{key[0]}-volume {key[1]} {int(round(value))}%"
+
+    def _mute_cmd(self, key, muted):
+        return f"pactl set-{key[0]}-mute {key[1]} {1 if muted else 0}"
+
+    def _start_ramp(self, key, start, end, ramp_ms, before=None, after=None):
+        # Long crossfades get proportionally more steps, capped at one per 40 ms
+        steps = max(self.max_steps, int(ramp_ms / 40))
+        self.ramps[key] = {
+            "start": start,
+            "end": end,
+            "t0": time.monotonic(),
+            "duration": ramp_ms / 1000,
+            "step": ramp_ms / 1000 / steps,
+            "before": before or [],
+            "after": after,
+        }
+        self.pending.pop(key, None)
+
+    def batch(self):
+        # Holding the (reentrant) lock keeps the writer thread from flushing
+        # until every change in the block is queued.
+        return self.cond
+
+    def run(self, cmds):
+        with self.cond:
+            self.extra.extend(cmds)
+            self.cond.notify()
+
+    def _ramp_value(self, key):
+        ramp = self.ramps.get(key)
+        if ramp is None:
+            return self.current.get(key)
+        frac = min(1.0, (time.monotonic() - ramp["t0"]) / ramp["duration"])
+        return ramp["start"] + (ramp["end"] - ramp["start"]) * frac
+
+    def set(self, kind, target, value, ramp=True, unmute=False, ramp_ms=None):
+        key = (kind, str(target))
+        value = max(0, min(100, int(round(value))))
+        ramp_ms = self.ramp_ms if ramp_ms is None else ramp_ms
+        with self.cond:
+            self.levels[key] = value
+            current = self._ramp_value(key)
+            ramp = ramp and ramp_ms > 0 and current is not None
+            if self.muted.get(key) and not unmute:
+                # Inaudible while muted; a pending mute ramp restores the new level
+                if key not in self.ramps:
+                    self.pending[key] = [self._vol_cmd(key, value)]
+                    self.current[key] = value
+            elif not ramp:
+                self.ramps.pop(key, None)
+                cmds = [self._vol_cmd(key, value)]
+                if unmute and self.muted.get(key) is not False:
+                    cmds.append(self._mute_cmd(key, False))
+                self.pending[key] = cmds
+                self.current[key] = value
+                self.muted[key] = False if unmute else self.muted.get(key)
+            elif unmute and self.muted.get(key) is not False:
+                start = 0 if self.muted.get(key) else current
+                self._start_ramp(key, start, value, ramp_ms, before=[self._vol_cmd(key, start), self._mute_cmd(key, False)])
+                self.muted[key] = False
+            else:
+                self._start_ramp(key, current, value, ramp_ms)
+            self.cond.notify()
+
+    def set_mute(self, kind, target, muted, ramp_ms=None):
+        key = (kind, str(target))
+        ramp_ms = self.ramp_ms if ramp_ms is None else ramp_ms
+        with self.cond:
+            current = self._ramp_value(key)
+            level = self.levels.get(key, current)
+            if ramp_ms <= 0 or current is None or level is None:
+                self.ramps.pop(key, None)
+                self.pending[key] = [self._mute_cmd(key, muted)]
+            elif muted:
+                after = lambda key=key: [self._mute_cmd(key, True), self._vol_cmd(key, self.levels.get(key, 0))]
+                self._start_ramp(key, current, 0, ramp_ms, after=after)
+            else:
+                self._start_ramp(key, 0, level, ramp_ms, before=[self._vol_cmd(key, 0), self._mute_cmd(key, False)])
+            self.muted[key] = muted
+            self.cond.notify()
+
+    def observe(self, kind, target, value=None, muted=None):
+        # Values read back from the server keep ramp start points honest
+        key = (kind, str(target))
+        with self.cond:
+            if key in self.ramps or key in self.pending:
+                return
+            if value is not None:
+                self.current[key] = value
+                self.levels[key] = value
+            if muted is not None:
+                self.muted[key] = muted
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending and not self.ramps and not self.extra:
+                    self.cond.wait()
+                if not self.pending and not self.extra and self.ramps:
+                    self.cond.wait(min(r["step"] for r in self.ramps.values()))
+                cmds = []
+                for key, key_cmds in self.pending.items():
+                    cmds.extend(key_cmds)
+                self.pending = {}
+                cmds.extend(self.extra)
+                self.extra = []
+                now = time.monotonic()
+                for key in list(self.ramps):
+                    ramp = self.ramps[key]
+                    cmds.extend(ramp["before"])
+                    ramp["before"] = []
+                    frac = min(1.0, (now - ramp["t0"]) / ramp["duration"])
+                    value = ramp["start"] + (ramp["end"] - ramp["start"]) * frac
+                    cmds.append(self._vol_cmd(key, value))
+                    self.current[key] = value
+                    if frac >= 1.0:
+                        del self.ramps[key]
+                        if ramp["after"]:
+                            cmds.extend(ramp["after"]())
+                            self.current[key] = self.levels.get(key, value)
+            if cmds:
+                started = time.perf_counter()
+                with trace("VolumeWriter.flush", commands=len(cmds)):
+                    try:
+                        self.backend.run(" ; ".join(cmds))
+                    except:
+                        pass
+                if self.timing is not None:
+                    self.timing.observe(time.perf_counter() - started)
+
+class EnvelopeFollower(threading.Thread):
+    def __init__(self, device, on_level, rate=DUCK_RATE, block_ms=DUCK_BLOCK_MS):
+        super().__init__(daemon=True)
+        self.device = device
+        self.on_level = on_level
+        self.rate = rate
+        self.block = rate * block_ms // 1000
+        self.proc = None
+        self.stopped = False
+
+    def run(self):
+        try:
+            proc = subprocess.Popen(
+                ["parec", "--raw", "--format=float32le", "--channels=1", f"--rate={self.rate}",
+                 f"--latency-msec={DUCK_BLOCK_MS}", f"--device={self.device}"],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except:
+            return
+        self.proc = proc
+        if self.stopped:
+            proc.terminate()
+        nbytes = self.block * 4
+        try:
+            while not self.stopped:
+                data = proc.stdout.read(nbytes)
+                if not data or len(data) < nbytes:
+                    break
+                samples = np.frombuffer(data, dtype=np.float32)
+                rms = float(np.sqrt(np.mean(samples * samples)))
+                self.on_level(self.device, 20 * math.log10(rms) if rms > 1e-9 else -180.0)
+        finally:
+            proc.stdout.close()
+            try:
+                proc.wait(1.0)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+    def stop(self):
+        self.stopped = True
+        proc = self.proc
+        if proc is not None:
+            try:
+                proc.terminate()
+                proc.wait(1.0)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+            except OSError:
+                pass
+
+def duck_percent(volume, gain):
+    # pactl percentages are cubic in amplitude, so a linear gain scales the
+    # percentage by its cube root (-12 dB on 100% is 63%, not 25%)
+    return volume * gain ** (1 / 3)
+
+class Ducker:
+    def __init__(self, settings, apply_gain):
+        self.settings = settings
+        self.apply_gain = apply_gain
+        self.followers = []
+        self.levels = {}
+        self.gain = 1.0
+        self.sent_gain = 1.0
+        self.last_update = time.monotonic()
+        self.active = False
+        self.lock = threading.Lock()
+
+    def available(self):
+        return np is not None
+
+    def start(self, devices):
+        self.stop()
+        if not self.available() or not devices:
+            return False
+        self.last_update = time.monotonic()
+        with self.lock:
+            self.active = True
+        for device in devices:
+            follower = EnvelopeFollower(device, self.on_level)
+            follower.start()
+            self.followers.append(follower)
+        return True
+
+    def stop(self):
+        # Levels still in flight are dropped first; the followers are then
+        # joined and reaped, and only after that is the gain put back to 1.0
+        with self.lock:
+            self.active = False
+        for follower in self.followers:
+            follower.stop()
+        for follower in self.followers:
+            follower.join(1.0)
+        self.followers = []
+        with self.lock:
+            self.levels = {}
+            self.gain = 1.0
+            if self.sent_gain != 1.0:
+                self.sent_gain = 1.0
+                self.apply_gain(1.0)
+
+    def on_level(self, device, level_db):
+        with self.lock:
+            if not self.active:
+                return
+            self.levels[device] = level_db
+            now = time.monotonic()
+            dt = now - self.last_update
+            self.last_update = now
+            active = max(self.levels.values()) > self.settings["threshold_db"]
+            target = 10 ** (self.settings["amount_db"] / 20) if active else 1.0
+            tau = self.settings["attack_ms"] if target < self.gain else self.settings["release_ms"]
+            coef = math.exp(-dt * 1000 / max(1, tau))
+            self.gain = target + (self.gain - target) * coef
+            # Only whole-percent steps reach the server
+            if abs(self.gain - self.sent_gain) >= 0.01 or (target == 1.0 and self.gain > 0.995 and self.sent_gain != 1.0):
+                self.sent_gain = 1.0 if self.gain > 0.995 else self.gain
+                self.apply_gain(self.sent_gain)
+
+class ByteRing:
+    # Fixed-size byte ring shared by one capture thread and the writer thread.
+    # The storage is allocated once; overflow drops the newest audio and is
+    # counted instead of growing memory. Dropped spans are remembered by
+    # stream position and read back as silence, so later audio keeps its
+    # place on the timeline.
+    def __init__(self, capacity):
+        self.buf = bytearray(capacity)
+        self.view = memoryview(self.buf)
+        self.capacity = capacity
+        self.head = 0
+        self.fill = 0
+        self.dropped = 0
+        self.gaps = collections.deque()
+        self.read_pos = 0
+        self.write_pos = 0
+        self.lock = threading.Lock()
+
+    def write(self, data):
+        with self.lock:
+            n = min(len(data), self.capacity - self.fill)
+            tail = (self.head + self.fill) % self.capacity
+            first = min(n, self.capacity - tail)
+            self.view[tail:tail + first] = data[:first]
+            self.view[:n - first] = data[first:n]
+            self.fill += n
+            self.write_pos += n
+            lost = len(data) - n
+            if lost:
+                self.dropped += lost
+                if self.gaps and self.gaps[-1][0] + self.gaps[-1][1] == self.write_pos:
+                    self.gaps[-1][1] += lost
+                else:
+                    self.gaps.append([self.write_pos, lost])
+                self.write_pos += lost
+            return n
+
+    def pending(self):
+        # Stream bytes not read yet, silence for dropped spans included
+        with self.lock:
+            return self.write_pos - self.read_pos
+
+    def read(self, limit):
+        with self.lock:
+            parts = []
+            while limit > 0:
+                if self.gaps and self.gaps[0][0] == self.read_pos:
+                    n = min(limit, self.gaps[0][1])
+                    parts.append(bytes(n))
+                    self.gaps[0][0] += n
+                    self.gaps[0][1] -= n
+                    if not self.gaps[0][1]:
+                        self.gaps.popleft()
+                else:
+                    n = min(limit, self.fill)
+                    if self.gaps:
+                        n = min(n, self.gaps[0][0] - self.read_pos)
+                    if not n:
+                        break
+                    first = min(n, self.capacity - self.head)
+                    parts.append(bytes(self.view[self.head:self.head + first]))
+                    parts.append(bytes(self.view[:n - first]))
+                    self.head = (self.head + n) % self.capacity
+                    self.fill -= n
+                self.read_pos += n
+                limit -= n
+            return b"".join(parts)
+
+class CaptureTrack(threading.Thread):
+    # Reads one source into its ring. Nothing is kept until the recorder sets
+    # a shared start time; the first kept block is then trimmed or padded by
+    # its arrival time so every track starts on the same sample.
+    def __init__(self, name, device, recorder):
+        super().__init__(daemon=True)
+        self.name = name
+        self.device = device
+        self.recorder = recorder
+        self.ring = ByteRing(REC_RATE * REC_FRAME_BYTES * REC_RING_SECONDS)
+        self.frames = 0
+        # running: audio has arrived; ended: the reader is gone. failed says
+        # why a track stopped on its own and keeps it out of the final cut.
+        self.running = threading.Event()
+        self.ended = threading.Event()
+        self.failed = None
+        self.proc = None
+        self.stopped = False
+
+    def run(self):
+        try:
+            proc = subprocess.Popen(
+                ["parec", "--raw", "--format=s16le", f"--channels={REC_CHANNELS}", f"--rate={REC_RATE}",
+                 f"--latency-msec={REC_BLOCK_MS}", f"--device={self.device}"],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except:
+            self.failed = "parec did not start"
+            self.ended.set()
+            self.recorder.wake.set()
+            return
+        self.proc = proc
+        if self.stopped:
+            proc.terminate()
+        try:
+            self.capture(proc)
+        finally:
+            proc.stdout.close()
+            try:
+                proc.wait(1.0)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+            if not self.stopped and self.failed is None:
+                self.failed = "capture ended early" if self.running.is_set() else "no audio"
+            self.ended.set()
+            self.recorder.wake.set()
+
+    def capture(self, proc):
+        block = bytearray(REC_RATE * REC_BLOCK_MS // 1000 * REC_FRAME_BYTES)
+        view = memoryview(block)
+        aligned = False
+        while not self.stopped:
+            n = proc.stdout.readinto(block)
+            now = time.monotonic()
+            if not n:
+                break
+            self.running.set()
+            start = self.recorder.start_time
+            if start is None:
+                continue
+            n -= n % REC_FRAME_BYTES
+            data = view[:n]
+            if not aligned:
+                aligned = True
+                block_frames = n // REC_FRAME_BYTES
+                after_start = int(round((now - start) * REC_RATE))
+                if after_start > block_frames:
+                    self.ring.write(bytes((after_start - block_frames) * REC_FRAME_BYTES))
+                    self.frames += after_start - block_frames
+                else:
+                    data = view[(block_frames - max(0, after_start)) * REC_FRAME_BYTES:n]
+            self.frames += len(data) // REC_FRAME_BYTES
+            self.ring.write(data)
+            if self.ring.pending() >= REC_WRITE_BYTES:
+                self.recorder.wake.set()
+
+    def stop(self):
+        self.stopped = True
+        proc = self.proc
+        if proc is not None:
+            try:
+                proc.terminate()
+                proc.wait(1.0)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+            except OSError:
+                pass
+
+class TrackFile:
+    def __init__(self, path, fmt):
+        self.path = path
+        self.proc = None
+        self.wav = None
+        if fmt == "flac":
+            self.proc = subprocess.Popen(
+                ["flac", "--silent", "--force", "--force-raw-format", "--endian=little", "--sign=signed",
+                 f"--channels={REC_CHANNELS}", "--bps=16", f"--sample-rate={REC_RATE}", "-o", path, "-"],
+                stdin=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        else:
+            self.wav = wave.open(path, "wb")
+            self.wav.setnchannels(REC_CHANNELS)
+            self.wav.setsampwidth(2)
+            self.wav.setframerate(REC_RATE)
+
+    def write(self, data):
+        if self.wav is not None:
+            self.wav.writeframesraw(data)
+        else:
+            self.proc.stdin.write(data)
+
+    def close(self):
+        if self.wav is not None:
+            self.wav.close()
+        else:
+            self.proc.stdin.close()
+            self.proc.wait()
+
+class Recorder:
+    # Multitrack capture: one parec reader per source feeding a preallocated
+    # ring, and a single I/O thread draining the rings in large sequential
+    # writes. Tracks share one start time and are cut to the same length;
+    # a source that never streams or dies midway is left out of the cut and
+    # reported instead of holding every other track back.
+    def __init__(self):
+        self.tracks = []
+        self.files = {}
+        self.start_time = None
+        self.wake = threading.Event()
+        self.writer = None
+        self.stopping = False
+        self.closing = False
+        self.folder = None
+
+    def recording(self):
+        return self.writer is not None and not self.closing
+
+    def finishing(self):
+        # Stopped, but the last writes and encoder shutdown are still running
+        return self.writer is not None and self.closing
+
+    def flac_available(self):
+        return shutil.which("flac") is not None
+
+    def start(self, sources, folder, fmt):
+        if self.writer is not None or not sources:
+            return False
+        if fmt == "flac" and not self.flac_available():
+            fmt = "wav"
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.start_time = None
+        self.stopping = False
+        self.closing = False
+        self.tracks = [CaptureTrack(name, device, self) for name, device in sources]
+        for track in self.tracks:
+            track.start()
+        self.writer = threading.Thread(target=self.write_loop, args=(fmt,), daemon=True)
+        self.writer.start()
+        return True
+
+    def write_loop(self, fmt):
+        # Start the shared clock once every reader is streaming, so no track
+        # begins with its server-side startup latency. A reader that is
+        # still silent after REC_START_TIMEOUT gets no file at all.
+        deadline = time.monotonic() + REC_START_TIMEOUT
+        for track in self.tracks:
+            while not track.running.is_set() and not track.ended.is_set() and time.monotonic() < deadline:
+                track.ended.wait(0.02)
+            if not track.running.is_set():
+                track.failed = track.failed or "no audio"
+                track.stop()
+        live = [track for track in self.tracks if track.running.is_set()]
+        self.files = {track.name: TrackFile(os.path.join(self.folder, f"{track.name}.{fmt}"), fmt) for track in live}
+        self.start_time = time.monotonic()
+        written = {track.name: 0 for track in live}
+        while not self.stopping:
+            self.wake.wait(0.5)
+            self.wake.clear()
+            # No track is written past what the slowest healthy one has
+            # captured, so cutting to the shortest never takes bytes back.
+            # A failed track is drained as far as it got.
+            horizon = min((track.ring.write_pos for track in live if track.failed is None), default=0)
+            for track in live:
+                limit = horizon if track.failed is None else track.ring.write_pos
+                if limit - written[track.name] >= REC_WRITE_BYTES:
+                    data = track.ring.read(REC_WRITE_BYTES)
+                    self.files[track.name].write(data)
+                    written[track.name] += len(data)
+        # Every reader has stopped: cut the healthy tracks to the shortest
+        total = self.length() * REC_FRAME_BYTES
+        for track in live:
+            remaining = (total if track.failed is None else track.frames * REC_FRAME_BYTES) - written[track.name]
+            while remaining > 0:
+                data = track.ring.read(remaining)
+                if not data:
+                    break
+                self.files[track.name].write(data)
+                remaining -= len(data)
+            self.files[track.name].close()
+
+    def length(self):
+        # Frames every healthy track has captured
+        return min((track.frames for track in self.tracks if track.failed is None), default=0)
+
+    def stop(self, done=None, timeout=None):
+        # Readers, the last writes and the encoders are shut down on their
+        # own thread; done(report) runs there once the files are complete.
+        # Pass a timeout to wait for it (at exit).
+        if not self.recording():
+            return False
+        self.closing = True
+        tracks = self.tracks
+        def finish():
+            for track in tracks:
+                track.stop()
+            for track in tracks:
+                track.join(1.0)
+            self.stopping = True
+            self.wake.set()
+            self.writer.join()
+            report = {
+                "folder": self.folder,
+                "seconds": self.length() / REC_RATE,
+                "dropped": {track.name: track.ring.dropped // REC_FRAME_BYTES for track in tracks if track.ring.dropped},
+                "failed": {track.name: track.failed for track in tracks if track.failed},
+            }
+            self.tracks = []
+            self.files = {}
+            self.writer = None
+            if done:
+                done(report)
+        finisher = threading.Thread(target=finish, daemon=True)
+        finisher.start()
+        if timeout is not None:
+            finisher.join(timeout)
+        return True
+
+    def status(self):
+        if not self.recording():
+            return None
+        return {
+            "seconds": self.length() / REC_RATE,
+            "dropped": sum(track.ring.dropped for track in self.tracks) // REC_FRAME_BYTES,
+            "failed": {track.name: track.failed for track in self.tracks if track.failed},
+        }
+
+class ReplayBuffer:
+    # Keeps the last N seconds of one source in a numpy ring allocated once.
+    # parec hands over 100 ms blocks, so capture is a single slice copy per
+    # block; saving copies the ring under the lock and encodes elsewhere.
+    def __init__(self):
+        self.device = None
+        self.ring = None
+        self.pos = 0
+        self.filled = 0
+        self.proc = None
+        self.thread = None
+        self.halt = None
+        self.lock = threading.Lock()
+
+    def available(self):
+        return np is not None
+
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, device, seconds):
+        self.stop()
+        if not self.available():
+            return False
+        frames = REC_RATE * max(1, int(seconds))
+        if self.ring is None or self.ring.shape[0] != frames:
+            self.ring = np.zeros((frames, REC_CHANNELS), dtype=np.int16)
+        self.pos = 0
+        self.filled = 0
+        self.device = device
+        self.halt = threading.Event()
+        self.thread = threading.Thread(target=self.capture, args=(device, self.halt), daemon=True)
+        self.thread.start()
+        return True
+
+    def capture(self, device, halt):
+        # The process is only ever used through this local; stop() gets it
+        # under the lock, so it is either never started or always reaped.
+        with self.lock:
+            if halt.is_set():
+                return
+            try:
+                proc = subprocess.Popen(
+                    ["parec", "--raw", "--format=s16le", f"--channels={REC_CHANNELS}", f"--rate={REC_RATE}",
+                     f"--latency-msec={REPLAY_BLOCK_MS}", f"--device={device}"],
+                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            except:
+                return
+            self.proc = proc
+        try:
+            self._read(proc, halt)
+        finally:
+            proc.stdout.close()
+            proc.wait()
+
+    def _read(self, proc, halt):
+        block = np.empty((REC_RATE * REPLAY_BLOCK_MS // 1000, REC_CHANNELS), dtype=np.int16)
+        raw = memoryview(block).cast("B")
+        size = self.ring.shape[0]
+        while not halt.is_set():
+            try:
+                n = proc.stdout.readinto(raw)
+            except (OSError, ValueError):
+                break
+            if not n:
+                break
+            frames = n // REC_FRAME_BYTES
+            with self.lock:
+                if halt.is_set():
+                    break
+                first = min(frames, size - self.pos)
+                self.ring[self.pos:self.pos + first] = block[:first]
+                self.ring[:frames - first] = block[first:frames]
+                self.pos = (self.pos + frames) % size
+                self.filled = min(size, self.filled + frames)
+
+    def snapshot(self):
+        with self.lock:
+            if not self.filled:
+                return None
+            if self.filled < self.ring.shape[0]:
+                return self.ring[:self.filled].copy()
+            return np.concatenate((self.ring[self.pos:], self.ring[:self.pos]))
+
+    def save(self, path, fmt, done=None):
+        # Encoding runs on its own thread; capture keeps going meanwhile
+        data = self.snapshot()
+        if data is None:
+            return False
+        def encode():
+            track = TrackFile(path, fmt)
+            track.write(data.tobytes())
+            track.close()
+            if done:
+                done(path, data.shape[0] / REC_RATE)
+        threading.Thread(target=encode, daemon=True).start()
+        return True
+
+    def stop(self):
+        if self.halt is None:
+            return
+        with self.lock:
+            self.halt.set()
+            proc, self.proc = self.proc, None
+        if proc is not None:
+            try:
+                proc.terminate()
+                proc.wait(1.0)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+            except OSError:
+                pass
+        if self.thread is not None:
+            self.thread.join(1.0)
+            self.thread = None
+        self.halt = None
+
+class MidiController:
+    # Raw MIDI input (a /dev/snd/midi* node, snd-virmidi included, or any fd
+    # pair). The reader thread only parses and records: faders keep just
+    # their newest value, buttons are queued in order, and a dispatcher
+    # thread hands them to on_control at most every MIDI_DISPATCH_MS.
+    # Feedback for motor faders and LEDs goes out on the dispatcher too.
+    def __init__(self, mapping, on_control):
+        self.mapping = mapping
+        self.on_control = on_control
+        self.learn = None
+        self.read_fd = None
+        self.write_fd = None
+        self.status = None
+        self.data = []
+        self.latest = {}
+        self.buttons = collections.deque()
+        self.feedback = {}
+        self.last_input = {}
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        # Per run: its own halt event and a self-pipe that wakes the reader
+        # out of select, so a reader from an earlier run can never pick up
+        # a later run's (possibly reused) fd.
+        self.halt = None
+        self.stop_pipe = None
+        self.threads = []
+        self.received = 0
+        self.dispatched = 0
+
+    @staticmethod
+    def devices():
+        return sorted(glob.glob(MIDI_DEVICE_GLOB))
+
+    def running(self):
+        return self.halt is not None and not self.halt.is_set()
+
+    def start(self, device=None, fds=None):
+        self.stop()
+        try:
+            if fds is not None:
+                self.read_fd, self.write_fd = fds
+            else:
+                self.read_fd = os.open(device, os.O_RDWR)
+                self.write_fd = self.read_fd
+        except OSError:
+            return False
+        self.stop_pipe = os.pipe()
+        self.halt = threading.Event()
+        self.wake = threading.Event()
+        self.status = None
+        self.data = []
+        self.threads = [
+            threading.Thread(target=self.read_loop, args=(self.read_fd, self.stop_pipe[0], self.halt, self.wake), daemon=True),
+            threading.Thread(target=self.dispatch_loop, args=(self.write_fd, self.halt, self.wake), daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+        return True
+
+    def stop(self):
+        if not self.running():
+            return
+        with self.lock:
+            # Under the lock so the dispatcher can't be mid-write to write_fd
+            self.halt.set()
+        os.write(self.stop_pipe[1], b"\0")
+        self.wake.set()
+        reader, dispatcher = self.threads
+        reader.join()
+        dispatcher.join(1.0)
+        for fd in {self.read_fd, self.write_fd, *self.stop_pipe}:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self.threads = []
+
+    def parse(self, data):
+        for byte in data:
+            if byte >= 0xF8:
+                continue
+            if byte & 0x80:
+                # SysEx and system common messages are skipped whole
+                self.status = byte if byte < 0xF0 else None
+                self.data = []
+                continue
+            if self.status is None:
+                continue
+            self.data.append(byte)
+            kind = self.status & 0xF0
+            ch = self.status & 0x0F
+            if len(self.data) < (1 if kind in (0xC0, 0xD0) else 2):
+                continue
+            d, self.data = self.data, []
+            if kind == 0xB0:
+                yield f"cc:{ch}:{d[0]}", d[1] / 127
+            elif kind == 0xE0:
+                yield f"pb:{ch}", ((d[1] << 7) | d[0]) / 16383
+            elif kind == 0x90:
+                yield f"note:{ch}:{d[0]}", d[1] / 127
+            elif kind == 0x80:
+                yield f"note:{ch}:{d[0]}", 0.0
+
+    def read_loop(self, fd, stop_fd, halt, wake):
+        while not halt.is_set():
+            try:
+                ready = select.select([fd, stop_fd], [], [])[0]
+                if stop_fd in ready:
+                    break
+                data = os.read(fd, 256)
+            except OSError:
+                break
+            if not data:
+                break
+            now = time.monotonic()
+            with self.lock:
+                for key, value in self.parse(data):
+                    self.received += 1
+                    if self.learn is not None:
+                        learn, self.learn = self.learn, None
+                        learn(key)
+                        continue
+                    action = self.mapping.get(key)
+                    if not action:
+                        continue
+                    self.last_input[key] = now
+                    if action.get("action") in MIDI_CONTINUOUS:
+                        self.latest[key] = value
+                    else:
+                        self.buttons.append((key, value))
+            wake.set()
+
+    def dispatch_loop(self, fd, halt, wake):
+        while not halt.is_set():
+            wake.wait()
+            wake.clear()
+            if halt.is_set():
+                break
+            with self.lock:
+                latest, self.latest = self.latest, {}
+                buttons = list(self.buttons)
+                self.buttons.clear()
+                feedback, self.feedback = self.feedback, {}
+            for key, value in buttons:
+                self.dispatched += 1
+                self.on_control(key, value)
+            for key, value in latest.items():
+                self.dispatched += 1
+                self.on_control(key, value)
+            if feedback:
+                out = b"".join(self.encode(key, value) for key, value in feedback.items())
+                with self.lock:
+                    if halt.is_set():
+                        break
+                    try:
+                        os.write(fd, out)
+                    except OSError:
+                        pass
+            time.sleep(MIDI_DISPATCH_MS / 1000)
+
+    def send_feedback(self, key, value):
+        # Skipped while the control itself is moving, so motor faders don't
+        # fight the hand on them.
+        if not self.running():
+            return
+        with self.lock:
+            if time.monotonic() - self.last_input.get(key, 0) < MIDI_ECHO_MS / 1000:
+                return
+            self.feedback[key] = value
+        self.wake.set()
+
+    @staticmethod
+    def encode(key, value):
+        parts = key.split(":")
+        ch = int(parts[1])
+        if parts[0] == "cc":
+            return bytes([0xB0 | ch, int(parts[2]), int(round(value * 127))])
+        if parts[0] == "pb":
+            v = int(round(value * 16383))
+            return bytes([0xE0 | ch, v & 0x7F, v >> 7])
+        return bytes([0x90 | ch, int(parts[2]), 127 if value else 0])
+
+class SyncScheduler:
+    # Each object class gets its own poll interval: fast after a change or user
+    # interaction, doubling up to slow_ms while nothing changes.
+    def __init__(self, fast_ms=SYNC_FAST_MS, slow_ms=SYNC_SLOW_MS):
+        self.fast_ms = fast_ms
+        self.slow_ms = slow_ms
+        now = time.monotonic()
+        self.intervals = {c: fast_ms for c in SYNC_CLASSES}
+        self.due = {c: now for c in SYNC_CLASSES}
+
+    def poke(self, classes=SYNC_CLASSES):
+        soon = time.monotonic() + self.fast_ms / 1000
+        for c in classes:
+            if c not in self.intervals:
+                continue
+            self.intervals[c] = self.fast_ms
+            self.due[c] = min(self.due[c], soon)
+
+    def due_classes(self):
+        now = time.monotonic()
+        return tuple(c for c in SYNC_CLASSES if self.due[c] <= now)
+
+    def report(self, cls, changed):
+        if changed:
+            self.intervals[cls] = self.fast_ms
+        else:
+            self.intervals[cls] = min(self.slow_ms, self.intervals[cls] * 2)
+        self.due[cls] = time.monotonic() + self.intervals[cls] / 1000
+
+    def set_slow_ms(self, slow_ms):
+        self.slow_ms = slow_ms
+        for c in SYNC_CLASSES:
+            self.intervals[c] = min(self.intervals[c], slow_ms)
+
+    def next_delay_ms(self):
+        now = time.monotonic()
+        delay = min(self.due.values()) - now
+        return max(0, min(self.slow_ms, int(delay * 1000)))
 
 class HotkeyEdit(QLineEdit):
     hotkeyChanged = pyqtSignal(str)
@@ -136,49 +3054,52 @@ class SpacedComboBox(QComboBox):
         popup.move(rect.x(), rect.y() + 4)
 
 class DraggableAppLabel(QFrame):
-    def __init__(self, name, app_id, icon_name, parent_app):
+    def __init__(self, name, app_id, icon_name, parent_app, card=None):
         super().__init__()
+        self.name = name
         self.app_id = app_id
         self.parent_app = parent_app
-
-        self.setStyleSheet(f"""
-            QFrame {{
-                background: {THEME['CardAlt']};
-                border: 1px solid {THEME['Stroke']};
-                border-radius: 8px;
-            }}
-            QFrame:hover {{
-                background: #262B3B;
-                border: 1px solid {THEME['Accent']};
-            }}
-        """)
+        self.card = card
+        self.setObjectName("AppLabel")
+        self.set_selected(card is not None and app_id in card.selected_ids)
 
         layout = QHBoxLayout(self)
         layout.setContentsMargins(10, 8, 10, 8)
         layout.setSpacing(10)
 
         icon_label = QLabel()
-        icon = QIcon.fromTheme(icon_name)
-        if icon.isNull():
-            icon = QIcon.fromTheme("audio-card")
-        pixmap = icon.pixmap(QSize(20, 20))
-        icon_label.setPixmap(pixmap)
-        icon_label.setStyleSheet("border: none; background: transparent;")
+        icon_label.setPixmap(parent_app.icons.pixmap(icon_name))
         layout.addWidget(icon_label)
 
         text_label = QLabel(name[:18])
-        text_label.setStyleSheet(f"color: {THEME['Text']}; font-size: 11px; font-weight: 600; border: none; background: transparent;")
         layout.addWidget(text_label)
         layout.addStretch()
 
         self.setCursor(Qt.CursorShape.PointingHandCursor)
 
+    def set_selected(self, selected):
+        self.selected = selected
+        set_style_state(self, "selected", selected)
+
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
+            # Ctrl-click toggles one app, Shift-click selects the range from
+            # the last clicked one (Ctrl+Shift adds it); dragging a selected
+            # app carries the whole selection in one drop.
+            modifiers = event.modifiers()
+            if self.card is not None and modifiers & Qt.KeyboardModifier.ShiftModifier:
+                self.card.select_range(self.app_id, extend=bool(modifiers & Qt.KeyboardModifier.ControlModifier))
+                return
+            if self.card is not None and modifiers & Qt.KeyboardModifier.ControlModifier:
+                self.card.toggle_selected(self.app_id)
+                return
+            ids = [self.app_id]
+            if self.card is not None and self.app_id in self.card.selected_ids:
+                ids = list(self.card.selected_ids)
             self.parent_app.is_dragging_app = True
             drag = QDrag(self)
             mime_data = QMimeData()
-            mime_data.setText(str(self.app_id))
+            mime_data.setText(" ".join(str(i) for i in ids))
             drag.setMimeData(mime_data)
 
             pix = self.grab()
@@ -187,8 +3108,34 @@ class DraggableAppLabel(QFrame):
 
             drag.exec(Qt.DropAction.MoveAction)
             self.parent_app.is_dragging_app = False
+            if self.card is not None:
+                self.card.selected_ids.clear()
+            # App lists were frozen during the drag; this rebuild also
+            # deletes this label, so nothing may touch self afterwards.
+            self.parent_app.refresh_app_lists()
+
+    def contextMenuEvent(self, event):
+        menu = QMenu(self)
+        current = self.card.name if self.card is not None else None
+        for target in self.parent_app.sinks:
+            if target == current:
+                continue
+            label = self.parent_app.channel_labels.get(target, target)
+            action = menu.addAction(f"Move all {self.name[:18]} streams to {label}")
+            action.triggered.connect(lambda checked=False, t=target: self.parent_app.move_apps_to_sink(self.parent_app.app_stream_ids(self.name), t))
+        if self.card is not None and len(self.card.selected_ids) > 1:
+            menu.addSeparator()
+            for target in self.parent_app.sinks:
+                if target == current:
+                    continue
+                label = self.parent_app.channel_labels.get(target, target)
+                action = menu.addAction(f"Move {len(self.card.selected_ids)} selected to {label}")
+                action.triggered.connect(lambda checked=False, t=target: self.parent_app.move_apps_to_sink(list(self.card.selected_ids), t))
+        menu.exec(event.globalPos())
 
 class ChannelState:
+    __slots__ = ("name", "volume", "stream_volume", "muted", "stream_muted", "apps")
+
     def __init__(self, name):
         self.name = name
         self.volume = 0
@@ -197,6 +3144,844 @@ class ChannelState:
         self.stream_muted = False
         self.apps = []
 
+class StateStore:
+    # Channel state and hotkeys shared by the GUI, sync and hotkey threads.
+    # Every write goes through this API under one lock; each effective write
+    # bumps the version and publishes {channel: {fields}} with its origin
+    # ("user", "sync" or "config"), batched writes publishing once. The lock
+    # only covers the write itself: subscribers run after it is released,
+    # under a separate delivery lock so versions arrive in order.
+    def __init__(self, names):
+        self.channels = {name: ChannelState(name) for name in names}
+        self.hotkeys = {}
+        self.version = 0
+        self.lock = threading.RLock()
+        self.delivery = threading.RLock()
+        self.subscribers = []
+        self.local = threading.local()
+        # Write sequence, and the sequence of each field's last write, so a
+        # read-back can leave alone what changed after it started reading
+        self.seq = 0
+        self.field_seq = {}
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def _write(self, name, fields, since=None):
+        # Caller holds the lock. With since, fields written after that
+        # sequence number are skipped.
+        ch = self.channels.get(name)
+        if ch is None:
+            return set()
+        changed = set()
+        for field, value in fields.items():
+            if since is not None and self.field_seq.get((name, field), 0) > since:
+                continue
+            if getattr(ch, field) != value:
+                setattr(ch, field, value)
+                self.seq += 1
+                self.field_seq[(name, field)] = self.seq
+                changed.add(field)
+        return changed
+
+    def update(self, name, origin="user", since=None, **fields):
+        with self.lock:
+            changed = self._write(name, fields, since)
+        if changed:
+            self._record({name: changed}, origin)
+        return changed
+
+    def adjust(self, name, field, delta, lo=0, hi=100):
+        with self.lock:
+            value = max(lo, min(hi, getattr(self.channels[name], field) + delta))
+            changed = self._write(name, {field: value})
+        if changed:
+            self._record({name: changed}, "user")
+        return value
+
+    def toggle(self, name, field):
+        with self.lock:
+            value = not getattr(self.channels[name], field)
+            changed = self._write(name, {field: value})
+        if changed:
+            self._record({name: changed}, "user")
+        return value
+
+    def set_hotkey(self, name, action, value):
+        with self.lock:
+            self.hotkeys.setdefault(name, {"up": "", "down": "", "mute": "", "stream_up": "", "stream_down": "", "stream_mute": ""})
+            changed = self.hotkeys[name].get(action) != value
+            if changed:
+                self.hotkeys[name][action] = value
+        if changed:
+            self._record({name: {"hotkeys"}}, "user")
+
+    def hotkey_snapshot(self):
+        with self.lock:
+            return {name: dict(acts) for name, acts in self.hotkeys.items()}
+
+    @contextmanager
+    def batch(self, origin="user"):
+        # Per thread and lock-free: this thread's writes collect here while
+        # other threads keep writing (and publishing) on their own.
+        outer = getattr(self.local, "pending", None) is None
+        if outer:
+            self.local.pending = {}
+        try:
+            yield self
+        finally:
+            if outer:
+                changes, self.local.pending = self.local.pending, None
+                if changes:
+                    self._publish(changes, origin)
+
+    def _record(self, changes, origin):
+        pending = getattr(self.local, "pending", None)
+        if pending is not None:
+            for name, fields in changes.items():
+                pending.setdefault(name, set()).update(fields)
+            return
+        self._publish(changes, origin)
+
+    def _publish(self, changes, origin):
+        # Writers only wait here for each other, never inside the state lock
+        with self.delivery:
+            with self.lock:
+                self.version += 1
+                version = self.version
+            for callback in self.subscribers:
+                callback(version, changes, origin)
+
+def ws_frame(payload, opcode=1, mask=False):
+    # Servers send plain frames; clients must mask theirs
+    head = bytearray([0x80 | opcode])
+    bit = 0x80 if mask else 0
+    if len(payload) < 126:
+        head.append(bit | len(payload))
+    elif len(payload) < 65536:
+        head.append(bit | 126)
+        head += len(payload).to_bytes(2, "big")
+    else:
+        head.append(bit | 127)
+        head += len(payload).to_bytes(8, "big")
+    if mask:
+        key = os.urandom(4)
+        return bytes(head) + key + bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+    return bytes(head) + payload
+
+async def ws_accept(reader, writer, authorize=None):
+    # Server side of the opening handshake; returns the request path, or
+    # None after answering with an error.
+    try:
+        request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        writer.close()
+        return None
+    lines = request.decode("latin-1").split("\r\n")
+    parts = lines[0].split(" ")
+    path = parts[1] if len(parts) > 1 else "/"
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+    ws_key = headers.get("sec-websocket-key")
+    if not ws_key or "websocket" not in headers.get("upgrade", "").lower():
+        writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+        writer.close()
+        return None
+    if authorize is not None and not authorize(path):
+        writer.write(b"HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\n\r\n")
+        writer.close()
+        return None
+    accept = base64.b64encode(hashlib.sha1((ws_key + WS_GUID).encode()).digest()).decode()
+    writer.write(f"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Accept: {accept}\r\n\r\n".encode())
+    return path
+
+async def ws_connect(host, port, path="/"):
+    reader, writer = await asyncio.open_connection(host, port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode())
+    response = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+    expected = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+    if b" 101 " not in response.split(b"\r\n", 1)[0] or expected.encode() not in response:
+        writer.close()
+        raise ConnectionError("websocket handshake refused")
+    return reader, writer
+
+async def ws_read_frame(reader, masked=True):
+    _, opcode, payload = await ws_read_raw_frame(reader, masked)
+    return opcode, payload
+
+async def ws_read_message(reader, masked=True, on_ping=None):
+    # One whole message: a FIN-clear frame and its continuation frames are
+    # joined. Control frames may arrive between fragments; pings go to
+    # on_ping so the message in progress survives them, and close and pong
+    # frames are returned as they come.
+    opcode = None
+    parts = []
+    size = 0
+    while True:
+        fin, op, payload = await ws_read_raw_frame(reader, masked)
+        if op & 0x08:
+            if not fin:
+                raise ValueError("fragmented control frame")
+            if op == 9 and on_ping is not None:
+                on_ping(payload)
+                continue
+            return op, payload
+        if op == 0:
+            if opcode is None:
+                raise ValueError("continuation without a message")
+        elif opcode is not None:
+            raise ValueError("new message inside a fragmented one")
+        else:
+            opcode = op
+        parts.append(payload)
+        size += len(payload)
+        if size > WS_MAX_MESSAGE:
+            raise ValueError("message too large")
+        if fin:
+            return opcode, b"".join(parts)
+
+async def ws_read_raw_frame(reader, masked=True):
+    head = await reader.readexactly(2)
+    fin = bool(head[0] & 0x80)
+    opcode = head[0] & 0x0F
+    length = head[1] & 0x7F
+    if bool(head[1] & 0x80) != masked:
+        raise ValueError("bad frame mask")
+    if length == 126:
+        length = int.from_bytes(await reader.readexactly(2), "big")
+    elif length == 127:
+        length = int.from_bytes(await reader.readexactly(8), "big")
+    if length > WS_MAX_MESSAGE:
+        raise ValueError("frame too large")
+    mask = await reader.readexactly(4) if masked else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return fin, opcode, payload
+
+class RemoteClient:
+    # Outgoing frames go through a small bounded queue. A client that falls
+    # behind loses queued diffs and gets one fresh snapshot instead, so a
+    # slow phone never holds up the other clients or the mixer.
+    def __init__(self, writer):
+        self.writer = writer
+        self.queue = asyncio.Queue(REMOTE_QUEUE)
+        self.stale = False
+
+    def send(self, frame):
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.stale = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+
+    async def pump(self, server):
+        while True:
+            if self.stale and self.queue.empty():
+                self.stale = False
+                self.queue.put_nowait(ws_frame(json.dumps(server.snapshot()).encode()))
+            frame = await self.queue.get()
+            self.writer.write(frame)
+            await self.writer.drain()
+
+class ControlServer:
+    # WebSocket control surface on its own asyncio thread. Store change sets
+    # are merged for REMOTE_FLUSH_MS, encoded once and fanned out to every
+    # client; commands are handed to on_command and never run on this loop.
+    def __init__(self, store, on_command, extra_state=None, levels=None):
+        self.store = store
+        self.on_command = on_command
+        self.extra_state = extra_state
+        self.levels = levels
+        self.loop = None
+        self.thread = None
+        self.server = None
+        self.clients = set()
+        self.pending = {}
+        self.flush_scheduled = False
+        self.token = ""
+
+    def running(self):
+        return self.server is not None
+
+    def start(self, host, port, token=""):
+        self.stop()
+        self.token = token
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(host, port, ready), daemon=True)
+        self.thread.start()
+        ready.wait(2.0)
+        return self.running()
+
+    def _run(self, host, port, ready):
+        loop = asyncio.new_event_loop()
+        try:
+            self.server = loop.run_until_complete(asyncio.start_server(self._handle, host, port))
+        except OSError:
+            ready.set()
+            loop.close()
+            return
+        self.loop = loop
+        ready.set()
+        levels_task = loop.create_task(self._levels_loop()) if self.levels else None
+        loop.run_forever()
+        if levels_task:
+            levels_task.cancel()
+        self.server.close()
+        for client in list(self.clients):
+            client.writer.close()
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+
+    def stop(self):
+        loop = self.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+        if self.thread is not None:
+            self.thread.join(2.0)
+        self.thread = None
+        self.loop = None
+        self.server = None
+        self.clients = set()
+
+    def publish(self, version, changes, origin=None):
+        # Any thread: only hands the change set over to the loop
+        loop = self.loop
+        if loop is not None and self.clients:
+            loop.call_soon_threadsafe(self._merge, changes)
+
+    def publish_state(self):
+        loop = self.loop
+        if loop is not None and self.clients:
+            loop.call_soon_threadsafe(lambda: self._broadcast(dict(self.extra_state() if self.extra_state else {}, type="state")))
+
+    def _merge(self, changes):
+        for name, fields in changes.items():
+            self.pending.setdefault(name, set()).update(fields)
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.loop.call_later(REMOTE_FLUSH_MS / 1000, self._flush)
+
+    def _flush(self):
+        self.flush_scheduled = False
+        pending, self.pending = self.pending, {}
+        diff = {}
+        with self.store.lock:
+            version = self.store.version
+            for name, fields in pending.items():
+                ch = self.store.channels.get(name)
+                values = {f: getattr(ch, f) for f in fields if f in REMOTE_FIELDS} if ch else {}
+                if values:
+                    diff[name] = values
+        if diff:
+            self._broadcast({"type": "diff", "version": version, "channels": diff})
+
+    def _broadcast(self, message):
+        frame = ws_frame(json.dumps(message).encode())
+        for client in list(self.clients):
+            client.send(frame)
+
+    async def _levels_loop(self):
+        last = None
+        while True:
+            await asyncio.sleep(REMOTE_LEVELS_MS / 1000)
+            if not self.clients:
+                continue
+            levels = {name: round(db, 1) for name, db in self.levels().items()}
+            if levels and levels != last:
+                last = levels
+                self._broadcast({"type": "levels", "levels": levels})
+
+    def snapshot(self):
+        with self.store.lock:
+            channels = {name: {f: getattr(ch, f) for f in REMOTE_FIELDS} for name, ch in self.store.channels.items()}
+            message = {"type": "snapshot", "version": self.store.version, "channels": channels}
+        if self.extra_state:
+            message.update(self.extra_state())
+        return message
+
+    def _authorized(self, path):
+        if not self.token:
+            return True
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(path).query)
+        return hmac.compare_digest(query.get("token", [""])[0], self.token)
+
+    async def _handle(self, reader, writer):
+        if await ws_accept(reader, writer, self._authorized) is None:
+            return
+        client = RemoteClient(writer)
+        self.clients.add(client)
+        client.send(ws_frame(json.dumps(self.snapshot()).encode()))
+        sender = asyncio.ensure_future(client.pump(self))
+        try:
+            while True:
+                opcode, payload = await ws_read_message(reader, on_ping=lambda data: client.send(ws_frame(data, 10)))
+                if opcode == 8:
+                    # Echo the status code back, then hang up
+                    writer.write(ws_frame(payload[:2], 8))
+                    break
+                if opcode == 1:
+                    try:
+                        message = json.loads(payload)
+                    except ValueError:
+                        continue
+                    if isinstance(message, dict) and isinstance(message.get("cmd"), str):
+                        self.on_command(message)
+        except ValueError:
+            # Protocol error (bad masking or fragments): close with 1002
+            writer.write(ws_frame((1002).to_bytes(2, "big"), 8))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.clients.discard(client)
+            sender.cancel()
+            writer.close()
+
+def obs_auth(password, salt, challenge):
+    secret = base64.b64encode(hashlib.sha256((password + salt).encode()).digest())
+    return base64.b64encode(hashlib.sha256(secret + challenge.encode()).digest()).decode()
+
+class ObsBridge:
+    # obs-websocket v5 client on its own asyncio thread. The connection is
+    # kept open and re-established with backoff; requests queued in the same
+    # loop turn leave as one RequestBatch, and only the Scenes event category
+    # is subscribed so OBS never streams events we would drop.
+    def __init__(self, on_scene, on_status=None):
+        self.on_scene = on_scene
+        self.on_status = on_status
+        self.loop = None
+        self.thread = None
+        self.task = None
+        self.writer = None
+        self.outbox = []
+        self.callbacks = {}
+        self.next_id = 0
+        self.connected = False
+        self.scenes = []
+        self.program_scene = ""
+        self.error = ""
+        # (input name, pulse device) kept present in OBS, or None
+        self.source = None
+
+    def running(self):
+        return self.thread is not None
+
+    def start(self, host, port, password=""):
+        self.stop()
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(host, port, password, ready), daemon=True)
+        self.thread.start()
+        ready.wait(1.0)
+
+    def _run(self, host, port, password, ready):
+        loop = asyncio.new_event_loop()
+        self.loop = loop
+        self.task = loop.create_task(self._main(host, port, password))
+        loop.call_soon(ready.set)
+        try:
+            loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            pass
+        if self.writer is not None:
+            self.writer.close()
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+
+    def stop(self):
+        loop, task = self.loop, self.task
+        if loop is not None and task is not None:
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass  # loop already closed
+        if self.thread is not None:
+            self.thread.join(2.0)
+        self.thread = None
+        self.loop = None
+        self.task = None
+        self.writer = None
+        self.outbox = []
+        self.callbacks = {}
+        self._set_connected(False)
+
+    def _set_connected(self, connected):
+        if connected != self.connected:
+            self.connected = connected
+            if self.on_status:
+                self.on_status(connected)
+
+    async def _main(self, host, port, password):
+        delay = 0.5
+        while True:
+            try:
+                await self._session(host, port, password)
+                delay = 0.5
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError, KeyError, TypeError) as e:
+                self.error = str(e) or type(e).__name__
+            self.writer = None
+            self.outbox = []
+            self.callbacks = {}
+            self._set_connected(False)
+            await asyncio.sleep(delay)
+            delay = min(OBS_RECONNECT_MAX_S, delay * 2)
+
+    async def _receive(self, reader):
+        while True:
+            opcode, payload = await ws_read_frame(reader, masked=False)
+            if opcode == 8:
+                code = int.from_bytes(payload[:2], "big") if len(payload) >= 2 else 1005
+                reason = payload[2:].decode("utf-8", "replace")
+                raise ConnectionError(f"closed by OBS ({code})" + (f": {reason}" if reason else ""))
+            if opcode == 9:
+                self.writer.write(ws_frame(payload, 10, mask=True))
+            elif opcode in (1, 2):
+                return json.loads(payload)
+
+    def _send(self, op, data):
+        self.writer.write(ws_frame(json.dumps({"op": op, "d": data}).encode(), mask=True))
+
+    async def _session(self, host, port, password):
+        reader, self.writer = await asyncio.wait_for(ws_connect(host, port), 5)
+        hello = await asyncio.wait_for(self._receive(reader), 5)
+        if hello.get("op") != 0:
+            raise ValueError("expected Hello")
+        identify = {"rpcVersion": OBS_RPC_VERSION, "eventSubscriptions": OBS_EVENT_SCENES}
+        auth = hello["d"].get("authentication")
+        if auth:
+            identify["authentication"] = obs_auth(password, auth["salt"], auth["challenge"])
+        self._send(1, identify)
+        if (await asyncio.wait_for(self._receive(reader), 5)).get("op") != 2:
+            raise ValueError("identify rejected")
+        self.error = ""
+        self._set_connected(True)
+        # Both go out as one batch
+        self._queue("GetSceneList", None, self._on_scene_list)
+        if self.source is not None:
+            self._queue("GetInputList", None, self._on_input_list)
+
+        while True:
+            message = await self._receive(reader)
+            op = message.get("op")
+            d = message.get("d", {})
+            if op == 5:
+                self._on_event(d.get("eventType"), d.get("eventData") or {})
+            elif op == 7:
+                self._on_response(d)
+            elif op == 9:
+                for result in d.get("results", []):
+                    self._on_response(result)
+
+    def _on_event(self, event_type, data):
+        if event_type == "CurrentProgramSceneChanged":
+            self.program_scene = data.get("sceneName", "")
+            self.on_scene(self.program_scene)
+        elif event_type in ("SceneCreated", "SceneRemoved", "SceneNameChanged", "SceneListChanged"):
+            self._queue("GetSceneList", None, self._on_scene_list_quiet)
+
+    def _on_response(self, d):
+        callback = self.callbacks.pop(d.get("requestId"), None)
+        if callback:
+            callback(d.get("requestStatus", {}).get("result") is True, d.get("responseData") or {})
+
+    def _on_scene_list_quiet(self, ok, data):
+        if ok:
+            # OBS lists scenes bottom-up
+            self.scenes = [s.get("sceneName", "") for s in reversed(data.get("scenes", []))]
+
+    def _on_scene_list(self, ok, data):
+        # The first list also carries the current scene, so the mixer follows
+        # OBS straight after (re)connecting.
+        self._on_scene_list_quiet(ok, data)
+        if ok and data.get("currentProgramSceneName"):
+            self.program_scene = data["currentProgramSceneName"]
+            self.on_scene(self.program_scene)
+
+    def _on_input_list(self, ok, data):
+        if not ok or self.source is None:
+            return
+        name, device = self.source
+        if any(i.get("inputName") == name for i in data.get("inputs", [])):
+            return
+        # A new input has to live in some scene; the current one is as good
+        # as any and the user can move it from there.
+        self._queue("CreateInput", {
+            "sceneName": self.program_scene,
+            "inputName": name,
+            "inputKind": "pulse_output_capture",
+            "inputSettings": {"device_id": device},
+        }, None)
+
+    def request(self, request_type, data=None, callback=None):
+        # Safe from any thread; callbacks run on the bridge thread
+        loop = self.loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._queue, request_type, data, callback)
+        except RuntimeError:
+            pass
+
+    def _queue(self, request_type, data, callback):
+        if not self.connected:
+            return
+        self.next_id += 1
+        request = {"requestType": request_type, "requestId": str(self.next_id)}
+        if data:
+            request["requestData"] = data
+        if callback:
+            self.callbacks[request["requestId"]] = callback
+        self.outbox.append(request)
+        if len(self.outbox) == 1:
+            self.loop.call_soon(self._flush)
+
+    def _flush(self):
+        requests, self.outbox = self.outbox, []
+        if not requests or self.writer is None:
+            return
+        if len(requests) == 1:
+            self._send(6, requests[0])
+        else:
+            self.next_id += 1
+            self._send(8, {"requestId": str(self.next_id), "haltOnFailure": False, "requests": requests})
+
+class FakeObsServer:
+    # Stand-in for OBS: the v5 handshake (password optional), scene and input
+    # requests answered from memory, anything else acknowledged. Lets the
+    # bridge be exercised without OBS (--fake-obs, --bench-obs).
+    def __init__(self, scenes=("Main", "BRB", "Starting Soon"), password=""):
+        self.scenes = list(scenes)
+        self.program = self.scenes[0]
+        self.password = password
+        self.inputs = {}
+        self.requests = 0
+        self.batches = 0
+        self.loop = None
+        self.thread = None
+        self.server = None
+        self.clients = set()
+
+    def start(self, host="127.0.0.1", port=0):
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(host, port, ready), daemon=True)
+        self.thread.start()
+        ready.wait(2.0)
+        return self.server.sockets[0].getsockname()[1] if self.server else None
+
+    def _run(self, host, port, ready):
+        loop = asyncio.new_event_loop()
+        try:
+            self.server = loop.run_until_complete(asyncio.start_server(self._handle, host, port))
+        except OSError:
+            ready.set()
+            loop.close()
+            return
+        self.loop = loop
+        ready.set()
+        loop.run_forever()
+        self.server.close()
+        for writer in list(self.clients):
+            writer.close()
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread is not None:
+            self.thread.join(2.0)
+        self.loop = None
+        self.thread = None
+        self.server = None
+
+    def switch(self, scene_name):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._switch, scene_name)
+
+    def _switch(self, scene_name):
+        self.program = scene_name
+        frame = ws_frame(json.dumps({"op": 5, "d": {
+            "eventType": "CurrentProgramSceneChanged",
+            "eventIntent": OBS_EVENT_SCENES,
+            "eventData": {"sceneName": scene_name},
+        }}).encode())
+        for writer in self.clients:
+            writer.write(frame)
+
+    def _answer(self, request):
+        self.requests += 1
+        kind = request.get("requestType")
+        data = request.get("requestData") or {}
+        status = {"result": True, "code": 100}
+        response = None
+        if kind == "GetSceneList":
+            count = len(self.scenes)
+            response = {
+                "currentProgramSceneName": self.program,
+                "scenes": [{"sceneName": name, "sceneIndex": count - 1 - i} for i, name in enumerate(reversed(self.scenes))],
+            }
+        elif kind == "GetCurrentProgramScene":
+            response = {"currentProgramSceneName": self.program}
+        elif kind == "SetCurrentProgramScene":
+            if data.get("sceneName") in self.scenes:
+                self._switch(data["sceneName"])
+            else:
+                status = {"result": False, "code": 600}
+        elif kind == "GetInputList":
+            response = {"inputs": [{"inputName": name, "inputKind": k} for name, k in self.inputs.items()]}
+        elif kind == "CreateInput":
+            if data.get("inputName") in self.inputs:
+                status = {"result": False, "code": 601}
+            else:
+                self.inputs[data.get("inputName")] = data.get("inputKind")
+                response = {"sceneItemId": len(self.inputs)}
+        result = {"requestType": kind, "requestId": request.get("requestId"), "requestStatus": status}
+        if response is not None:
+            result["responseData"] = response
+        return result
+
+    async def _handle(self, reader, writer):
+        if await ws_accept(reader, writer) is None:
+            return
+        hello = {"obsWebSocketVersion": "5.0.0", "rpcVersion": OBS_RPC_VERSION}
+        if self.password:
+            salt, challenge = secrets.token_urlsafe(24), secrets.token_urlsafe(24)
+            hello["authentication"] = {"salt": salt, "challenge": challenge}
+        writer.write(ws_frame(json.dumps({"op": 0, "d": hello}).encode()))
+        try:
+            opcode, payload = await ws_read_frame(reader)
+            identify = json.loads(payload)["d"]
+            if self.password and identify.get("authentication") != obs_auth(self.password, salt, challenge):
+                writer.write(ws_frame((4009).to_bytes(2, "big") + b"Authentication failed.", 8))
+                return
+            writer.write(ws_frame(json.dumps({"op": 2, "d": {"negotiatedRpcVersion": OBS_RPC_VERSION}}).encode()))
+            if identify.get("eventSubscriptions", 0) & OBS_EVENT_SCENES:
+                self.clients.add(writer)
+            while True:
+                opcode, payload = await ws_read_frame(reader)
+                if opcode == 8:
+                    break
+                if opcode != 1:
+                    continue
+                message = json.loads(payload)
+                d = message.get("d", {})
+                if message.get("op") == 6:
+                    reply = {"op": 7, "d": self._answer(d)}
+                elif message.get("op") == 8:
+                    self.batches += 1
+                    reply = {"op": 9, "d": {"requestId": d.get("requestId"), "results": [self._answer(r) for r in d.get("requests", [])]}}
+                else:
+                    continue
+                writer.write(ws_frame(json.dumps(reply).encode()))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, KeyError):
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+class BusMatrix:
+    # Channel x bus gains (0-100) and mutes packed into two bytearrays, one
+    # row per bus. A cell is routed (has a loopback) while its gain is > 0.
+    __slots__ = ("buses", "channels", "bus_pos", "channel_pos", "gains", "mutes")
+
+    def __init__(self, buses, channels, default_gain=100):
+        self.buses = list(buses)
+        self.channels = list(channels)
+        self.bus_pos = {b: i for i, b in enumerate(self.buses)}
+        self.channel_pos = {c: i for i, c in enumerate(self.channels)}
+        size = len(self.buses) * len(self.channels)
+        self.gains = bytearray([default_gain]) * size
+        self.mutes = bytearray(size)
+
+    def _index(self, bus, ch):
+        return self.bus_pos[bus] * len(self.channels) + self.channel_pos[ch]
+
+    def get(self, bus, ch):
+        i = self._index(bus, ch)
+        return self.gains[i], bool(self.mutes[i])
+
+    def set(self, bus, ch, gain=None, muted=None):
+        # Returns the loopback operations needed to go from the old cell to
+        # the new one: "load", "unload", "volume" and/or "mute".
+        i = self._index(bus, ch)
+        old_gain, old_muted = self.gains[i], bool(self.mutes[i])
+        new_gain = old_gain if gain is None else max(0, min(100, int(gain)))
+        new_muted = old_muted if muted is None else bool(muted)
+        self.gains[i] = new_gain
+        self.mutes[i] = 1 if new_muted else 0
+        ops = []
+        if old_gain == 0 and new_gain > 0:
+            ops.append("load")
+            if new_muted:
+                ops.append("mute")
+        elif old_gain > 0 and new_gain == 0:
+            ops.append("unload")
+        elif new_gain > 0:
+            if new_gain != old_gain:
+                ops.append("volume")
+            if new_muted != old_muted:
+                ops.append("mute")
+        return ops
+
+    def store(self, bus, ch, gain, muted):
+        # Read-back from the server: update without producing operations.
+        # Only routed cells are read back, so the gain is kept in 1-100: a
+        # link at 0% stays routed and a boost past 100% is clamped. Returns
+        # whether the stored cell moved.
+        i = self._index(bus, ch)
+        changed = False
+        if gain is not None and self.gains[i] > 0:
+            gain = max(1, min(100, int(gain)))
+            if self.gains[i] != gain:
+                self.gains[i] = gain
+                changed = True
+        if muted is not None and bool(self.mutes[i]) != bool(muted):
+            self.mutes[i] = 1 if muted else 0
+            changed = True
+        return changed
+
+    def carry_over(self, old):
+        # Copy the cells shared with a matrix of another shape
+        for bus in self.buses:
+            if bus not in old.bus_pos:
+                continue
+            for ch in self.channels:
+                if ch in old.channel_pos:
+                    gain, muted = old.get(bus, ch)
+                    i = self._index(bus, ch)
+                    self.gains[i] = gain
+                    self.mutes[i] = 1 if muted else 0
+
+    def routed(self):
+        for bus in self.buses:
+            for ch in self.channels:
+                gain, muted = self.get(bus, ch)
+                if gain > 0:
+                    yield bus, ch, gain, muted
+
+    def to_config(self):
+        return {bus: {ch: list(self.get(bus, ch)) for ch in self.channels} for bus in self.buses}
+
+    def load_config(self, data):
+        if not isinstance(data, dict):
+            return
+        for bus, row in data.items():
+            if bus not in self.bus_pos or not isinstance(row, dict):
+                continue
+            for ch, cell in row.items():
+                if ch not in self.channel_pos or not isinstance(cell, list) or len(cell) != 2:
+                    continue
+                try:
+                    i = self._index(bus, ch)
+                    self.gains[i] = max(0, min(100, int(cell[0])))
+                    self.mutes[i] = 1 if cell[1] else 0
+                except (TypeError, ValueError):
+                    pass
+
 def _clear_layout(layout):
     while layout.count():
         item = layout.takeAt(0)
@@ -205,53 +3990,132 @@ def _clear_layout(layout):
         if item.layout():
             _clear_layout(item.layout())
 
+def _shadow_alpha(radius, blur, alpha):
+    # Alpha of a blurred rounded-rect shadow, big enough to nine-slice:
+    # blur of padding, then corners reaching radius + blur into the rect so
+    # the single middle row/column is the plain straight-edge falloff.
+    edge = 2 * blur + radius
+    size = 2 * edge + 1
+    lo, hi = blur, size - blur
+    cover = []
+    for y in range(size):
+        py = y + 0.5
+        qy = max(lo + radius - py, 0, py - (hi - radius))
+        for x in range(size):
+            px = x + 0.5
+            qx = max(lo + radius - px, 0, px - (hi - radius))
+            d = math.hypot(qx, qy) - radius
+            cover.append(min(1.0, max(0.0, 0.5 - d)))
+    # Three box passes each way approximate the Gaussian Qt's effect uses
+    k = max(1, blur // 3)
+    for _ in range(3):
+        cover = _box_blur(cover, size, k, rows=True)
+        cover = _box_blur(cover, size, k, rows=False)
+    return size, bytes(int(v * alpha + 0.5) for v in cover)
+
+def _box_blur(values, size, k, rows):
+    out = [0.0] * (size * size)
+    span = 2 * k + 1
+    for line in range(size):
+        if rows:
+            idx = range(line * size, (line + 1) * size)
+        else:
+            idx = range(line, size * size, size)
+        sums = [0.0]
+        sums.extend(itertools.accumulate(values[i] for i in idx))
+        for pos, i in enumerate(idx):
+            out[i] = (sums[min(size, pos + k + 1)] - sums[max(0, pos - k)]) / span
+    return out
+
+def shadow_tile(radius=CARD_RADIUS, blur=SHADOW_BLUR, alpha=SHADOW_ALPHA):
+    # Rendered once per shape; every card of every size is drawn from it
+    key = (radius, blur, alpha)
+    tile = _SHADOW_TILES.get(key)
+    if tile is None:
+        size, data = _shadow_alpha(radius, blur, alpha)
+        image = QImage(data, size, size, size, QImage.Format.Format_Alpha8)
+        tile = QPixmap.fromImage(image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied))
+        _SHADOW_TILES[key] = tile
+    return tile
+
+def shadow_rect(rect, blur=SHADOW_BLUR, offset=SHADOW_OFFSET):
+    # Area a card's shadow covers in its parent's coordinates
+    return rect.adjusted(-blur, offset - blur, blur, offset + blur)
+
+def draw_card_shadow(painter, rect):
+    # Nine-slice: corners copied, edges stretched from the one-pixel middle.
+    # The centre is skipped, the card itself covers it.
+    tile = shadow_tile()
+    edge = tile.width() // 2
+    outer = shadow_rect(rect)
+    x, y, w, h = outer.x(), outer.y(), outer.width(), outer.height()
+    if w <= 2 * edge or h <= 2 * edge:
+        painter.drawPixmap(outer, tile)
+        return
+    cols = ((0, edge, x, edge), (edge, 1, x + edge, w - 2 * edge), (edge + 1, edge, x + w - edge, edge))
+    rows = ((0, edge, y, edge), (edge, 1, y + edge, h - 2 * edge), (edge + 1, edge, y + h - edge, edge))
+    for sx, sw, dx, dw in cols:
+        for sy, sh, dy, dh in rows:
+            if sw == 1 and sh == 1:
+                continue
+            painter.drawPixmap(QRect(dx, dy, dw, dh), tile, QRect(sx, sy, sw, sh))
+
+class CardShadowHost(QWidget):
+    # Parent of the channel cards that paints their drop shadows behind
+    # them. A QGraphicsDropShadowEffect per card rendered each card
+    # offscreen and re-blurred it on every repaint, slider drags included;
+    # here a repaint inside a card only redraws the shadow slices it touches.
+    def paintEvent(self, event):
+        dirty = event.rect()
+        painter = QPainter(self)
+        for child in self.children():
+            if isinstance(child, AudioChannel) and child.isVisible() and shadow_rect(child.geometry()).intersects(dirty):
+                draw_card_shadow(painter, child.geometry())
+        painter.end()
+
 class AudioChannel(QFrame):
-    def __init__(self, name, vol_cb, stream_vol_cb, mute_cb, stream_mute_cb, hk_cb, move_app_cb, parent_app, streamer_mode, slider_height, streamer_slider_height):
+    def __init__(self, name, vol_cb, stream_vol_cb, mute_cb, stream_mute_cb, hk_cb, move_app_cb, parent_app, streamer_mode, slider_height, streamer_slider_height, eq_cb=None, label=None, buses=None, bus_vol_cb=None, bus_mute_cb=None):
         super().__init__()
         self.name = name
         self.parent_app = parent_app
         self.move_app_cb = move_app_cb
+        self.selected_ids = set()
+        # Last app clicked without Shift: where a Shift-click range starts
+        self.select_anchor = None
         self.volume_cb = vol_cb
         self.stream_volume_cb = stream_vol_cb
         self.mute_cb = mute_cb
         self.stream_mute_cb = stream_mute_cb
         self.hk_cb = hk_cb
-        self.color = THEME.get(name, "#FFFFFF")
         self.streamer_mode = streamer_mode
         self.slider_height = slider_height
         self.streamer_slider_height = streamer_slider_height
+        self.buses = buses or []
+        self.bus_volume_cb = bus_vol_cb
+        self.bus_mute_cb = bus_mute_cb
 
         self.user_slider = None
         self.stream_slider = None
         self.user_mute_btn = None
         self.stream_mute_btn = None
+        self.bus_sliders = {}
+        self.bus_mute_btns = {}
+        self.bus_state = {}
 
         self.setAcceptDrops(True)
-        self.setStyleSheet(f"""
-            QFrame#ChannelCard {{
-                background: {THEME['Card']};
-                border-radius: 18px;
-                border: none;
-            }}
-        """)
         self.setObjectName("ChannelCard")
 
-        shadow = QGraphicsDropShadowEffect(self)
-        shadow.setBlurRadius(28)
-        shadow.setColor(QColor(0, 0, 0, 90))
-        shadow.setOffset(0, 6)
-        self.setGraphicsEffect(shadow)
-
         layout = QVBoxLayout(self)
         layout.setContentsMargins(18, 20, 18, 18)
         layout.setSpacing(12)
 
         header = QFrame()
-        header.setStyleSheet("background: #1C2030; border-radius: 12px;")
+        header.setObjectName("CardStrip")
         header_layout = QHBoxLayout(header)
         header_layout.setContentsMargins(8, 6, 8, 6)
-        name_lbl = QLabel(name.upper())
-        name_lbl.setStyleSheet(f"color: {self.color}; font-weight: 900; font-size: 18px; letter-spacing: 1px; border: none; background: transparent;")
+        name_lbl = QLabel((label or name).upper())
+        name_lbl.setObjectName("ChannelName")
+        name_lbl.setProperty("tone", name)
         header_layout.addStretch()
         header_layout.addWidget(name_lbl)
         header_layout.addStretch()
@@ -262,22 +4126,19 @@ class AudioChannel(QFrame):
         gear_btn.setFixedSize(44, 44)
         gear_btn.setCursor(Qt.CursorShape.PointingHandCursor)
         gear_btn.clicked.connect(lambda: hk_cb(self.name))
-        gear_btn.setStyleSheet(f"""
-            QPushButton {{
-                background: {THEME['CardAlt']};
-                border: 2px solid rgba(255,255,255,0.12);
-                border-radius: 22px;
-            }}
-            QPushButton:hover {{
-                background: #262B3B;
-                border: 2px solid {THEME['Accent']};
-            }}
-        """)
+        gear_btn.setObjectName("RoundButton")
+        if eq_cb:
+            eq_btn = QPushButton("EQ")
+            eq_btn.setFixedSize(44, 44)
+            eq_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+            eq_btn.clicked.connect(lambda: eq_cb(self.name))
+            eq_btn.setObjectName("RoundButton")
+            header_layout.insertWidget(0, eq_btn)
         header_layout.addWidget(gear_btn)
         layout.addWidget(header)
 
         self.slider_wrap = QFrame()
-        self.slider_wrap.setStyleSheet(f"background: {THEME['CardAlt']}; border: none; border-radius: 18px;")
+        self.slider_wrap.setObjectName("SliderWrap")
         self.slider_layout = QHBoxLayout(self.slider_wrap)
         self.slider_layout.setContentsMargins(18, 14, 18, 14)
         self.slider_layout.setSpacing(12)
@@ -285,7 +4146,7 @@ class AudioChannel(QFrame):
         layout.addWidget(self.slider_wrap)
 
         self.btn_wrap = QFrame()
-        self.btn_wrap.setStyleSheet("background: #1C2030; border-radius: 12px;")
+        self.btn_wrap.setObjectName("CardStrip")
         self.btn_layout = QHBoxLayout(self.btn_wrap)
         self.btn_layout.setContentsMargins(8, 6, 8, 6)
         self.btn_layout.setSpacing(12)
@@ -294,7 +4155,7 @@ class AudioChannel(QFrame):
         layout.addWidget(self.btn_wrap)
 
         apps_container = QFrame()
-        apps_container.setStyleSheet("background: rgba(255,255,255,0.04); border-radius: 10px; border: none;")
+        apps_container.setObjectName("AppsContainer")
         self.app_layout = QVBoxLayout(apps_container)
         self.app_layout.setContentsMargins(6, 6, 6, 6)
         self.app_layout.setSpacing(6)
@@ -304,104 +4165,70 @@ class AudioChannel(QFrame):
         apps_scroll.setWidgetResizable(True)
         apps_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         apps_scroll.setFrameShape(QFrame.Shape.NoFrame)
-        apps_scroll.setStyleSheet("""
-            QScrollArea {
-                background: transparent;
-                border: none;
-            }
-            QScrollBar:vertical {
-                border: none;
-                background: transparent;
-                width: 6px;
-                margin: 0px;
-                border-radius: 3px;
-            }
-            QScrollBar::handle:vertical {
-                background: #1c2030;
-                min-height: 20px;
-                border-radius: 3px;
-            }
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-                height: 0px;
-                background: none;
-            }
-            QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
-                background: none;
-            }
-        """)
+        apps_scroll.setObjectName("AppsScroll")
         apps_scroll.setWidget(apps_container)
         layout.addWidget(apps_scroll)
 
-    def _slider_stylesheet(self, color):
-        return f"""
-            QSlider::groove:vertical {{
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #272B3A, stop:1 #171A24);
-                width: 14px;
-                border-radius: 7px;
-                border: 1px solid rgba(255,255,255,0.08);
-            }}
-            QSlider::add-page:vertical {{
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 {color}, stop:1 rgba(255,255,255,0.2));
-                width: 14px;
-                border-radius: 7px;
-            }}
-            QSlider::sub-page:vertical {{
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #1E2230, stop:1 #141724);
-                border-radius: 7px;
-            }}
-            QSlider::handle:vertical {{
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #FFFFFF, stop:1 #D3D7E4);
-                height: 30px;
-                width: 30px;
-                margin: 0 -8px;
-                border-radius: 15px;
-                border: 2px solid rgba(0,0,0,0.25);
-            }}
-            QSlider::handle:vertical:hover {{
-                background: {color};
-                border: 2px solid rgba(255,255,255,0.9);
-            }}
-        """
-
-    def _build_slider(self, color, height, on_change):
+    def _build_slider(self, tone, height, on_change, width=90):
         slider = QSlider(Qt.Orientation.Vertical)
         slider.setRange(0, 100)
         slider.setMinimumHeight(height)
-        slider.setFixedWidth(90)
+        slider.setFixedWidth(width)
         slider.setCursor(Qt.CursorShape.PointingHandCursor)
-        slider.setStyleSheet(self._slider_stylesheet(color))
+        slider.setObjectName("Fader")
+        slider.setProperty("tone", tone)
         slider.valueChanged.connect(on_change)
         return slider
 
+    def slider_columns(self):
+        # One column per mix bus: the personal mix, Stream_Mix in streamer
+        # mode, then every extra bus from the matrix. The third field is the
+        # stylesheet tone the column's fader and mute button are drawn in.
+        columns = [("user", "USER", self.name)]
+        if self.streamer_mode:
+            columns.append(("stream", "STREAM", "Accent"))
+        for bus in self.buses:
+            columns.append((bus["name"], bus["label"].upper(), f"bus-{bus['name']}"))
+        return columns
+
+    def _column_callbacks(self, key):
+        if key == "user":
+            return lambda v: self.volume_cb(self.name, v), lambda: self.mute_cb(self.name)
+        if key == "stream":
+            return lambda v: self.stream_volume_cb(self.name, v), lambda: self.stream_mute_cb(self.name)
+        return lambda v: self.bus_volume_cb(self.name, key, v), lambda: self.bus_mute_cb(self.name, key)
+
+    @traced
     def _rebuild_sliders(self):
         _clear_layout(self.slider_layout)
         self.user_slider = None
         self.stream_slider = None
+        self.bus_sliders = {}
 
-        if self.streamer_mode:
-            user_col = QVBoxLayout()
-            user_label = QLabel("USER")
-            user_label.setStyleSheet(f"color: {THEME['Text']}; font-size: 11px; font-weight: 700; border: none; background: transparent;")
-            user_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            user_col.addWidget(user_label)
-            self.user_slider = self._build_slider(self.color, self.streamer_slider_height, lambda v: self.volume_cb(self.name, v))
-            user_col.addWidget(self.user_slider, alignment=Qt.AlignmentFlag.AlignCenter)
-
-            stream_col = QVBoxLayout()
-            stream_label = QLabel("STREAM")
-            stream_label.setStyleSheet(f"color: {THEME['Text']}; font-size: 11px; font-weight: 700; border: none; background: transparent;")
-            stream_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            stream_col.addWidget(stream_label)
-            self.stream_slider = self._build_slider(THEME['Accent'], self.streamer_slider_height, lambda v: self.stream_volume_cb(self.name, v))
-            stream_col.addWidget(self.stream_slider, alignment=Qt.AlignmentFlag.AlignCenter)
-
-            self.slider_layout.addLayout(user_col)
-            self.slider_layout.addLayout(stream_col)
-        else:
+        columns = self.slider_columns()
+        if len(columns) == 1:
             col = QVBoxLayout()
-            self.user_slider = self._build_slider(self.color, self.slider_height, lambda v: self.volume_cb(self.name, v))
+            self.user_slider = self._build_slider(self.name, self.slider_height, self._column_callbacks("user")[0])
             col.addWidget(self.user_slider, alignment=Qt.AlignmentFlag.AlignCenter)
             self.slider_layout.addLayout(col)
+            return
+
+        width = max(36, min(90, (CARD_WIDTH - 72) // len(columns) - 12))
+        for key, label, tone in columns:
+            col = QVBoxLayout()
+            col_label = QLabel(label[:8])
+            col_label.setObjectName("ColumnLabel")
+            col_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            col.addWidget(col_label)
+            slider = self._build_slider(tone, self.streamer_slider_height, self._column_callbacks(key)[0], width)
+            col.addWidget(slider, alignment=Qt.AlignmentFlag.AlignCenter)
+            self.slider_layout.addLayout(col)
+            if key == "user":
+                self.user_slider = slider
+            elif key == "stream":
+                self.stream_slider = slider
+            else:
+                self.bus_sliders[key] = slider
 
     def _icon_for_mute(self, muted):
         if self.name == 'Mic':
@@ -417,56 +4244,61 @@ class AudioChannel(QFrame):
             icon = QIcon.fromTheme("audio-volume-muted" if muted else "audio-volume-high")
         return icon
 
-    def _apply_mute_style(self, btn, muted, border_color):
-        if muted:
-            btn.setStyleSheet(f"""
-                QPushButton {{
-                    background: {THEME['Muted']};
-                    border: 2px solid rgba(255,255,255,0.75);
-                    border-radius: 22px;
-                }}
-                QPushButton:hover {{
-                    background: {THEME['Muted']};
-                    border: 2px solid rgba(255,255,255,0.85);
-                }}
-            """)
-        else:
-            btn.setStyleSheet(f"""
-                QPushButton {{
-                    background: {THEME['CardAlt']};
-                    border: 2px solid {border_color};
-                    border-radius: 22px;
-                }}
-                QPushButton:hover {{
-                    background: #262B3B;
-                    border: 2px solid {border_color};
-                }}
-            """)
-
-    def _build_mute_button(self, on_click):
+    def _build_mute_button(self, tone, on_click):
         btn = QPushButton()
+        btn.setObjectName("MuteButton")
+        btn.setProperty("tone", tone)
         btn.setIconSize(QSize(22, 22))
         btn.setFixedSize(44, 44)
         btn.setCursor(Qt.CursorShape.PointingHandCursor)
         btn.clicked.connect(on_click)
         return btn
 
+    @traced
     def _rebuild_buttons(self):
         _clear_layout(self.btn_layout)
-        self.user_mute_btn = self._build_mute_button(lambda: self.mute_cb(self.name))
-        self.btn_layout.addWidget(self.user_mute_btn)
-        if self.streamer_mode:
-            self.stream_mute_btn = self._build_mute_button(lambda: self.stream_mute_cb(self.name))
-            self.btn_layout.addWidget(self.stream_mute_btn)
-        else:
-            self.stream_mute_btn = None
+        self.stream_mute_btn = None
+        self.bus_mute_btns = {}
+        for key, _, tone in self.slider_columns():
+            btn = self._build_mute_button(tone, self._column_callbacks(key)[1])
+            self.btn_layout.addWidget(btn)
+            if key == "user":
+                self.user_mute_btn = btn
+            elif key == "stream":
+                self.stream_mute_btn = btn
+            else:
+                self.bus_mute_btns[key] = btn
 
+    @traced
     def set_streamer_mode(self, enabled):
         if self.streamer_mode == enabled:
             return
         self.streamer_mode = enabled
         self._rebuild_sliders()
         self._rebuild_buttons()
+        self._refresh_bus_widgets()
+
+    def set_buses(self, buses):
+        self.buses = buses
+        self._rebuild_sliders()
+        self._rebuild_buttons()
+        self._refresh_bus_widgets()
+
+    def _refresh_bus_widgets(self):
+        for bus, (gain, muted) in self.bus_state.items():
+            self.update_bus_state(bus, gain, muted)
+
+    def update_bus_state(self, bus, gain, muted):
+        self.bus_state[bus] = (gain, muted)
+        slider = self.bus_sliders.get(bus)
+        if slider and not slider.isSliderDown():
+            slider.blockSignals(True)
+            slider.setValue(gain)
+            slider.blockSignals(False)
+        btn = self.bus_mute_btns.get(bus)
+        if btn:
+            btn.setIcon(self._icon_for_mute(muted))
+            set_style_state(btn, "muted", muted)
 
     def update_state(self, volume, stream_volume, muted, stream_muted):
         if self.user_slider and not self.user_slider.isSliderDown():
@@ -480,43 +4312,21 @@ class AudioChannel(QFrame):
 
         if self.user_mute_btn:
             self.user_mute_btn.setIcon(self._icon_for_mute(muted))
-            self._apply_mute_style(self.user_mute_btn, muted, self.color)
+            set_style_state(self.user_mute_btn, "muted", muted)
         if self.stream_mute_btn:
             self.stream_mute_btn.setIcon(self._icon_for_mute(stream_muted))
-            self._apply_mute_style(self.stream_mute_btn, stream_muted, THEME['Accent'])
+            set_style_state(self.stream_mute_btn, "muted", stream_muted)
 
     def dragEnterEvent(self, event):
         if event.mimeData().hasText():
             event.accept()
-            self.setStyleSheet(f"""
-                QFrame#ChannelCard {{
-                    background: {THEME['Card']};
-                    border-radius: 18px;
-                    border: none;
-                }}
-            """)
-
-    def dragLeaveEvent(self, event):
-        self.setStyleSheet(f"""
-            QFrame#ChannelCard {{
-                background: {THEME['Card']};
-                border-radius: 18px;
-                border: none;
-            }}
-        """)
 
     def dropEvent(self, event):
-        app_id = event.mimeData().text()
-        self.move_app_cb(app_id, self.name)
-        self.setStyleSheet(f"""
-            QFrame#ChannelCard {{
-                background: {THEME['Card']};
-                border-radius: 18px;
-                border: none;
-            }}
-        """)
+        app_ids = event.mimeData().text().split()
+        self.move_app_cb(app_ids, self.name)
         event.accept()
 
+    @traced
     def update_apps_list(self, apps_info):
         # Remove existing items except the stretch at the end
         while self.app_layout.count() > 1:
@@ -527,18 +4337,66 @@ class AudioChannel(QFrame):
         # Insert before the stretch item
         insert_idx = 0
 
+        # Selection survives redraws for the streams that are still here
+        present = {app_id for _, app_id, _ in apps_info}
+        self.selected_ids &= present
+        if self.select_anchor not in present:
+            self.select_anchor = None
+
         # Add real apps
         for app_name, app_id, icon_name in apps_info:
-            app_widget = DraggableAppLabel(app_name, app_id, icon_name, self.parent_app)
+            app_widget = DraggableAppLabel(app_name, app_id, icon_name, self.parent_app, self)
             self.app_layout.insertWidget(insert_idx, app_widget)
             insert_idx += 1
 
         if not apps_info and self.app_layout.count() == 1: # Only stretch remains
             lbl = QLabel("No Apps")
-            lbl.setStyleSheet("color: #4E5566; font-size: 10px; font-weight: bold; border: none; background: transparent;")
+            lbl.setObjectName("NoApps")
             lbl.setAlignment(Qt.AlignmentFlag.AlignCenter)
             self.app_layout.insertWidget(0, lbl)
 
+    def toggle_selected(self, app_id):
+        if app_id in self.selected_ids:
+            self.selected_ids.discard(app_id)
+        else:
+            self.selected_ids.add(app_id)
+        self.select_anchor = app_id
+        self._restyle_apps()
+
+    def select_range(self, app_id, extend=False):
+        # Everything between the anchor and app_id, in list order; with
+        # extend (Ctrl+Shift) the range is added to the selection
+        ids = self.app_ids()
+        if app_id not in ids:
+            return
+        anchor = self.select_anchor if self.select_anchor in ids else app_id
+        lo, hi = sorted((ids.index(anchor), ids.index(app_id)))
+        if not extend:
+            self.selected_ids.clear()
+        self.selected_ids.update(ids[lo:hi + 1])
+        self.select_anchor = anchor
+        self._restyle_apps()
+
+    def clear_selection(self):
+        self.select_anchor = None
+        if self.selected_ids:
+            self.selected_ids.clear()
+            self._restyle_apps()
+
+    def app_ids(self):
+        ids = []
+        for i in range(self.app_layout.count()):
+            widget = self.app_layout.itemAt(i).widget()
+            if isinstance(widget, DraggableAppLabel):
+                ids.append(widget.app_id)
+        return ids
+
+    def _restyle_apps(self):
+        for i in range(self.app_layout.count()):
+            widget = self.app_layout.itemAt(i).widget()
+            if isinstance(widget, DraggableAppLabel):
+                widget.set_selected(widget.app_id in self.selected_ids)
+
 class FixedDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -562,20 +4420,32 @@ class FixedDialog(QDialog):
         super().moveEvent(event)
 
 class MuxHome(QMainWindow):
-    def __init__(self):
+    def __init__(self, backend=None):
         super().__init__()
+        self.backend = backend or PactlBackend()
         self.setWindowTitle("MUX")
-        self.setFixedSize(1285, 735)
-        self.setStyleSheet(f"background-color: {THEME['Bg']}; font-family: 'Segoe UI', Sans-Serif;")
+        self.channel_defs = load_channel_defs()
+        for d in self.channel_defs:
+            THEME[d["name"]] = d["color"]
+        self.channel_labels = {d["name"]: d["label"] for d in self.channel_defs}
 
         self.is_dragging_app = False
-        self.sinks = {"Game": "Game", "Chat": "Chat", "Media": "Media"}
-        self.channels = {name: ChannelState(name) for name in ["Game", "Chat", "Media", "Mic"]}
-        self.hotkeys_config = {}
+        # Resolved icons only show up through a fresh app listing
+        self.icons = IconResolver(lambda: self.poke_sync(("sink-input",)))
+        self.sinks = {d["name"]: d["name"] for d in self.channel_defs}
+        self.store = StateStore(list(self.sinks) + ["Mic"])
+        self.channels = self.store.channels
+        self.hotkeys_config = self.store.hotkeys
+        self.metrics = Metrics(self.metrics_gauges)
+        self.metrics_exporter = MetricsExporter(self.metrics)
         self.active_inputs = {}
+        self.bus_links = {}
+        self.input_identity = {}
         self.streamer_mode = False
         self.selected_output = None
         self.selected_input = None
+        self.present_sinks = None
+        self.present_sources = None
         self.start_in_tray = False
         self.tray_icon = None
         self.tray_menu = None
@@ -587,33 +4457,82 @@ class MuxHome(QMainWindow):
 
         self.signaler = AudioDataSignaler()
         self.signaler.update_apps.connect(self.dispatch_app_updates)
-
-        self.hotkeys_config = self.load_config()
+        self.signaler.poke_sync.connect(self._on_poke_sync)
+        self.signaler.recall_scene.connect(self.recall_scene)
+        self.signaler.toggle_recording.connect(self.toggle_recording)
+        self.signaler.save_replay.connect(self.save_replay)
+        self.signaler.hotplug.connect(self._on_hotplug)
+        self.signaler.state_changed.connect(self.apply_state_changes)
+        self.signaler.remote_command.connect(self.handle_remote_command)
+        self.signaler.midi_control.connect(self.on_midi_control)
+        self.signaler.obs_scene.connect(self.handle_obs_scene)
+        self.signaler.obs_status.connect(lambda connected: self.update_button_styles())
+        self.signaler.server_events.connect(self._on_server_events)
+        self.store.subscribe(self.on_store_change)
+        self.hotplug_timer = QTimer(self)
+        self.hotplug_timer.setSingleShot(True)
+        self.hotplug_timer.timeout.connect(self.handle_hotplug)
+        self.last_recall_ms = None
+        self.sync_scheduler = SyncScheduler()
+        self.events_available = False
+        self.sync_primed = False
+
+        self.store.hotkeys.update(self.load_config())
+        self.apply_theme()
+        self.mic_chain = MicChain(self.mic_chain_settings)
+        self.eq_chains = {name: EqChain(name, self.eq_settings[name]) for name in self.sinks}
+        self.volume_writer = VolumeWriter(self.ramp_ms, backend=self.backend)
+        self.volume_writer.timing = self.metrics.pactl["write"]
+        self.duck_gain = 1.0
+        self.ducker = Ducker(self.duck_settings, self.apply_duck_gain)
+        self.recorder = Recorder()
+        self.last_recording = None
+        self.replay = ReplayBuffer()
+        self.last_replay = None
+        self.remote = ControlServer(self.store, self.signaler.remote_command.emit, self.remote_state, self.remote_levels)
+        self.store.subscribe(self.remote.publish)
+        self.midi = MidiController(self.midi_settings["map"], self.on_midi_control)
+        self.midi_feedback_keys = {}
+        self.store.subscribe(self.midi_feedback)
+        self.obs = ObsBridge(self.signaler.obs_scene.emit, self.signaler.obs_status.emit)
         self.save_timer = QTimer(self)
         self.save_timer.setSingleShot(True)
         self.save_timer.timeout.connect(self.save_config)
         self.setup_ui()
         self.init_tray()
         self.init_audio_engine()
+        self.scan_devices()
         self.startup_cleanup()
         self.initial_setup()
         self.apply_saved_volumes()
+        self.restart_ducking()
+        self.restart_replay()
+        self.restart_remote()
+        self.restart_midi()
+        self.restart_obs()
+        self.restart_metrics()
         if self.start_in_tray:
             QTimer.singleShot(0, self.hide_to_tray)
 
         self.sync_timer = QTimer(self)
-        self.sync_timer.timeout.connect(self.sync_once)
-        self.sync_timer.start(1000)
+        self.sync_timer.setSingleShot(True)
+        self.sync_timer.timeout.connect(self.sync_tick)
         self.sync_once()
+        self.sync_timer.start(self.sync_scheduler.next_delay_ms())
+        threading.Thread(target=self.watch_server_events, daemon=True).start()
 
         threading.Thread(target=self.start_hotkeys, daemon=True).start()
         self.register_hotkeys()
 
     def run_cmd(self, cmd):
+        started = time.perf_counter()
         try:
-            return subprocess.check_output(cmd, shell=True, stderr=subprocess.DEVNULL).decode().strip()
+            with trace("run_cmd", cmd=cmd):
+                return self.backend.run(cmd)
         except:
             return ""
+        finally:
+            self.metrics.pactl["cmd"].observe(time.perf_counter() - started)
 
     def init_tray(self):
         if not QSystemTrayIcon.isSystemTrayAvailable():
@@ -674,10 +4593,27 @@ class MuxHome(QMainWindow):
         hotkeys = defaults
         selected_output = None
         selected_input = None
+        output_priority = []
+        input_priority = []
         streamer_mode = False
         start_in_tray = False
         user_volumes = {name: None for name in self.channels}
         stream_volumes = {name: None for name in self.channels}
+        mic_chain = json.loads(json.dumps(MIC_CHAIN_DEFAULTS))
+        eq = {name: {"enabled": False, "bands": json.loads(json.dumps(EQ_DEFAULT_BANDS))} for name in self.sinks}
+        ducking = json.loads(json.dumps(DUCK_DEFAULTS))
+        ramp_ms = RAMP_DEFAULT_MS
+        scenes = {}
+        channel_outputs = {}
+        buses = []
+        bus_matrix = {}
+        recorder = json.loads(json.dumps(REC_DEFAULTS))
+        app_channels = {}
+        replay = dict(REPLAY_DEFAULTS)
+        remote = dict(REMOTE_DEFAULTS)
+        obs = json.loads(json.dumps(OBS_DEFAULTS))
+        metrics = dict(METRICS_DEFAULTS)
+        midi = json.loads(json.dumps(MIDI_DEFAULTS))
         if os.path.exists(CONFIG_FILE):
             try:
                 with open(CONFIG_FILE, 'r') as f:
@@ -687,10 +4623,77 @@ class MuxHome(QMainWindow):
                     hotkeys = {k: {kk: str(vv) for kk, vv in v.items()} for k, v in raw.items()}
                     selected_output = data.get("selected_output")
                     selected_input = data.get("selected_input")
+                    output_priority = [d for d in data.get("output_priority", []) if isinstance(d, str) and d]
+                    input_priority = [d for d in data.get("input_priority", []) if isinstance(d, str) and d]
                     streamer_mode = data.get("streamer_mode") is True
                     start_in_tray = data.get("start_in_tray") is True
                     raw_user_volumes = data.get("user_volumes", {})
                     raw_stream_volumes = data.get("stream_volumes", {})
+                    raw_mic_chain = data.get("mic_chain", {})
+                    if isinstance(raw_mic_chain, dict):
+                        mic_chain["enabled"] = raw_mic_chain.get("enabled") is True
+                        for key, fields in raw_mic_chain.items():
+                            if key in mic_chain and isinstance(fields, dict):
+                                mic_chain[key].update(fields)
+                    raw_eq = data.get("eq", {})
+                    if isinstance(raw_eq, dict):
+                        for name, cfg in raw_eq.items():
+                            if name not in eq or not isinstance(cfg, dict):
+                                continue
+                            eq[name]["enabled"] = cfg.get("enabled") is True
+                            for band, raw_band in zip(eq[name]["bands"], cfg.get("bands", [])):
+                                if isinstance(raw_band, dict):
+                                    band.update({k: v for k, v in raw_band.items() if k in band})
+                    try:
+                        ramp_ms = max(0, min(200, int(data.get("ramp_ms", RAMP_DEFAULT_MS))))
+                    except:
+                        ramp_ms = RAMP_DEFAULT_MS
+                    raw_outputs = data.get("channel_outputs", {})
+                    if isinstance(raw_outputs, dict):
+                        channel_outputs = {k: v for k, v in raw_outputs.items() if k in self.sinks and isinstance(v, str) and v}
+                    raw_recorder = data.get("recorder", {})
+                    if isinstance(raw_recorder, dict):
+                        recorder.update({k: v for k, v in raw_recorder.items() if k in recorder})
+                    raw_apps = data.get("app_channels", {})
+                    if isinstance(raw_apps, dict):
+                        for identity, entry in raw_apps.items():
+                            if isinstance(entry, dict) and entry.get("channel") in self.sinks:
+                                volume = entry.get("volume")
+                                app_channels[identity] = {"channel": entry["channel"], "volume": volume if isinstance(volume, int) else None}
+                    raw_midi = data.get("midi", {})
+                    if isinstance(raw_midi, dict):
+                        midi.update({k: v for k, v in raw_midi.items() if k in midi})
+                        if not isinstance(midi["map"], dict):
+                            midi["map"] = {}
+                    raw_remote = data.get("remote", {})
+                    if isinstance(raw_remote, dict):
+                        remote.update({k: v for k, v in raw_remote.items() if k in remote})
+                    raw_metrics = data.get("metrics", {})
+                    if isinstance(raw_metrics, dict):
+                        metrics.update({k: v for k, v in raw_metrics.items() if k in metrics})
+                    raw_obs = data.get("obs", {})
+                    if isinstance(raw_obs, dict):
+                        obs.update({k: v for k, v in raw_obs.items() if k in obs})
+                        if not isinstance(obs["scene_map"], dict):
+                            obs["scene_map"] = {}
+                    raw_replay = data.get("replay", {})
+                    if isinstance(raw_replay, dict):
+                        replay.update({k: v for k, v in raw_replay.items() if k in replay})
+                    raw_buses = data.get("buses", [])
+                    if isinstance(raw_buses, list):
+                        for entry in raw_buses:
+                            if not isinstance(entry, dict):
+                                continue
+                            bus_name = re.sub(r"[^A-Za-z0-9]", "", str(entry.get("name", "")))
+                            if bus_name and bus_name not in [b["name"] for b in buses]:
+                                buses.append({"name": bus_name, "label": str(entry.get("label") or bus_name), "color": entry.get("color")})
+                    bus_matrix = data.get("bus_matrix", {})
+                    raw_scenes = data.get("scenes", {})
+                    if isinstance(raw_scenes, dict):
+                        scenes = {str(k): v for k, v in raw_scenes.items() if isinstance(v, dict) and isinstance(v.get("channels"), dict)}
+                    raw_ducking = data.get("ducking", {})
+                    if isinstance(raw_ducking, dict):
+                        ducking.update({k: v for k, v in raw_ducking.items() if k in ducking})
                     for name in self.channels:
                         if name in raw_user_volumes:
                             try:
@@ -716,21 +4719,64 @@ class MuxHome(QMainWindow):
 
         self.selected_output = selected_output
         self.selected_input = selected_input
+        self.output_priority = output_priority
+        self.input_priority = input_priority
         self.streamer_mode = streamer_mode
         self.start_in_tray = start_in_tray
         self.user_volumes = user_volumes
         self.stream_volumes = stream_volumes
+        self.mic_chain_settings = mic_chain
+        self.eq_settings = eq
+        self.duck_settings = ducking
+        self.ramp_ms = ramp_ms
+        self.scenes = scenes
+        self.channel_outputs = channel_outputs
+        self.rec_settings = recorder
+        self.app_channels = app_channels
+        self.replay_settings = replay
+        self.remote_settings = remote
+        self.obs_settings = obs
+        self.metrics_settings = metrics
+        if not midi["map"]:
+            # nanoKONTROL2 layout: faders, knobs and M buttons per strip
+            for i, name in enumerate(list(self.sinks) + ["Mic"]):
+                midi["map"][f"cc:0:{i}"] = {"action": "volume", "channel": name}
+                midi["map"][f"cc:0:{16 + i}"] = {"action": "stream_volume", "channel": name}
+                midi["map"][f"cc:0:{48 + i}"] = {"action": "mute", "channel": name}
+        self.midi_settings = midi
+        self.buses = buses
+        self.bus_matrix = BusMatrix([b["name"] for b in buses], list(self.channels))
+        self.bus_matrix.load_config(bus_matrix)
         return hotkeys
 
+    @traced
     def save_config(self):
         data = {
-            "hotkeys": self.hotkeys_config,
+            "hotkeys": self.store.hotkey_snapshot(),
             "selected_output": self.selected_output,
             "selected_input": self.selected_input,
+            "output_priority": self.output_priority,
+            "input_priority": self.input_priority,
             "streamer_mode": self.streamer_mode,
             "start_in_tray": self.start_in_tray,
             "user_volumes": self.user_volumes,
-            "stream_volumes": self.stream_volumes
+            "stream_volumes": self.stream_volumes,
+            "mic_chain": self.mic_chain_settings,
+            "eq": self.eq_settings,
+            "ducking": self.duck_settings,
+            "ramp_ms": self.ramp_ms,
+            "scenes": self.scenes,
+            "channel_outputs": self.channel_outputs,
+            "channels": self.channel_defs,
+            "buses": self.buses,
+            "bus_matrix": self.bus_matrix.to_config(),
+            "recorder": self.rec_settings,
+            "replay": self.replay_settings,
+            "remote": self.remote_settings,
+            "midi": self.midi_settings,
+            "obs": self.obs_settings,
+            "metrics": self.metrics_settings,
+            "app_channels": self.app_channels
         }
         with open(CONFIG_FILE, 'w') as f:
             json.dump(data, f)
@@ -743,11 +4789,12 @@ class MuxHome(QMainWindow):
         for name, val in self.user_volumes.items():
             if val is None:
                 continue
-            self.channels[name].volume = int(val)
+            self.store.update(name, origin="config", volume=int(val))
             self._apply_user_volume(name, int(val))
         if self.streamer_mode:
-            QTimer.singleShot(150, self.apply_stream_defaults)
+            QTimer.singleShot(150, trace_deferred("stream defaults delay", self.apply_stream_defaults))
 
+    @traced
     def init_audio_engine(self):
         existing = self.run_cmd("pactl list short sinks")
         for name in self.sinks.values():
@@ -771,6 +4818,9 @@ class MuxHome(QMainWindow):
 
     def startup_cleanup(self):
         self.remove_links()
+        if HOST_CLEANUP:
+            self.run_cmd(f"pkill -f 'pipewire -c {MIC_CHAIN_CONF}'")
+            self.run_cmd(f"pkill -f 'pipewire -c {EQ_CONF_PREFIX}'")
         mods = self.run_cmd("pactl list short modules")
         for line in mods.split('\n'):
             if f"sink_name={STREAM_MIX_NAME}" in line:
@@ -778,53 +4828,141 @@ class MuxHome(QMainWindow):
                 if mod_id:
                     self.run_cmd(f"pactl unload-module {mod_id}")
 
+    def resolve_device(self, preferred, priority, present):
+        # The configured device wins whenever it is plugged in; otherwise the
+        # first present entry of the priority list takes over.
+        if present is None or not preferred or preferred in present:
+            return preferred
+        for device in priority:
+            if device in present:
+                return device
+        return preferred
+
+    def channel_output(self, ch):
+        return self.resolve_device(self.channel_outputs.get(ch) or self.selected_output, self.output_priority, self.present_sinks)
+
+    def mic_input(self):
+        return self.resolve_device(self.selected_input, self.input_priority, self.present_sources)
+
+    def scan_devices(self):
+        sinks = set()
+        for line in self.run_cmd("pactl list short sinks").split('\n'):
+            parts = line.split('\t')
+            if len(parts) > 1:
+                sinks.add(parts[1])
+        sources = set()
+        for line in self.run_cmd("pactl list short sources").split('\n'):
+            parts = line.split('\t')
+            if len(parts) > 1:
+                sources.add(parts[1])
+        self.present_sinks = sinks
+        self.present_sources = sources
+
+    def _on_hotplug(self):
+        # Device add/remove events come in bursts; one short debounce keeps
+        # failover well inside 100 ms while rerouting only once.
+        if not self.hotplug_timer.isActive():
+            self.hotplug_timer.start(HOTPLUG_DEBOUNCE_MS)
+
+    def handle_hotplug(self):
+        outputs = {ch: self.channel_output(ch) for ch in self.sinks}
+        mic = self.mic_input()
+        self.scan_devices()
+        for ch in self.sinks:
+            if self.channel_output(ch) != outputs[ch]:
+                self.reroute_channel(ch)
+        if self.mic_input() != mic:
+            self.reroute_mic()
+
+    def output_devices(self):
+        devices = []
+        for ch in self.sinks:
+            target = self.channel_output(ch)
+            if target and target not in devices:
+                devices.append(target)
+        return devices
+
     def initial_setup(self):
-        phy_out = self.selected_output
-        if phy_out:
+        outputs = self.output_devices()
+        for phy_out in outputs:
             self.run_cmd(f"pactl set-sink-mute {phy_out} 1")
         self.rebuild_routing()
         self.set_system_defaults()
         self.refresh_input_ids()
-        if phy_out:
+        if outputs:
             time.sleep(0.3)
+        for phy_out in outputs:
             self.run_cmd(f"pactl set-sink-mute {phy_out} 0")
 
+    @traced
     def handle_mode_toggle(self):
         self.save_config()
-        phy_out = self.selected_output
-        if phy_out:
+        outputs = self.output_devices()
+        for phy_out in outputs:
             self.run_cmd(f"pactl set-sink-mute {phy_out} 1")
         self.rebuild_routing()
         self.set_system_defaults()
         self.refresh_input_ids()
         if self.streamer_mode:
-            QTimer.singleShot(150, self.apply_stream_defaults)
-        if phy_out:
+            QTimer.singleShot(150, trace_deferred("stream defaults delay", self.apply_stream_defaults))
+        if outputs:
             time.sleep(0.3)
+        for phy_out in outputs:
             self.run_cmd(f"pactl set-sink-mute {phy_out} 0")
+        self.restart_replay()
+
+    @traced
+    def load_user_link(self, ch):
+        user_source = f"{ch}.monitor"
+        eq_chain = self.eq_chains[ch]
+        if self.eq_settings[ch].get("enabled") and eq_chain.start():
+            user_source = eq_chain.name
+        elif not self.eq_settings[ch].get("enabled"):
+            eq_chain.stop()
+        self.run_cmd(f"pactl load-module module-loopback source={user_source} sink={self.channel_output(ch)} latency_msec=40 adjust_time=0 sink_input_properties=media.name=Link_User_{ch}")
+
+    def reroute_channel(self, ch):
+        # Only this channel's user loopback changes: its sink-input is moved to
+        # the new device, and reloaded only if the move is refused.
+        target = self.channel_output(ch)
+        if not target or ch not in self.sinks:
+            return
+        user_id = self.active_inputs.get(ch, {}).get("user_input")
+        if user_id:
+            try:
+                self.backend.run(f"pactl move-sink-input {user_id} {target}")
+                return
+            except:
+                pass
+            for entry in parse_sink_inputs(self.run_cmd("pactl list sink-inputs")):
+                if entry["id"] == str(user_id) and entry["owner_module"]:
+                    self.run_cmd(f"pactl unload-module {entry['owner_module']}")
+        self.load_user_link(ch)
+        self.refresh_input_ids()
+        new_id = self.active_inputs.get(ch, {}).get("user_input")
+        if new_id and self.channels[ch].muted:
+            self.set_input_mute(new_id, True, 0)
+        self.poke_sync(("sink-input",))
 
+    @traced
     def set_system_defaults(self):
-        self.run_cmd("pactl set-default-sink Game")
+        self.run_cmd(f"pactl set-default-sink {next(iter(self.sinks.values()))}")
         self.run_cmd(f"pactl set-default-source {MIC_INTERNAL_ID}")
 
+    @traced
     def remove_links(self):
-        output = self.run_cmd("pactl list sink-inputs")
-        for block in output.split("Sink Input #"):
-            if not block.strip():
-                continue
-            if 'media.name = "Link_' not in block:
-                continue
-            owner_match = re.search(r"Owner Module: (\d+)", block)
-            if owner_match:
-                mod_id = owner_match.group(1)
-                if mod_id:
-                    self.run_cmd(f"pactl unload-module {mod_id}")
-
+        mod_ids = []
+        for entry in parse_sink_inputs(self.run_cmd("pactl list sink-inputs")):
+            if entry["props"].get("media.name", "").startswith("Link_") and entry["owner_module"]:
+                mod_ids.append(entry["owner_module"])
+        if mod_ids:
+            self.run_cmd(" ; ".join(f"pactl unload-module {mod_id}" for mod_id in mod_ids))
+
+    @traced
     def rebuild_routing(self):
-        phy_out = self.selected_output
-        phy_mic = self.selected_input
+        phy_mic = self.mic_input()
         self.remove_links()
-        if not phy_out:
+        if not self.output_devices():
             return
 
         if self.streamer_mode:
@@ -840,14 +4978,146 @@ class MuxHome(QMainWindow):
                         self.run_cmd(f"pactl unload-module {mod_id}")
 
         for ch in self.sinks:
-            self.run_cmd(f"pactl load-module module-loopback source={ch}.monitor sink={phy_out} latency_msec=40 adjust_time=0 sink_input_properties=media.name=Link_User_{ch}")
+            if self.channel_output(ch):
+                self.load_user_link(ch)
             if self.streamer_mode:
                 self.run_cmd(f"pactl load-module module-loopback source={ch}.monitor sink={STREAM_MIX_NAME} latency_msec=60 adjust_time=0 sink_input_properties=media.name=Link_Stream_{ch}")
 
         if phy_mic:
-            self.run_cmd(f"pactl load-module module-loopback source={phy_mic} sink={INTERNAL_MIC_PROCESSING} latency_msec=40 adjust_time=0 sink_input_properties=media.name=Link_Mic_Chat")
-            if self.streamer_mode:
-                self.run_cmd(f"pactl load-module module-loopback source={phy_mic} sink={STREAM_MIX_NAME} latency_msec=40 adjust_time=0 sink_input_properties=media.name=Link_Mic_Stream")
+            self.load_mic_links(phy_mic)
+
+        self.rebuild_bus_routing()
+
+    @traced
+    def load_mic_links(self, phy_mic):
+        mic_target = INTERNAL_MIC_PROCESSING
+        if self.mic_chain_settings.get("enabled") and self.mic_chain.start():
+            mic_target = MIC_CHAIN_SINK
+        elif not self.mic_chain_settings.get("enabled"):
+            self.mic_chain.stop()
+        self.run_cmd(f"pactl load-module module-loopback source={phy_mic} sink={mic_target} latency_msec=40 adjust_time=0 sink_input_properties=media.name=Link_Mic_Chat")
+        if self.streamer_mode:
+            self.run_cmd(f"pactl load-module module-loopback source={phy_mic} sink={STREAM_MIX_NAME} latency_msec=40 adjust_time=0 sink_input_properties=media.name=Link_Mic_Stream")
+
+    def reroute_mic(self):
+        # A loopback can't change its source, so only the two mic links are
+        # reloaded; channel and bus links stay untouched.
+        phy_mic = self.mic_input()
+        cmds = []
+        for entry in parse_sink_inputs(self.run_cmd("pactl list sink-inputs")):
+            if entry["props"].get("media.name", "").startswith("Link_Mic_") and entry["owner_module"]:
+                cmds.append(f"pactl unload-module {entry['owner_module']}")
+        if cmds:
+            self.run_cmd(" ; ".join(cmds))
+        if phy_mic:
+            self.load_mic_links(phy_mic)
+        self.refresh_input_ids()
+        mic = self.channels["Mic"]
+        if mic.muted and self.active_inputs["Mic"].get("chat_input"):
+            self.set_input_mute(self.active_inputs["Mic"]["chat_input"], True, 0)
+        if mic.stream_muted and self.active_inputs["Mic"].get("stream_input"):
+            self.set_input_mute(self.active_inputs["Mic"]["stream_input"], True, 0)
+        self.poke_sync()
+
+    def bus_sink(self, bus):
+        return f"{bus}_Mix"
+
+    @traced
+    def rebuild_bus_routing(self, mods=None):
+        if mods is None:
+            mods = self.run_cmd("pactl list short modules")
+        for bus in self.buses:
+            if f"sink_name={self.bus_sink(bus['name'])} " not in mods + " ":
+                self.create_device(self.bus_sink(bus["name"]), f"{bus['label']} Mix", is_source=False)
+        for bus, ch, _, _ in self.bus_matrix.routed():
+            self.load_bus_link(bus, ch)
+        self.refresh_input_ids()
+        # Fresh loopbacks start at 100%: push the matrix in one batch
+        with self.volume_writer.batch():
+            for bus, ch, gain, muted in self.bus_matrix.routed():
+                link = self.bus_links.get((bus, ch))
+                if not link:
+                    continue
+                self.volume_writer.set("sink-input", link[0], gain, ramp=False)
+                if muted:
+                    self.volume_writer.set_mute("sink-input", link[0], True, 0)
+
+    def load_bus_link(self, bus, ch):
+        source = MIC_INTERNAL_ID if ch == "Mic" else f"{self.sinks[ch]}.monitor"
+        self.run_cmd(f"pactl load-module module-loopback source={source} sink={self.bus_sink(bus)} latency_msec=60 adjust_time=0 sink_input_properties=media.name=Link_Bus_{bus}_{ch}")
+
+    def apply_bus_ops(self, bus, ch, ops):
+        gain, muted = self.bus_matrix.get(bus, ch)
+        link = self.bus_links.get((bus, ch))
+        if "unload" in ops:
+            if link and link[1]:
+                self.run_cmd(f"pactl unload-module {link[1]}")
+            self.bus_links.pop((bus, ch), None)
+            return
+        if "load" in ops:
+            self.load_bus_link(bus, ch)
+            self.refresh_input_ids()
+            link = self.bus_links.get((bus, ch))
+            if link:
+                self.volume_writer.observe("sink-input", link[0], 100, False)
+        if not link:
+            return
+        if "load" in ops or "volume" in ops:
+            self.volume_writer.set("sink-input", link[0], gain)
+        if "mute" in ops:
+            self.set_input_mute(link[0], muted)
+
+    def set_bus_volume(self, name, bus, val):
+        ops = self.bus_matrix.set(bus, name, gain=val)
+        self.apply_bus_ops(bus, name, ops)
+        self.poke_sync(("sink-input",))
+        self.schedule_save()
+
+    def toggle_bus_mute(self, name, bus):
+        gain, muted = self.bus_matrix.get(bus, name)
+        ops = self.bus_matrix.set(bus, name, muted=not muted)
+        self.apply_bus_ops(bus, name, ops)
+        widget = self.widgets.get(name)
+        if widget:
+            widget.update_bus_state(bus, gain, not muted)
+        self.poke_sync(("sink-input",))
+        self.schedule_save()
+
+    def set_buses(self, buses):
+        # Adding or removing a bus reshapes the matrix, so routing and every
+        # card's bus columns are rebuilt; existing cells are carried over.
+        old_names = [b["name"] for b in self.buses]
+        new_names = [b["name"] for b in buses]
+        matrix = BusMatrix(new_names, list(self.channels))
+        matrix.carry_over(self.bus_matrix)
+        self.buses = buses
+        self.bus_matrix = matrix
+        self.apply_theme()
+        mods = self.run_cmd("pactl list short modules")
+        for (bus, ch), (_, mod_id) in list(self.bus_links.items()):
+            if bus not in new_names:
+                if mod_id:
+                    self.run_cmd(f"pactl unload-module {mod_id}")
+                self.bus_links.pop((bus, ch), None)
+        for line in mods.split('\n'):
+            parts = line.split('\t')
+            for bus in old_names:
+                if bus not in new_names and f"sink_name={self.bus_sink(bus)} " in line + " ":
+                    self.run_cmd(f"pactl unload-module {parts[0].strip()}")
+        for bus in buses:
+            if bus["name"] in old_names:
+                continue
+            if f"sink_name={self.bus_sink(bus['name'])} " not in mods + " ":
+                self.create_device(self.bus_sink(bus["name"]), f"{bus['label']} Mix", is_source=False)
+            for ch in self.channels:
+                if matrix.get(bus["name"], ch)[0] > 0:
+                    self.apply_bus_ops(bus["name"], ch, ["load"])
+        for name, widget in self.widgets.items():
+            widget.set_buses(self.buses)
+            for bus in self.buses:
+                widget.update_bus_state(bus["name"], *self.bus_matrix.get(bus["name"], name))
+        self.restart_replay()
+        self.save_config()
 
     def setup_ui(self):
         central = QWidget()
@@ -863,11 +5133,61 @@ class MuxHome(QMainWindow):
         top_layout.addStretch()
 
         self.streamer_btn = QPushButton("STREAMER MODE")
+        self.streamer_btn.setObjectName("TopButton")
         self.streamer_btn.setCursor(Qt.CursorShape.PointingHandCursor)
         self.streamer_btn.clicked.connect(self.toggle_streamer_mode)
         top_layout.addWidget(self.streamer_btn)
 
+        self.scenes_btn = QPushButton("SCENES")
+        self.scenes_btn.setObjectName("TopButton")
+        self.scenes_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.scenes_btn.clicked.connect(self.open_scenes_dialog)
+        top_layout.addWidget(self.scenes_btn)
+
+        self.midi_btn = QPushButton("MIDI")
+        self.midi_btn.setObjectName("TopButton")
+        self.midi_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.midi_btn.clicked.connect(self.open_midi_dialog)
+        top_layout.addWidget(self.midi_btn)
+
+        self.obs_btn = QPushButton("OBS")
+        self.obs_btn.setObjectName("TopButton")
+        self.obs_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.obs_btn.clicked.connect(self.open_obs_dialog)
+        top_layout.addWidget(self.obs_btn)
+
+        self.remote_btn = QPushButton("REMOTE")
+        self.remote_btn.setObjectName("TopButton")
+        self.remote_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.remote_btn.clicked.connect(self.open_remote_dialog)
+        top_layout.addWidget(self.remote_btn)
+
+        self.rec_btn = QPushButton("REC")
+        self.rec_btn.setObjectName("TopButton")
+        self.rec_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.rec_btn.clicked.connect(self.open_recorder_dialog)
+        top_layout.addWidget(self.rec_btn)
+
+        self.buses_btn = QPushButton("BUSES")
+        self.buses_btn.setObjectName("TopButton")
+        self.buses_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.buses_btn.clicked.connect(self.open_buses_dialog)
+        top_layout.addWidget(self.buses_btn)
+
+        self.duck_btn = QPushButton("DUCKING")
+        self.duck_btn.setObjectName("TopButton")
+        self.duck_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.duck_btn.clicked.connect(self.open_ducking_dialog)
+        top_layout.addWidget(self.duck_btn)
+
+        self.mic_fx_btn = QPushButton("MIC FX")
+        self.mic_fx_btn.setObjectName("TopButton")
+        self.mic_fx_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.mic_fx_btn.clicked.connect(self.open_mic_chain_dialog)
+        top_layout.addWidget(self.mic_fx_btn)
+
         setup_btn = QPushButton("INITIAL SETUP")
+        setup_btn.setObjectName("TopButton")
         setup_btn.setIcon(QIcon.fromTheme("preferences-system"))
         setup_btn.setCursor(Qt.CursorShape.PointingHandCursor)
         setup_btn.clicked.connect(self.open_setup_dialog)
@@ -875,8 +5195,10 @@ class MuxHome(QMainWindow):
 
         main_layout.addWidget(top_bar)
 
-        mixer_row = QHBoxLayout()
-        mixer_row.setSpacing(20)
+        mixer_host = CardShadowHost()
+        mixer_row = QHBoxLayout(mixer_host)
+        mixer_row.setContentsMargins(*SHADOW_MARGINS)
+        mixer_row.setSpacing(CARD_SPACING)
 
         self.widgets = {}
         slider_height = 280
@@ -889,96 +5211,226 @@ class MuxHome(QMainWindow):
                 self.toggle_user_mute,
                 self.toggle_stream_mute,
                 self.open_hk_dialog,
-                self.move_app_to_sink,
+                self.move_apps_to_sink,
                 self,
                 self.streamer_mode,
                 slider_height,
-                streamer_slider_height
+                streamer_slider_height,
+                self.open_eq_dialog if name in self.sinks else None,
+                self.channel_labels.get(name, name),
+                self.buses,
+                self.set_bus_volume,
+                self.toggle_bus_mute
             )
+            w.setFixedWidth(CARD_WIDTH)
             self.widgets[name] = w
             mixer_row.addWidget(w)
 
-        main_layout.addLayout(mixer_row)
+        # Past the screen width the cards scroll horizontally instead of the
+        # window growing or squeezing every card.
+        mixer_scroll = QScrollArea()
+        mixer_scroll.setWidgetResizable(True)
+        mixer_scroll.setFrameShape(QFrame.Shape.NoFrame)
+        mixer_scroll.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        mixer_scroll.setObjectName("MixerScroll")
+        mixer_scroll.setWidget(mixer_host)
+        main_layout.addWidget(mixer_scroll)
+
+        count = len(self.widgets)
+        shadow_w = SHADOW_MARGINS[0] + SHADOW_MARGINS[2]
+        shadow_h = SHADOW_MARGINS[1] + SHADOW_MARGINS[3]
+        width = count * CARD_WIDTH + (count - 1) * CARD_SPACING + shadow_w + 14
+        screen = QApplication.primaryScreen()
+        if screen:
+            width = min(width, screen.availableGeometry().width())
+        self.setMinimumSize(min(width, 2 * CARD_WIDTH + CARD_SPACING + shadow_w + 14), 735 + shadow_h)
+        self.resize(width, 735 + shadow_h)
         self.update_button_styles()
 
-    def update_button_styles(self):
-        if self.streamer_mode:
-            self.streamer_btn.setStyleSheet(f"background: {THEME['Accent']}; color: #0B0C10; font-weight: 800; padding: 10px 18px; border-radius: 12px; border: none; font-size: 12px;")
-        else:
-            self.streamer_btn.setStyleSheet(f"background: {THEME['CardAlt']}; color: {THEME['Text']}; font-weight: 800; padding: 10px 18px; border-radius: 12px; border: none; font-size: 12px;")
-        for btn in self.findChildren(QPushButton):
-            if btn is self.streamer_btn:
-                continue
+    def apply_theme(self):
+        # Bus colours live in the sheet as tones, so it is recompiled when
+        # the bus list changes; everything else only flips properties.
+        QApplication.instance().setStyleSheet(compile_stylesheet(self.buses))
 
-        for btn in [b for b in self.findChildren(QPushButton) if b.text() == "INITIAL SETUP"]:
-            btn.setStyleSheet(f"background: {THEME['CardAlt']}; color: {THEME['Text']}; font-weight: 800; padding: 10px 18px; border-radius: 12px; border: none; font-size: 12px;")
+    def update_button_styles(self):
+        set_style_state(self.streamer_btn, "lit", "accent" if self.streamer_mode else "")
+        set_style_state(self.duck_btn, "lit", "accent" if self.duck_settings.get("enabled") else "")
+        set_style_state(self.mic_fx_btn, "lit", "mic" if self.mic_chain_settings.get("enabled") else "")
+        set_style_state(self.midi_btn, "lit", "accent" if self.midi.running() else "")
+        set_style_state(self.obs_btn, "lit", "accent" if self.obs.connected else "")
+        set_style_state(self.remote_btn, "lit", "accent" if self.remote.running() else "")
+        set_style_state(self.rec_btn, "lit", "rec" if self.recorder.recording() else "")
+        set_style_state(self.buses_btn, "lit", "accent" if self.buses else "")
 
     def toggle_streamer_mode(self):
-        self.streamer_mode = not self.streamer_mode
-        for w in self.widgets.values():
-            w.set_streamer_mode(self.streamer_mode)
-        self.update_button_styles()
-        self.handle_mode_toggle()
-        self.register_hotkeys()
+        # Not @traced: clicked would hand the wrapper its checked argument
+        with trace("MuxHome.toggle_streamer_mode", streamer_mode=not self.streamer_mode):
+            self.streamer_mode = not self.streamer_mode
+            for name, w in self.widgets.items():
+                w.set_streamer_mode(self.streamer_mode)
+                ch = self.channels[name]
+                w.update_state(ch.volume, ch.stream_volume, ch.muted, ch.stream_muted)
+            self.update_button_styles()
+            self.handle_mode_toggle()
+            self.register_hotkeys()
+            self.remote.publish_state()
+            self.poke_sync()
 
     def move_app_to_sink(self, app_id, target_name):
-        if target_name in self.sinks:
-            self.run_cmd(f"pactl move-sink-input {app_id} {target_name}")
+        self.move_apps_to_sink([app_id], target_name)
 
-    def _apply_user_volume(self, name, v):
+    def refresh_app_lists(self):
+        for name, widget in self.widgets.items():
+            widget.update_apps_list(self.channels[name].apps)
+
+    def app_stream_ids(self, app_name):
+        return [app_id for ch in self.channels.values() for name, app_id, _ in ch.apps if name == app_name]
+
+    @traced
+    def move_apps_to_sink(self, app_ids, target_name):
+        # All moves go to the volume writer as one pipelined shell, and the
+        # app lists are updated right away; the sink-input events that follow
+        # confirm (or correct) the optimistic state.
+        if target_name not in self.sinks:
+            return
+        app_ids = [str(i) for i in app_ids]
+        moving = set(app_ids)
+        moved = []
+        with self.store.batch():
+            for name, ch in self.channels.items():
+                keep = [app for app in ch.apps if app[1] not in moving or name == target_name]
+                moved.extend(app for app in ch.apps if app[1] in moving and name != target_name)
+                if len(keep) != len(ch.apps):
+                    self.store.update(name, apps=keep)
+            if moved:
+                self.store.update(target_name, apps=self.channels[target_name].apps + moved)
+        if not moved:
+            return
+        self.volume_writer.run([f"pactl move-sink-input {app[1]} {self.sinks[target_name]}" for app in moved])
+        for app in moved:
+            identity = self.input_identity.get(app[1])
+            if identity:
+                memory = self.app_channels.setdefault(identity, {"channel": target_name, "volume": None})
+                memory["channel"] = target_name
+        self.schedule_save()
+        self.poke_sync(("sink-input",))
+
+    def place_new_streams(self, inputs, sinks_by_name):
+        # New app streams go to the channel remembered for their application.
+        # This runs on the sync listing that announced them, so placement is
+        # one batched move with no extra queries. Returns True when the
+        # remembered volumes changed.
+        seen = self.input_identity
+        current = {}
+        cmds = []
+        changed = False
+        for entry in inputs:
+            if entry["props"].get("media.name", "").startswith("Link_"):
+                continue
+            identity = app_identity(entry["props"])
+            current[entry["id"]] = identity
+            memory = self.app_channels.get(identity)
+            if not memory or memory["channel"] not in self.sinks:
+                continue
+            target = sinks_by_name.get(self.sinks[memory["channel"]])
+            if entry["id"] in seen or not self.sync_primed:
+                # Existing stream: its volume, if changed where it is
+                # remembered, becomes the new per-app volume.
+                if target and entry["sink"] == target["index"] and entry["volume"] is not None and entry["volume"] != memory["volume"]:
+                    memory["volume"] = entry["volume"]
+                    changed = True
+                continue
+            if target and entry["sink"] != target["index"]:
+                cmds.append(f"pactl move-sink-input {entry['id']} {self.sinks[memory['channel']]}")
+                entry["sink"] = target["index"]
+            if memory["volume"] is not None and entry["volume"] != memory["volume"]:
+                self.volume_writer.set("sink-input", entry["id"], memory["volume"], ramp=False)
+                entry["volume"] = memory["volume"]
+        if cmds:
+            self.run_cmd(" ; ".join(cmds))
+        self.input_identity = current
+        return changed
+
+    def _apply_user_volume(self, name, v, ramp_ms=None):
         if name in self.sinks:
-            self.run_cmd(f"pactl set-sink-volume {self.sinks[name]} {v}%")
-            self.run_cmd(f"pactl set-sink-mute {self.sinks[name]} 0")
+            self.volume_writer.set("sink", self.sinks[name], v, unmute=True, ramp_ms=ramp_ms)
             return
-        if name == "Mic" and self.selected_input:
-            self.run_cmd(f"pactl set-source-volume {self.selected_input} {v}%")
-            self.run_cmd(f"pactl set-source-mute {self.selected_input} 0")
+        if name == "Mic" and self.mic_input():
+            self.volume_writer.set("source", self.mic_input(), v, unmute=True, ramp_ms=ramp_ms)
             return
         input_id = self.get_input_id(name, self.user_input_key(name))
         if input_id:
-            self.set_input_volume(input_id, v)
+            self.set_input_volume(input_id, v, ramp_ms)
 
+    # Setters may run on the hotkey thread: they only touch the store and the
+    # volume writer, and the store's subscribers do the rest.
     def set_user_volume(self, name, val):
-        self.channels[name].volume = int(val)
         v = int(val)
-        self.user_volumes[name] = v
+        self.store.update(name, volume=v)
         self._apply_user_volume(name, v)
-        self.schedule_save()
 
     def set_stream_volume(self, name, val):
         if not self.streamer_mode:
             return
-        self.channels[name].stream_volume = int(val)
-        self.stream_volumes[name] = int(val)
+        self.store.update(name, stream_volume=int(val))
         input_id = self.get_input_id(name, "stream_input")
         if input_id:
-            self.set_input_volume(input_id, int(val))
-        self.schedule_save()
+            self.set_input_volume(input_id, int(val) * self.stream_gain(name))
 
     def toggle_user_mute(self, name):
         input_id = self.get_input_id(name, self.user_input_key(name))
         if input_id:
-            new_state = not self.channels[name].muted
-            self.channels[name].muted = new_state
-            widget = self.widgets.get(name)
-            if widget:
-                ch = self.channels[name]
-                widget.update_state(ch.volume, ch.stream_volume, ch.muted, ch.stream_muted)
-            threading.Thread(target=self.set_input_mute, args=(input_id, new_state), daemon=True).start()
+            self.set_input_mute(input_id, self.store.toggle(name, "muted"))
 
     def toggle_stream_mute(self, name):
         if not self.streamer_mode:
             return
         input_id = self.get_input_id(name, "stream_input")
         if input_id:
-            new_state = not self.channels[name].stream_muted
-            self.channels[name].stream_muted = new_state
+            self.set_input_mute(input_id, self.store.toggle(name, "stream_muted"))
+
+    def on_store_change(self, version, changes, origin):
+        # Called on whichever thread wrote, once the store lock is released:
+        # local writes poke only the object classes they touched, and the
+        # rest is handed to the GUI thread.
+        if origin == "user":
+            classes = set()
+            for name, fields in changes.items():
+                if "volume" in fields:
+                    classes.add(self.user_sync_class(name))
+                if fields & {"muted", "stream_volume", "stream_muted"}:
+                    classes.add("sink-input")
+            if classes:
+                self.poke_sync(tuple(classes))
+        self.signaler.state_changed.emit(changes, origin)
+
+    @traced
+    def apply_state_changes(self, changes, origin):
+        save = False
+        for name, fields in changes.items():
+            if "hotkeys" in fields:
+                save = True
+                self.register_hotkeys()
+            ch = self.channels.get(name)
+            if ch is None:
+                continue
+            if "volume" in fields and name in self.user_volumes:
+                self.user_volumes[name] = ch.volume
+                save = True
+            if "stream_volume" in fields and name in self.stream_volumes:
+                self.stream_volumes[name] = ch.stream_volume
+                save = True
             widget = self.widgets.get(name)
-            if widget:
-                ch = self.channels[name]
+            if widget is None:
+                continue
+            if fields & {"volume", "stream_volume", "muted", "stream_muted"}:
                 widget.update_state(ch.volume, ch.stream_volume, ch.muted, ch.stream_muted)
-            threading.Thread(target=self.set_input_mute, args=(input_id, new_state), daemon=True).start()
+            if "apps" in fields and not self.is_dragging_app:
+                widget.update_apps_list(ch.apps)
+        if save:
+            self.schedule_save()
 
+    @traced
     def apply_stream_defaults(self):
         if not self.streamer_mode:
             return
@@ -989,88 +5441,154 @@ class MuxHome(QMainWindow):
                 if target is None:
                     target = ch.volume
                     self.stream_volumes[name] = target
-                ch.stream_volume = target
-                self.set_input_volume(stream_id, target)
+                if not self.store.update(name, stream_volume=target):
+                    widget = self.widgets.get(name)
+                    if widget:
+                        widget.update_state(ch.volume, ch.stream_volume, ch.muted, ch.stream_muted)
+                self.set_input_volume(stream_id, target * self.stream_gain(name))
         self.schedule_save()
-        for name, widget in self.widgets.items():
-            ch = self.channels[name]
-            widget.update_state(ch.volume, ch.stream_volume, ch.muted, ch.stream_muted)
 
+    def capture_scene(self):
+        channels = {}
+        apps = {}
+        for name, ch in self.channels.items():
+            channels[name] = {
+                "volume": ch.volume,
+                "stream_volume": ch.stream_volume,
+                "muted": ch.muted,
+                "stream_muted": ch.stream_muted,
+            }
+            if name in self.sinks:
+                for app_name, _, _ in ch.apps:
+                    apps[app_name] = name
+        return {"streamer_mode": self.streamer_mode, "channels": channels, "apps": apps}
+
+    def save_scene(self, scene_name, fade_ms=0):
+        previous = self.scenes.get(scene_name, {})
+        scene = self.capture_scene()
+        scene["fade_ms"] = int(fade_ms)
+        scene["hotkey"] = previous.get("hotkey", "")
+        self.scenes[scene_name] = scene
+        self.save_config()
+        self.remote.publish_state()
+
+    def delete_scene(self, scene_name):
+        if self.scenes.pop(scene_name, None) is not None:
+            scene_map = self.obs_settings["scene_map"]
+            for obs_scene in [k for k, v in scene_map.items() if v == scene_name]:
+                del scene_map[obs_scene]
+            self.save_config()
+            self.register_hotkeys()
+            self.remote.publish_state()
+
+    def set_scene_hotkey(self, scene_name, value):
+        if scene_name in self.scenes:
+            self.scenes[scene_name]["hotkey"] = value
+            self.save_config()
+            self.register_hotkeys()
+
+    @traced
+    def recall_scene(self, scene_name):
+        scene = self.scenes.get(scene_name)
+        if not scene:
+            return
+        started = time.perf_counter()
+        fade = int(scene.get("fade_ms", 0)) or None
+        states = scene.get("channels", {})
+        if scene.get("streamer_mode", self.streamer_mode) != self.streamer_mode:
+            # Routing is rebuilt; the stored stream volumes are picked up by
+            # apply_stream_defaults once the new loopbacks exist.
+            for name, state in states.items():
+                if name in self.stream_volumes:
+                    self.stream_volumes[name] = int(state.get("stream_volume", 0))
+            self.toggle_streamer_mode()
+
+        moves = []
+        with self.volume_writer.batch(), self.store.batch():
+            for name, state in states.items():
+                ch = self.channels.get(name)
+                if ch is None:
+                    continue
+                inputs = self.active_inputs.get(name, {})
+                volume = int(state.get("volume", ch.volume))
+                muted = state.get("muted") is True
+                self._apply_user_volume(name, volume, fade)
+                user_id = inputs.get(self.user_input_key(name))
+                if user_id and muted != ch.muted:
+                    self.set_input_mute(user_id, muted, fade)
+                self.store.update(name, volume=volume, muted=muted)
+
+                if self.streamer_mode:
+                    stream_volume = int(state.get("stream_volume", ch.stream_volume))
+                    stream_muted = state.get("stream_muted") is True
+                    stream_id = inputs.get("stream_input")
+                    if stream_id:
+                        self.volume_writer.set("sink-input", stream_id, stream_volume * self.stream_gain(name), ramp_ms=fade)
+                        if stream_muted != ch.stream_muted:
+                            self.set_input_mute(stream_id, stream_muted, fade)
+                    self.store.update(name, stream_volume=stream_volume, stream_muted=stream_muted)
+
+            assignments = scene.get("apps", {})
+            for name, ch in self.channels.items():
+                for app_name, app_id, _ in ch.apps:
+                    target = assignments.get(app_name)
+                    if target and target != name and target in self.sinks:
+                        moves.append(f"pactl move-sink-input {app_id} {self.sinks[target]}")
+            self.volume_writer.run(moves)
+
+        self.last_recall_ms = (time.perf_counter() - started) * 1000
+        self.poke_sync()
+
+    @traced
     def dispatch_app_updates(self, data):
         if not self.is_dragging_app:
             for name, apps in data.items():
                 if name in self.widgets:
                     self.widgets[name].update_apps_list(apps)
 
-    def fetch_app_mapping(self):
-        mapping = {"Game": [], "Chat": [], "Media": [], "Mic": []}
-        sink_list = self.run_cmd("pactl list short sinks")
-        sink_id_map = {}
-        for line in sink_list.split('\n'):
-            parts = line.split('\t')
-            if len(parts) > 1:
-                for s_name in self.sinks:
-                    if s_name in parts[1]:
-                        sink_id_map[parts[0]] = s_name
-
-        inputs_raw = self.run_cmd("pactl list sink-inputs")
-        blocks = inputs_raw.split("Sink Input #")
-        for block in blocks:
-            if not block.strip():
+    def fetch_app_mapping(self, sinks=None, inputs=None):
+        mapping = {name: [] for name in self.channels}
+        if sinks is None:
+            sinks = parse_sinks(self.run_cmd("pactl list sinks"))
+        if inputs is None:
+            inputs = parse_sink_inputs(self.run_cmd("pactl list sink-inputs"))
+        sink_names = set(self.sinks.values())
+        sink_id_map = {s["index"]: s["name"] for s in sinks if s["name"] in sink_names}
+
+        for entry in inputs:
+            if entry["props"].get("media.name", "").startswith("Link_"):
                 continue
-            if 'media.name = "Link_' in block:
+            target_track = sink_id_map.get(entry["sink"])
+            if target_track is None:
                 continue
-            input_id_match = re.search(r"^(\d+)", block.strip())
-            sink_match = re.search(r"Sink: (\d+)", block)
-            if input_id_match and sink_match:
-                i_id = input_id_match.group(1)
-                s_id = sink_match.group(1)
-                if s_id in sink_id_map:
-                    target_track = sink_id_map[s_id]
-                    app_name = "Unknown"
-                    icon_name = "audio-card"
-                    name_match = re.search(r'application.name = "(.*?)"', block)
-                    if name_match:
-                        app_name = name_match.group(1)
-                    icon_match = re.search(r'application.icon_name = "(.*?)"', block)
-                    if icon_match:
-                        icon_name = icon_match.group(1)
-                    elif "brave" in app_name.lower():
-                        icon_name = "brave-browser"
-                    elif "discord" in app_name.lower():
-                        icon_name = "discord"
-                    elif "firefox" in app_name.lower():
-                        icon_name = "firefox"
-                    elif "chrome" in app_name.lower():
-                        icon_name = "google-chrome"
-                    elif "spotify" in app_name.lower():
-                        icon_name = "spotify-client"
-
-                    mapping[target_track].append((app_name, i_id, icon_name))
+            app_name = entry["props"].get("application.name", "Unknown")
+            mapping[target_track].append((app_name, entry["id"], self.icons.icon_for(entry["props"])))
         return mapping
 
     def user_input_key(self, name):
         return "chat_input" if name == "Mic" else "user_input"
 
-    def refresh_input_ids(self):
+    @traced
+    def refresh_input_ids(self, inputs=None):
         active = {name: {} for name in self.channels}
-        output = self.run_cmd("pactl list sink-inputs")
-        for block in output.split("Sink Input #"):
-            if not block.strip():
-                continue
-            id_match = re.search(r"^(\d+)", block.strip())
-            name_match = re.search(r'media.name = "(.*?)"', block)
-            if not id_match or not name_match:
-                continue
-            input_id = id_match.group(1)
-            link_name = name_match.group(1)
+        bus_links = {}
+        if inputs is None:
+            inputs = parse_sink_inputs(self.run_cmd("pactl list sink-inputs"))
+        for entry in inputs:
+            input_id = entry["id"]
+            link_name = entry["props"].get("media.name", "")
             if not link_name.startswith("Link_"):
                 continue
-            parts = link_name.split("_")
+            parts = link_name.split("_", 2)
             if len(parts) < 3:
                 continue
             category = parts[1]
             target = parts[2]
+            if category == "Bus":
+                bus_parts = target.split("_", 1)
+                if len(bus_parts) == 2:
+                    bus_links[(bus_parts[0], bus_parts[1])] = (input_id, entry["owner_module"])
+                continue
             if category == "Mic":
                 if target == "Chat":
                     active["Mic"]["chat_input"] = input_id
@@ -1083,11 +5601,23 @@ class MuxHome(QMainWindow):
                     active[target]["user_input"] = input_id
                 elif category == "Stream":
                     active[target]["stream_input"] = input_id
+        for name in self.sinks:
+            # Fresh user loopbacks start at 100% and unmuted, which gives the
+            # volume writer a starting point for mute ramps.
+            user_id = active[name].get("user_input")
+            if user_id and user_id != self.active_inputs.get(name, {}).get("user_input"):
+                self.volume_writer.observe("sink-input", user_id, 100, False)
         self.active_inputs = active
+        self.bus_links = bus_links
 
     def get_input_id(self, name, key):
         input_id = self.active_inputs.get(name, {}).get(key)
         if input_id is None:
+            if threading.current_thread() is not threading.main_thread():
+                # refresh_input_ids swaps maps sync_once is reading; other
+                # threads get the last sync's ids and a sync soon after.
+                self.poke_sync(("sink-input",))
+                return None
             self.refresh_input_ids()
             input_id = self.active_inputs.get(name, {}).get(key)
         return input_id
@@ -1119,70 +5649,213 @@ class MuxHome(QMainWindow):
             return None
         return "yes" in raw.lower()
 
-    def set_input_volume(self, input_id, value):
+    def set_input_volume(self, input_id, value, ramp_ms=None):
         v = max(0, min(100, int(value)))
-        self.run_cmd(f"pactl set-sink-input-volume {input_id} {v}%")
-        self.run_cmd(f"pactl set-sink-input-mute {input_id} 0")
+        self.volume_writer.set("sink-input", input_id, v, unmute=True, ramp_ms=ramp_ms)
 
-    def set_input_mute(self, input_id, muted):
-        self.run_cmd(f"pactl set-sink-input-mute {input_id} {1 if muted else 0}")
+    def set_input_mute(self, input_id, muted, ramp_ms=None):
+        self.volume_writer.set_mute("sink-input", input_id, muted, ramp_ms)
 
-    def sync_once(self):
-        self.refresh_input_ids()
-        changed = False
-        for name, ch in self.channels.items():
-            user_key = self.user_input_key(name)
-            user_id = self.active_inputs.get(name, {}).get(user_key)
-            stream_id = self.active_inputs.get(name, {}).get("stream_input")
-
-            if name in self.sinks:
-                v = self.get_sink_volume(self.sinks[name])
-                if v is not None:
-                    ch.volume = v
-                    if self.user_volumes.get(name) != v:
-                        self.user_volumes[name] = v
-                        changed = True
-            elif name == "Mic" and self.selected_input:
-                v = self.get_source_volume(self.selected_input)
-                if v is not None:
-                    ch.volume = v
-                    if self.user_volumes.get(name) != v:
-                        self.user_volumes[name] = v
-                        changed = True
-            elif user_id:
-                v = self.get_input_volume(user_id)
-                if v is not None:
-                    ch.volume = v
-                    if self.user_volumes.get(name) != v:
-                        self.user_volumes[name] = v
-                        changed = True
-                m = self.get_input_mute(user_id)
-                if m is not None:
-                    ch.muted = m
-
-            if stream_id:
-                sv = self.get_input_volume(stream_id)
-                if sv is not None:
-                    ch.stream_volume = sv
-                    if self.stream_volumes.get(name) != sv:
-                        self.stream_volumes[name] = sv
-                        changed = True
-                sm = self.get_input_mute(stream_id)
-                if sm is not None:
-                    ch.stream_muted = sm
-
-        if not self.is_dragging_app:
-            app_mapping = self.fetch_app_mapping()
+    def user_sync_class(self, name):
+        if name in self.sinks:
+            return "sink"
+        if name == "Mic" and self.mic_input():
+            return "source"
+        return "sink-input"
+
+    def poke_sync(self, classes=SYNC_CLASSES):
+        self.signaler.poke_sync.emit(tuple(classes))
+
+    def _on_poke_sync(self, classes):
+        self.sync_scheduler.poke(classes)
+        delay = self.sync_scheduler.next_delay_ms()
+        if not self.sync_timer.isActive() or self.sync_timer.remainingTime() > delay:
+            self.sync_timer.start(delay)
+
+    @traced
+    def sync_tick(self):
+        due = self.sync_scheduler.due_classes()
+        if due:
+            started = time.perf_counter()
+            changed = self.sync_once(due)
+            self.metrics.sync_tick.observe(time.perf_counter() - started)
+            for cls in due:
+                self.sync_scheduler.report(cls, cls in changed)
+        self.sync_timer.start(self.sync_scheduler.next_delay_ms())
+
+    def watch_server_events(self):
+        # Runs on the event-reader thread: the scheduler is only touched on
+        # the GUI thread, through the signaler.
+        try:
+            events = self.backend.events()
+        except:
+            return
+        live = False
+        for line in events:
+            match = re.search(r"on ([a-z-]+)", line)
+            if not match:
+                continue
+            if not live:
+                # Only a subscription that actually delivers earns the idle interval
+                live = True
+                self.signaler.server_events.emit(True)
+            kind = match.group(1)
+            if kind in ("sink", "source") and ("'new'" in line or "'remove'" in line):
+                self.signaler.hotplug.emit()
+            if kind in SYNC_CLASSES:
+                self.poke_sync((kind,))
+            elif kind in ("server", "module"):
+                self.poke_sync()
+        # Subscription died (or was never supported): fall back to adaptive polling
+        if live:
+            self.signaler.server_events.emit(False)
+        self.poke_sync()
+
+    def _on_server_events(self, live):
+        self.events_available = live
+        self.sync_scheduler.set_slow_ms(SYNC_IDLE_MS if live else SYNC_SLOW_MS)
+        delay = self.sync_scheduler.next_delay_ms()
+        if not self.sync_timer.isActive() or self.sync_timer.remainingTime() > delay:
+            self.sync_timer.start(delay)
+
+    def stream_gain(self, name):
+        if self.duck_settings.get("duck_stream") and name in self.duck_settings.get("targets", []):
+            return duck_percent(1.0, self.duck_gain)
+        return 1.0
+
+    def apply_duck_gain(self, gain):
+        # Called from the follower threads; ids come from the last sync and
+        # every write goes through the coalescing volume writer.
+        self.duck_gain = gain
+        for name in self.duck_settings.get("targets", []):
+            if name not in self.sinks:
+                continue
+            inputs = self.active_inputs.get(name, {})
+            user_id = inputs.get("user_input")
+            if user_id:
+                self.volume_writer.set("sink-input", user_id, duck_percent(100, gain), ramp=False)
+            stream_id = inputs.get("stream_input")
+            if stream_id and self.streamer_mode and self.duck_settings.get("duck_stream"):
+                self.volume_writer.set("sink-input", stream_id, duck_percent(self.channels[name].stream_volume, gain), ramp=False)
+
+    def restart_ducking(self):
+        self.ducker.stop()
+        if not self.duck_settings.get("enabled"):
+            return
+        devices = []
+        for name in self.duck_settings.get("triggers", []):
+            if name == "Mic":
+                devices.append(MIC_INTERNAL_ID)
+            elif name in self.sinks:
+                devices.append(f"{self.sinks[name]}.monitor")
+        self.ducker.start(devices)
+
+    @traced
+    def sync_once(self, classes=SYNC_CLASSES):
+        changed = set()
+        save = False
+        # Fields the user changes while the listings are read keep their value
+        since = self.store.seq
+        # One listing per object class, whatever the number of channels
+        sink_list = None
+        inputs = None
+        inputs_by_id = {}
+        sinks_by_name = {}
+        if "sink" in classes or "sink-input" in classes:
+            sink_list = parse_sinks(self.run_cmd("pactl list sinks"))
+            sinks_by_name = {s["name"]: s for s in sink_list}
+        if "sink-input" in classes:
+            inputs = parse_sink_inputs(self.run_cmd("pactl list sink-inputs"))
+            if self.place_new_streams(inputs, sinks_by_name):
+                save = True
+            inputs_by_id = {entry["id"]: entry for entry in inputs}
+            previous_inputs = self.active_inputs
+            self.refresh_input_ids(inputs)
+            if self.active_inputs != previous_inputs:
+                changed.add("sink-input")
+        # Every read happens before the batch, so no pactl call or icon
+        # lookup runs while the store is collecting this sync's changes.
+        source_volume = None
+        if "source" in classes and "Mic" in self.channels and self.user_sync_class("Mic") == "source":
+            source_volume = self.get_source_volume(self.mic_input())
+        app_mapping = None
+        if "sink-input" in classes and not self.is_dragging_app:
+            app_mapping = self.fetch_app_mapping(sink_list, inputs)
+
+        # Read-back goes into the store as one batch; its change set drives
+        # the widget repaints and the config writer.
+        with self.store.batch("sync"):
             for name, ch in self.channels.items():
-                ch.apps = app_mapping.get(name, [])
+                user_key = self.user_input_key(name)
+                user_id = self.active_inputs.get(name, {}).get(user_key)
+                stream_id = self.active_inputs.get(name, {}).get("stream_input")
+                user_cls = self.user_sync_class(name)
+
+                if user_cls in classes:
+                    v = None
+                    m = None
+                    if user_cls == "sink":
+                        v = sinks_by_name.get(self.sinks[name], {}).get("volume")
+                        self.volume_writer.observe("sink", self.sinks[name], v)
+                    elif user_cls == "source":
+                        v = source_volume
+                        self.volume_writer.observe("source", self.mic_input(), v)
+                    elif user_id:
+                        entry = inputs_by_id.get(user_id, {})
+                        v = entry.get("volume")
+                        m = entry.get("muted")
+                        self.volume_writer.observe("sink-input", user_id, v, m)
+                    fields = {}
+                    if v is not None:
+                        fields["volume"] = v
+                    if m is not None:
+                        fields["muted"] = m
+                    if self.store.update(name, origin="sync", since=since, **fields):
+                        changed.add(user_cls)
+
+                if stream_id and "sink-input" in classes and self.stream_gain(name) == 1.0:
+                    entry = inputs_by_id.get(stream_id, {})
+                    sv = entry.get("volume")
+                    sm = entry.get("muted")
+                    self.volume_writer.observe("sink-input", stream_id, sv, sm)
+                    fields = {}
+                    if sv is not None:
+                        fields["stream_volume"] = sv
+                    if sm is not None:
+                        fields["stream_muted"] = sm
+                    if self.store.update(name, origin="sync", since=since, **fields):
+                        changed.add("sink-input")
+
+            bus_dirty = set()
+            if "sink-input" in classes:
+                for (bus, name), (input_id, _) in self.bus_links.items():
+                    entry = inputs_by_id.get(input_id)
+                    if not entry or bus not in self.bus_matrix.bus_pos or name not in self.channels:
+                        continue
+                    self.volume_writer.observe("sink-input", input_id, entry["volume"], entry["muted"])
+                    if self.bus_matrix.store(bus, name, entry["volume"], entry["muted"]):
+                        bus_dirty.add((bus, name))
+                        save = True
+                if bus_dirty:
+                    changed.add("sink-input")
+
+            if app_mapping is not None:
+                for name in self.channels:
+                    if self.store.update(name, origin="sync", since=since, apps=app_mapping.get(name, [])):
+                        changed.add("sink-input")
 
         for name, widget in self.widgets.items():
             ch = self.channels[name]
-            widget.update_state(ch.volume, ch.stream_volume, ch.muted, ch.stream_muted)
-            if not self.is_dragging_app:
+            if not self.sync_primed:
+                widget.update_state(ch.volume, ch.stream_volume, ch.muted, ch.stream_muted)
                 widget.update_apps_list(ch.apps)
-        if changed:
+            for bus in self.bus_matrix.buses:
+                if (bus, name) in bus_dirty or not self.sync_primed:
+                    widget.update_bus_state(bus, *self.bus_matrix.get(bus, name))
+        self.sync_primed = True
+        if save:
             self.schedule_save()
+        return changed
 
     def start_hotkeys(self):
         while True:
@@ -1195,29 +5868,34 @@ class MuxHome(QMainWindow):
                     pass
 
             def on_press(ch, action):
-                if action == "up":
-                    next_v = max(0, min(100, self.channels[ch].volume + 5))
-                    self.channels[ch].volume = next_v
-                    self.set_user_volume(ch, next_v)
-                elif action == "down":
-                    next_v = max(0, min(100, self.channels[ch].volume - 5))
-                    self.channels[ch].volume = next_v
-                    self.set_user_volume(ch, next_v)
-                elif action == "mute":
-                    self.toggle_user_mute(ch)
-                elif action == "stream_up":
-                    next_v = max(0, min(100, self.channels[ch].stream_volume + 5))
-                    self.channels[ch].stream_volume = next_v
-                    self.set_stream_volume(ch, next_v)
-                elif action == "stream_down":
-                    next_v = max(0, min(100, self.channels[ch].stream_volume - 5))
-                    self.channels[ch].stream_volume = next_v
-                    self.set_stream_volume(ch, next_v)
-                elif action == "stream_mute":
-                    self.toggle_stream_mute(ch)
+                started = time.perf_counter()
+                with trace("hotkey", channel=ch, action=action):
+                    if action == "up":
+                        self.set_user_volume(ch, self.store.adjust(ch, "volume", 5))
+                    elif action == "down":
+                        self.set_user_volume(ch, self.store.adjust(ch, "volume", -5))
+                    elif action == "mute":
+                        self.toggle_user_mute(ch)
+                    elif action == "stream_up":
+                        self.set_stream_volume(ch, self.store.adjust(ch, "stream_volume", 5))
+                    elif action == "stream_down":
+                        self.set_stream_volume(ch, self.store.adjust(ch, "stream_volume", -5))
+                    elif action == "stream_mute":
+                        self.toggle_stream_mute(ch)
+                self.metrics.hotkey.observe(time.perf_counter() - started)
 
             hotkeys = {}
-            for ch, acts in self.hotkeys_config.items():
+            for scene_name, scene in list(self.scenes.items()):
+                key = scene.get("hotkey")
+                if key:
+                    hotkeys[key] = lambda n=scene_name: self.signaler.recall_scene.emit(n)
+            if self.rec_settings.get("hotkey"):
+                hotkeys[self.rec_settings["hotkey"]] = self.signaler.toggle_recording.emit
+            if self.replay_settings.get("hotkey"):
+                hotkeys[self.replay_settings["hotkey"]] = self.signaler.save_replay.emit
+            if TRACER is not None:
+                hotkeys[TRACE_HOTKEY] = lambda: threading.Thread(target=TRACER.write, daemon=True).start()
+            for ch, acts in self.store.hotkey_snapshot().items():
                 if ch not in self.channels:
                     continue
                 for action, key in acts.items():
@@ -1237,7 +5915,7 @@ class MuxHome(QMainWindow):
         d = FixedDialog(self)
         d.setWindowTitle("Shortcuts")
         d.setFixedSize(540, 420)
-        d.setStyleSheet(f"background: {THEME['Card']}; color: white; border-radius: 12px;")
+        d.setObjectName("Panel")
 
         l = QVBoxLayout(d)
         l.setContentsMargins(12, 10, 12, 10)
@@ -1394,10 +6072,7 @@ class MuxHome(QMainWindow):
         d.exec()
 
     def save_hk_value(self, ch, act, value):
-        self.hotkeys_config.setdefault(ch, {"up": "", "down": "", "mute": "", "stream_up": "", "stream_down": "", "stream_mute": ""})
-        self.hotkeys_config[ch][act] = value
-        self.save_config()
-        self.register_hotkeys()
+        self.store.set_hotkey(ch, act, value)
 
     def open_setup_dialog(self):
         hw_outputs = {}
@@ -1409,7 +6084,7 @@ class MuxHome(QMainWindow):
                 curr = line.split(":", 1)[1].strip()
             elif line.startswith("Description:") and curr:
                 desc = line.split(":", 1)[1].strip()
-                is_virtual = curr in self.sinks.values() or STREAM_MIX_NAME in curr or INTERNAL_MIC_PROCESSING in curr or "Internal" in curr
+                is_virtual = curr in self.sinks.values() or STREAM_MIX_NAME in curr or INTERNAL_MIC_PROCESSING in curr or "Internal" in curr or MIC_CHAIN_SINK in curr or curr in [self.bus_sink(b["name"]) for b in self.buses]
                 if not is_virtual:
                     hw_outputs[desc] = curr
 
@@ -1422,13 +6097,13 @@ class MuxHome(QMainWindow):
                 curr_src = line.split(":", 1)[1].strip()
             elif line.startswith("Description:") and curr_src:
                 desc = line.split(":", 1)[1].strip()
-                is_virtual = MIC_INTERNAL_ID in curr_src or ".monitor" in curr_src
+                is_virtual = MIC_INTERNAL_ID in curr_src or ".monitor" in curr_src or curr_src.startswith(EQ_NODE_PREFIX)
                 if not is_virtual:
                     hw_inputs[desc] = curr_src
 
         d = FixedDialog(self)
         d.setWindowTitle("Audio Routing Setup")
-        d.setFixedSize(420, 320)
+        d.setFixedSize(420, 470 + 52 * min(len(self.sinks), 6))
         d.setStyleSheet(f"background: #0C0F16; color: white; border-radius: 18px;")
 
         l = QVBoxLayout(d)
@@ -1505,29 +6180,1465 @@ class MuxHome(QMainWindow):
         in_layout.addWidget(in_combo)
         l.addWidget(in_box)
 
+        ch_desc = QLabel("Per-channel output (optional)")
+        ch_desc.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        ch_desc.setStyleSheet("font-size: 13px; font-weight: 600; color: #E9EEF7; margin-top: 12px; margin-bottom: 8px;")
+        l.addWidget(ch_desc)
+
+        channel_box = QWidget()
+        channel_rows = QVBoxLayout(channel_box)
+        channel_rows.setContentsMargins(0, 0, 0, 0)
+        channel_scroll = QScrollArea()
+        channel_scroll.setWidgetResizable(True)
+        channel_scroll.setFrameShape(QFrame.Shape.NoFrame)
+        channel_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        channel_scroll.setWidget(channel_box)
+        l.addWidget(channel_scroll)
+
+        channel_combos = {}
+        for ch in self.sinks:
+            row = QHBoxLayout()
+            ch_lbl = QLabel(self.channel_labels.get(ch, ch).upper())
+            ch_lbl.setFixedWidth(70)
+            ch_lbl.setStyleSheet(f"font-size: 12px; font-weight: 800; color: {THEME.get(ch, THEME['Text'])};")
+            row.addWidget(ch_lbl)
+            ch_combo = SpacedComboBox()
+            ch_combo.addItem("Same as primary")
+            ch_combo.addItems(list(hw_outputs.keys()))
+            current = self.channel_outputs.get(ch)
+            for i, v in enumerate(hw_outputs.values()):
+                if v == current:
+                    ch_combo.setCurrentIndex(i + 1)
+                    break
+            ch_combo.setStyleSheet(out_combo.styleSheet())
+            row.addWidget(ch_combo)
+            channel_combos[ch] = ch_combo
+            channel_rows.addLayout(row)
+
+        fb_desc = QLabel("Fallbacks when a device is unplugged")
+        fb_desc.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        fb_desc.setStyleSheet("font-size: 13px; font-weight: 600; color: #E9EEF7; margin-top: 12px; margin-bottom: 8px;")
+        l.addWidget(fb_desc)
+
+        def fallback_row(label, devices, priority):
+            # Unplugged devices from the saved list stay selectable
+            devices = dict(devices)
+            for dev in priority:
+                if dev not in devices.values():
+                    devices[f"{dev} (disconnected)"] = dev
+            row = QHBoxLayout()
+            fb_lbl = QLabel(label)
+            fb_lbl.setFixedWidth(70)
+            fb_lbl.setStyleSheet(f"font-size: 12px; font-weight: 800; color: {THEME['Text']};")
+            row.addWidget(fb_lbl)
+            combos = []
+            for i in range(2):
+                combo = SpacedComboBox()
+                combo.addItem("None")
+                combo.addItems(list(devices.keys()))
+                if i < len(priority):
+                    for j, v in enumerate(devices.values()):
+                        if v == priority[i]:
+                            combo.setCurrentIndex(j + 1)
+                            break
+                combo.setStyleSheet(out_combo.styleSheet())
+                row.addWidget(combo)
+                combos.append(combo)
+            l.addLayout(row)
+            return lambda: [devices[c.currentText()] for c in combos if c.currentText() in devices]
+
+        output_fallbacks = fallback_row("OUTPUT", hw_outputs, self.output_priority)
+        input_fallbacks = fallback_row("MIC", hw_inputs, self.input_priority)
+
         l.addStretch()
 
         b = QPushButton("APPLY")
         b.setCursor(Qt.CursorShape.PointingHandCursor)
         b.setStyleSheet("background: #5EE7FF; color: #0B0C10; font-weight: bold; padding: 12px; border-radius: 12px; font-size: 12px;")
-        b.clicked.connect(lambda: self.apply_setup(hw_outputs.get(out_combo.currentText(), ""), hw_inputs.get(in_combo.currentText(), ""), d))
+        b.clicked.connect(lambda: self.apply_setup(
+            hw_outputs.get(out_combo.currentText(), ""),
+            hw_inputs.get(in_combo.currentText(), ""),
+            d,
+            {ch: hw_outputs.get(combo.currentText(), "") for ch, combo in channel_combos.items()},
+            output_fallbacks(),
+            input_fallbacks()
+        ))
         l.addWidget(b)
         d.exec()
 
-    def apply_setup(self, output_id, input_id, dialog):
+    def apply_setup(self, output_id, input_id, dialog, channel_outputs=None, output_priority=None, input_priority=None):
+        previous = {ch: self.channel_output(ch) for ch in self.sinks}
+        previous_mic = self.mic_input()
+        has_links = any(self.active_inputs.get(ch, {}).get("user_input") for ch in self.sinks)
         self.selected_output = output_id or None
         self.selected_input = input_id or None
+        if channel_outputs is not None:
+            self.channel_outputs = {ch: dev for ch, dev in channel_outputs.items() if dev}
+        if output_priority is not None:
+            self.output_priority = list(dict.fromkeys(output_priority))
+        if input_priority is not None:
+            self.input_priority = list(dict.fromkeys(input_priority))
+        full_rebuild = self.mic_input() != previous_mic or not has_links
         self.save_config()
-        self.initial_setup()
+        if full_rebuild:
+            self.initial_setup()
+        else:
+            for ch in self.sinks:
+                if self.channel_output(ch) != previous[ch]:
+                    self.reroute_channel(ch)
+        self.poke_sync()
         dialog.close()
 
     def register_hotkeys(self):
         self.hotkey_reload_event.set()
 
+    def open_mic_chain_dialog(self):
+        d = FixedDialog(self)
+        d.setWindowTitle("Mic Processing")
+        d.setFixedSize(460, 560)
+        d.setObjectName("Panel")
+
+        l = QVBoxLayout(d)
+        l.setContentsMargins(12, 10, 12, 10)
+        l.setSpacing(8)
+
+        title = QLabel("MIC PROCESSING")
+        title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        title.setStyleSheet("font-size: 13px; font-weight: 700; color: #C8D0E0; margin: 0 0 8px 0;")
+        l.addWidget(title)
+
+
+        chain_btn = QPushButton()
+        chain_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        def refresh_chain_btn():
+            enabled = self.mic_chain_settings.get("enabled") is True
+            chain_btn.setText("CHAIN ON" if enabled else "CHAIN OFF")
+            set_toggle(chain_btn, enabled, "Mic")
+        def toggle_chain():
+            self.mic_chain_settings["enabled"] = not self.mic_chain_settings.get("enabled")
+            refresh_chain_btn()
+            self.update_button_styles()
+            self.handle_mode_toggle()
+            refresh_report()
+        chain_btn.clicked.connect(toggle_chain)
+        refresh_chain_btn()
+        l.addWidget(chain_btn)
+
+        stage_row = QHBoxLayout()
+        for stage in MIC_CHAIN_STAGES:
+            key = stage["key"]
+            btn = QPushButton(key.upper())
+            btn.setCursor(Qt.CursorShape.PointingHandCursor)
+            if stage not in self.mic_chain.stages:
+                btn.setEnabled(False)
+                btn.setToolTip(f"{stage['plugin']}.so not found")
+            def toggle_stage(checked=False, key=key, btn=btn):
+                enabled = not self.mic_chain_settings[key].get("enabled", True)
+                if self.mic_chain.update(key, "enabled", enabled):
+                    self.reroute_mic()
+                set_toggle(btn, enabled, "Mic")
+                self.schedule_save()
+                refresh_report()
+            btn.clicked.connect(toggle_stage)
+            set_toggle(btn, self.mic_chain_settings[key].get("enabled", True) and btn.isEnabled(), "Mic")
+            stage_row.addWidget(btn)
+        l.addLayout(stage_row)
+
+        for key, field, label, lo, hi in MIC_CHAIN_UI:
+            row_wrap = QFrame()
+            row_wrap.setStyleSheet(f"background: {THEME['CardAlt']}; border-radius: 10px;")
+            row = QHBoxLayout(row_wrap)
+            row.setContentsMargins(10, 6, 10, 6)
+            row.setSpacing(10)
+
+            text_lbl = QLabel(label)
+            text_lbl.setStyleSheet("color: #C8D0E0; font-size: 12px; font-weight: 700;")
+            text_lbl.setFixedWidth(160)
+            row.addWidget(text_lbl)
+
+            slider = QSlider(Qt.Orientation.Horizontal)
+            slider.setRange(lo, hi)
+            slider.setValue(int(self.mic_chain_settings[key].get(field, lo)))
+            row.addWidget(slider)
+
+            value_lbl = QLabel(str(slider.value()))
+            value_lbl.setStyleSheet("color: #C8D0E0; font-size: 12px;")
+            value_lbl.setFixedWidth(36)
+            row.addWidget(value_lbl)
+
+            def on_change(v, key=key, field=field, value_lbl=value_lbl):
+                value_lbl.setText(str(v))
+                self.mic_chain.update(key, field, v)
+                self.schedule_save()
+            slider.valueChanged.connect(on_change)
+            l.addWidget(row_wrap)
+
+        report_lbl = QLabel()
+        report_lbl.setStyleSheet("color: #8A93A6; font-size: 11px;")
+        report_lbl.setWordWrap(True)
+        l.addWidget(report_lbl)
+        def refresh_report():
+            report = self.mic_chain.report()
+            lines = []
+            for st in report["stages"]:
+                if not st["available"]:
+                    lines.append(f"{st['stage']}: not installed")
+                else:
+                    state = "on" if st["enabled"] else "bypassed" if st["in_graph"] else "off"
+                    lines.append(f"{st['stage']}: {state}, +{st['latency_ms']:.1f} ms")
+            cpu = "n/a"
+            if report["busy_us"] is not None:
+                cpu = f"{report['busy_us']:.0f} us/cycle"
+                if report["busy_ratio"] is not None:
+                    cpu += f" ({report['busy_ratio'] * 100:.1f}% of quantum)"
+            lines.append(f"Chain: +{report['latency_ms']:.1f} ms, CPU {cpu}")
+            report_lbl.setText("\n".join(lines))
+        refresh_report()
+
+        l.addStretch()
+        d.setFocus()
+        d.exec()
+
+    def open_eq_dialog(self, ch):
+        if ch not in self.eq_chains:
+            return
+        chain = self.eq_chains[ch]
+        settings = self.eq_settings[ch]
+
+        d = FixedDialog(self)
+        d.setWindowTitle("Equalizer")
+        d.setFixedSize(560, 420)
+        d.setObjectName("Panel")
+
+        l = QVBoxLayout(d)
+        l.setContentsMargins(12, 10, 12, 10)
+        l.setSpacing(8)
+
+        title = QLabel(f"EQ: {ch.upper()}")
+        title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        title.setStyleSheet("font-size: 13px; font-weight: 700; color: #C8D0E0; margin: 0 0 8px 0;")
+        l.addWidget(title)
+
+        tone = ch if ch in THEME else "Accent"
+        enable_btn = QPushButton()
+        enable_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        def refresh_enable_btn():
+            enabled = settings.get("enabled") is True
+            enable_btn.setText("EQ ON" if enabled else "EQ OFF")
+            set_toggle(enable_btn, enabled, tone)
+        def toggle_eq():
+            settings["enabled"] = not settings.get("enabled")
+            refresh_enable_btn()
+            if chain.running():
+                chain.apply()
+                self.schedule_save()
+            else:
+                self.handle_mode_toggle()
+        enable_btn.clicked.connect(toggle_eq)
+        refresh_enable_btn()
+        l.addWidget(enable_btn)
+
+        bands_row = QHBoxLayout()
+        bands_row.setSpacing(10)
+        for i, band in enumerate(settings["bands"]):
+            col = QVBoxLayout()
+            freq_lbl = QLabel()
+            freq_lbl.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            freq_lbl.setStyleSheet("color: #C8D0E0; font-size: 11px; font-weight: 700;")
+            gain_lbl = QLabel()
+            gain_lbl.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            gain_lbl.setStyleSheet("color: #8A93A6; font-size: 11px;")
+
+            gain_slider = QSlider(Qt.Orientation.Vertical)
+            gain_slider.setRange(-12, 12)
+            gain_slider.setValue(int(band.get("gain", 0)))
+            gain_slider.setMinimumHeight(180)
+
+            # Log-spaced frequency dial: 0..100 covers 20 Hz .. 20 kHz
+            freq_slider = QSlider(Qt.Orientation.Horizontal)
+            freq_slider.setRange(0, 100)
+            freq_slider.setValue(int(round(100 * (math.log10(max(20, band.get("freq", 1000))) - math.log10(20)) / 3)))
+
+            def refresh_labels(i=i, freq_lbl=freq_lbl, gain_lbl=gain_lbl):
+                b = settings["bands"][i]
+                freq = b.get("freq", 1000)
+                freq_lbl.setText(f"{freq / 1000:.1f}k" if freq >= 1000 else f"{int(freq)}")
+                gain_lbl.setText(f"{int(b.get('gain', 0)):+d} dB")
+            def on_gain(v, i=i, refresh=refresh_labels):
+                chain.update_band(i, "gain", v)
+                refresh()
+                self.schedule_save()
+            def on_freq(v, i=i, refresh=refresh_labels):
+                chain.update_band(i, "freq", int(round(20 * 10 ** (3 * v / 100))))
+                refresh()
+                self.schedule_save()
+            gain_slider.valueChanged.connect(on_gain)
+            freq_slider.valueChanged.connect(on_freq)
+            refresh_labels()
+
+            col.addWidget(gain_lbl)
+            col.addWidget(gain_slider, alignment=Qt.AlignmentFlag.AlignCenter)
+            col.addWidget(freq_slider)
+            col.addWidget(freq_lbl)
+            bands_row.addLayout(col)
+        l.addLayout(bands_row)
+
+        d.setFocus()
+        d.exec()
+
+    def open_ducking_dialog(self):
+        settings = self.duck_settings
+        d = FixedDialog(self)
+        d.setWindowTitle("Ducking")
+        d.setFixedSize(460, 470)
+        d.setObjectName("Panel")
+
+        l = QVBoxLayout(d)
+        l.setContentsMargins(12, 10, 12, 10)
+        l.setSpacing(8)
+
+        title = QLabel("AUTO DUCKING")
+        title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        title.setStyleSheet("font-size: 13px; font-weight: 700; color: #C8D0E0; margin: 0 0 8px 0;")
+        l.addWidget(title)
+
+
+        def changed(restart=False):
+            self.update_button_styles()
+            self.schedule_save()
+            if restart:
+                self.restart_ducking()
+
+        enable_btn = QPushButton()
+        enable_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        if not self.ducker.available():
+            enable_btn.setEnabled(False)
+            enable_btn.setToolTip("numpy is required for ducking")
+        def refresh_enable_btn():
+            enabled = settings.get("enabled") is True
+            enable_btn.setText("DUCKING ON" if enabled else "DUCKING OFF")
+            set_toggle(enable_btn, enabled)
+        def toggle_enabled():
+            settings["enabled"] = not settings.get("enabled")
+            refresh_enable_btn()
+            changed(restart=True)
+        enable_btn.clicked.connect(toggle_enabled)
+        refresh_enable_btn()
+        l.addWidget(enable_btn)
+
+        def add_toggle_row(label, key, names, restart):
+            row = QHBoxLayout()
+            lbl = QLabel(label)
+            lbl.setStyleSheet("color: #C8D0E0; font-size: 12px; font-weight: 700;")
+            lbl.setFixedWidth(110)
+            row.addWidget(lbl)
+            for name in names:
+                btn = QPushButton(name.upper())
+                btn.setCursor(Qt.CursorShape.PointingHandCursor)
+                set_toggle(btn, name in settings[key])
+                def toggle(checked=False, name=name, btn=btn):
+                    gain = self.duck_gain
+                    if not restart:
+                        self.apply_duck_gain(1.0)
+                    if name in settings[key]:
+                        settings[key].remove(name)
+                    else:
+                        settings[key].append(name)
+                    set_toggle(btn, name in settings[key])
+                    if not restart:
+                        self.apply_duck_gain(gain)
+                    changed(restart=restart)
+                btn.clicked.connect(toggle)
+                row.addWidget(btn)
+            l.addLayout(row)
+
+        add_toggle_row("Triggered by", "triggers", ["Chat", "Mic"] + [n for n in self.sinks if n != "Chat"], True)
+        add_toggle_row("Lowers", "targets", list(self.sinks), False)
+
+        stream_btn = QPushButton()
+        stream_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        def refresh_stream_btn():
+            enabled = settings.get("duck_stream") is True
+            stream_btn.setText("ALSO DUCK STREAM MIX" if enabled else "USER MIX ONLY")
+            set_toggle(stream_btn, enabled)
+        def toggle_stream():
+            settings["duck_stream"] = not settings.get("duck_stream")
+            refresh_stream_btn()
+            changed()
+        stream_btn.clicked.connect(toggle_stream)
+        refresh_stream_btn()
+        l.addWidget(stream_btn)
+
+        for key, label, lo, hi in [
+            ("amount_db", "Reduce by (dB)", -40, 0),
+            ("threshold_db", "Threshold (dB)", -70, -10),
+            ("attack_ms", "Attack (ms)", 1, 200),
+            ("release_ms", "Release (ms)", 50, 2000),
+        ]:
+            row_wrap = QFrame()
+            row_wrap.setStyleSheet(f"background: {THEME['CardAlt']}; border-radius: 10px;")
+            row = QHBoxLayout(row_wrap)
+            row.setContentsMargins(10, 6, 10, 6)
+            row.setSpacing(10)
+            text_lbl = QLabel(label)
+            text_lbl.setStyleSheet("color: #C8D0E0; font-size: 12px; font-weight: 700;")
+            text_lbl.setFixedWidth(130)
+            row.addWidget(text_lbl)
+            slider = QSlider(Qt.Orientation.Horizontal)
+            slider.setRange(lo, hi)
+            slider.setValue(int(settings[key]))
+            row.addWidget(slider)
+            value_lbl = QLabel(str(slider.value()))
+            value_lbl.setStyleSheet("color: #C8D0E0; font-size: 12px;")
+            value_lbl.setFixedWidth(40)
+            row.addWidget(value_lbl)
+            def on_change(v, key=key, value_lbl=value_lbl):
+                settings[key] = v
+                value_lbl.setText(str(v))
+                changed()
+            slider.valueChanged.connect(on_change)
+            l.addWidget(row_wrap)
+
+        l.addStretch()
+        d.setFocus()
+        d.exec()
+
+    def open_scenes_dialog(self):
+        d = FixedDialog(self)
+        d.setWindowTitle("Scenes")
+        d.setFixedSize(600, 460)
+        d.setObjectName("Panel")
+
+        l = QVBoxLayout(d)
+        l.setContentsMargins(12, 10, 12, 10)
+        l.setSpacing(8)
+
+        title = QLabel("SCENES")
+        title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        title.setStyleSheet("font-size: 13px; font-weight: 700; color: #C8D0E0; margin: 0 0 8px 0;")
+        l.addWidget(title)
+
+        button_style = f"""
+            QPushButton {{
+                background: {THEME['CardAlt']};
+                color: {THEME['Text']};
+                border: 1px solid {THEME['Stroke']};
+                border-radius: 8px;
+                padding: 4px 10px;
+            }}
+            QPushButton:hover {{
+                background: #262B3B;
+                border: 1px solid {THEME['Accent']};
+            }}
+        """
+        edit_style = f"""
+            QLineEdit {{
+                background: #11141D;
+                padding: 8px 10px;
+                border: 1px solid transparent;
+                border-radius: 8px;
+                color: white;
+            }}
+            QLineEdit:focus {{
+                background: #141A24;
+                border: 2px solid {THEME['Accent']};
+            }}
+        """
+
+        list_layout = QVBoxLayout()
+        list_layout.setSpacing(6)
+        l.addLayout(list_layout)
+
+        status_lbl = QLabel()
+        status_lbl.setStyleSheet("color: #8A93A6; font-size: 11px;")
+
+        fade_row = QHBoxLayout()
+        fade_lbl = QLabel("Crossfade: 0 ms")
+        fade_lbl.setStyleSheet("color: #C8D0E0; font-size: 12px; font-weight: 700;")
+        fade_lbl.setFixedWidth(150)
+        fade_slider = QSlider(Qt.Orientation.Horizontal)
+        fade_slider.setRange(0, 40)
+        fade_slider.valueChanged.connect(lambda v: fade_lbl.setText(f"Crossfade: {v * 50} ms"))
+        fade_row.addWidget(fade_lbl)
+        fade_row.addWidget(fade_slider)
+
+        def populate():
+            _clear_layout(list_layout)
+            for scene_name, scene in self.scenes.items():
+                row_wrap = QFrame()
+                row_wrap.setStyleSheet(f"background: {THEME['CardAlt']}; border-radius: 10px;")
+                row = QHBoxLayout(row_wrap)
+                row.setContentsMargins(10, 6, 10, 6)
+                row.setSpacing(8)
+
+                name_lbl = QLabel(scene_name[:20])
+                name_lbl.setStyleSheet("color: #C8D0E0; font-size: 12px; font-weight: 700;")
+                name_lbl.setFixedWidth(140)
+                row.addWidget(name_lbl)
+
+                hk = HotkeyEdit()
+                hk.setText(scene.get("hotkey", ""))
+                hk.setPlaceholderText("Hotkey...")
+                hk.setStyleSheet(edit_style)
+                hk.hotkeyChanged.connect(lambda value, n=scene_name: self.set_scene_hotkey(n, value))
+                row.addWidget(hk)
+
+                for label, action in [("Recall", "recall"), ("Update", "update"), ("Delete", "delete")]:
+                    btn = QPushButton(label)
+                    btn.setCursor(Qt.CursorShape.PointingHandCursor)
+                    btn.setFixedHeight(30)
+                    btn.setStyleSheet(button_style)
+                    def on_click(checked=False, n=scene_name, action=action):
+                        if action == "recall":
+                            self.recall_scene(n)
+                            status_lbl.setText(f"Recalled '{n}' in {self.last_recall_ms:.1f} ms")
+                        elif action == "update":
+                            self.save_scene(n, fade_slider.value() * 50)
+                            status_lbl.setText(f"Updated '{n}'")
+                        else:
+                            self.delete_scene(n)
+                            populate()
+                    btn.clicked.connect(on_click)
+                    row.addWidget(btn)
+                list_layout.addWidget(row_wrap)
+
+        new_row = QHBoxLayout()
+        name_edit = QLineEdit()
+        name_edit.setPlaceholderText("New scene name")
+        name_edit.setStyleSheet(edit_style)
+        save_btn = QPushButton("Save current")
+        save_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        save_btn.setFixedHeight(30)
+        save_btn.setStyleSheet(button_style)
+        def save_new():
+            scene_name = name_edit.text().strip()
+            if not scene_name:
+                return
+            self.save_scene(scene_name, fade_slider.value() * 50)
+            name_edit.clear()
+            populate()
+        save_btn.clicked.connect(save_new)
+        name_edit.returnPressed.connect(save_new)
+        new_row.addWidget(name_edit)
+        new_row.addWidget(save_btn)
+
+        populate()
+        l.addStretch()
+        l.addLayout(fade_row)
+        l.addLayout(new_row)
+        l.addWidget(status_lbl)
+        d.setFocus()
+        d.exec()
+
+    def open_buses_dialog(self):
+        d = FixedDialog(self)
+        d.setWindowTitle("Buses")
+        d.setFixedSize(460, 400)
+        d.setObjectName("Panel")
+
+        l = QVBoxLayout(d)
+        l.setContentsMargins(12, 10, 12, 10)
+        l.setSpacing(8)
+
+        title = QLabel("MIX BUSES")
+        title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        title.setStyleSheet("font-size: 13px; font-weight: 700; color: #C8D0E0; margin: 0 0 8px 0;")
+        l.addWidget(title)
+
+        button_style = f"""
+            QPushButton {{
+                background: {THEME['CardAlt']};
+                color: {THEME['Text']};
+                border: 1px solid {THEME['Stroke']};
+                border-radius: 8px;
+                padding: 4px 10px;
+            }}
+            QPushButton:hover {{
+                background: #262B3B;
+                border: 1px solid {THEME['Accent']};
+            }}
+        """
+        edit_style = f"""
+            QLineEdit {{
+                background: #11141D;
+                padding: 8px 10px;
+                border: 1px solid transparent;
+                border-radius: 8px;
+                color: white;
+            }}
+            QLineEdit:focus {{
+                background: #141A24;
+                border: 2px solid {THEME['Accent']};
+            }}
+        """
+
+        list_layout = QVBoxLayout()
+        list_layout.setSpacing(6)
+        l.addLayout(list_layout)
+
+        def changed(buses):
+            self.set_buses(buses)
+            self.update_button_styles()
+            populate()
+
+        def populate():
+            _clear_layout(list_layout)
+            for bus in self.buses:
+                row_wrap = QFrame()
+                row_wrap.setStyleSheet(f"background: {THEME['CardAlt']}; border-radius: 10px;")
+                row = QHBoxLayout(row_wrap)
+                row.setContentsMargins(10, 6, 10, 6)
+                row.setSpacing(8)
+
+                name_lbl = QLabel(bus["label"][:20])
+                name_lbl.setStyleSheet("color: #C8D0E0; font-size: 12px; font-weight: 700;")
+                row.addWidget(name_lbl)
+                sink_lbl = QLabel(self.bus_sink(bus["name"]))
+                sink_lbl.setStyleSheet("color: #8A93A6; font-size: 11px;")
+                row.addWidget(sink_lbl)
+                row.addStretch()
+
+                remove_btn = QPushButton("Remove")
+                remove_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+                remove_btn.setFixedHeight(30)
+                remove_btn.setStyleSheet(button_style)
+                remove_btn.clicked.connect(lambda checked=False, n=bus["name"]: changed([b for b in self.buses if b["name"] != n]))
+                row.addWidget(remove_btn)
+                list_layout.addWidget(row_wrap)
+
+        new_row = QHBoxLayout()
+        name_edit = QLineEdit()
+        name_edit.setPlaceholderText("New bus name (e.g. Recording)")
+        name_edit.setStyleSheet(edit_style)
+        add_btn = QPushButton("Add bus")
+        add_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        add_btn.setFixedHeight(30)
+        add_btn.setStyleSheet(button_style)
+        def add_new():
+            label = name_edit.text().strip()
+            bus_name = re.sub(r"[^A-Za-z0-9]", "", label)
+            taken = [b["name"] for b in self.buses] + list(self.channels) + ["Stream"]
+            if not bus_name or bus_name in taken:
+                return
+            name_edit.clear()
+            changed(self.buses + [{"name": bus_name, "label": label, "color": None}])
+        add_btn.clicked.connect(add_new)
+        name_edit.returnPressed.connect(add_new)
+        new_row.addWidget(name_edit)
+        new_row.addWidget(add_btn)
+
+        populate()
+        l.addStretch()
+        l.addLayout(new_row)
+        d.setFocus()
+        d.exec()
+
+    def recording_sources(self):
+        sources = {name: f"{sink}.monitor" for name, sink in self.sinks.items()}
+        sources["Mic"] = MIC_INTERNAL_ID
+        if self.streamer_mode:
+            sources["Stream"] = f"{STREAM_MIX_NAME}.monitor"
+        for bus in self.buses:
+            sources[bus["name"]] = f"{self.bus_sink(bus['name'])}.monitor"
+        return sources
+
+    def toggle_recording(self):
+        if self.recorder.recording():
+            def done(report):
+                self.last_recording = report
+            self.recorder.stop(done)
+        else:
+            available = self.recording_sources()
+            sources = [(name, available[name]) for name in self.rec_settings["tracks"] if name in available]
+            folder = os.path.join(os.path.expanduser(self.rec_settings["dir"]), time.strftime("Mux_%Y%m%d-%H%M%S"))
+            self.recorder.start(sources, folder, self.rec_settings["format"])
+        self.update_button_styles()
+        self.remote.publish_state()
+
+    @traced
+    def restart_replay(self):
+        # Idempotent: a running buffer on the same source and length is kept,
+        # so routing changes don't throw away the last minute of audio.
+        device = self.recording_sources().get(self.replay_settings["source"])
+        if not self.replay_settings.get("enabled") or not device:
+            self.replay.stop()
+            return
+        frames = REC_RATE * max(1, int(self.replay_settings["seconds"]))
+        if self.replay.running() and self.replay.device == device and self.replay.ring.shape[0] == frames:
+            return
+        self.replay.start(device, self.replay_settings["seconds"])
+
+    def save_replay(self):
+        if not self.replay.running():
+            return
+        folder = os.path.expanduser(self.rec_settings["dir"])
+        os.makedirs(folder, exist_ok=True)
+        fmt = self.rec_settings["format"] if self.recorder.flac_available() else "wav"
+        path = os.path.join(folder, time.strftime(f"Replay_{self.replay_settings['source']}_%Y%m%d-%H%M%S.{fmt}"))
+        def done(path, seconds):
+            self.last_replay = (path, seconds)
+        self.replay.save(path, fmt, done)
+
+    def open_recorder_dialog(self):
+        settings = self.rec_settings
+        d = FixedDialog(self)
+        d.setWindowTitle("Recorder")
+        d.setFixedSize(520, 470)
+        d.setObjectName("Panel")
+
+        l = QVBoxLayout(d)
+        l.setContentsMargins(12, 10, 12, 10)
+        l.setSpacing(8)
+
+        title = QLabel("RECORDER")
+        title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        title.setStyleSheet("font-size: 13px; font-weight: 700; color: #C8D0E0; margin: 0 0 8px 0;")
+        l.addWidget(title)
+
+        edit_style = f"""
+            QLineEdit {{
+                background: #11141D;
+                padding: 8px 10px;
+                border: 1px solid transparent;
+                border-radius: 8px;
+                color: white;
+            }}
+            QLineEdit:focus {{
+                background: #141A24;
+                border: 2px solid {THEME['Accent']};
+            }}
+        """
+
+        def add_row(label, widgets):
+            row = QHBoxLayout()
+            lbl = QLabel(label)
+            lbl.setStyleSheet("color: #C8D0E0; font-size: 12px; font-weight: 700;")
+            lbl.setFixedWidth(90)
+            row.addWidget(lbl)
+            for widget in widgets:
+                row.addWidget(widget)
+            l.addLayout(row)
+
+        track_btns = []
+        for name in self.recording_sources():
+            btn = QPushButton(name.upper())
+            btn.setCursor(Qt.CursorShape.PointingHandCursor)
+            set_toggle(btn, name in settings["tracks"])
+            def toggle_track(checked=False, name=name, btn=btn):
+                if name in settings["tracks"]:
+                    settings["tracks"].remove(name)
+                else:
+                    settings["tracks"].append(name)
+                set_toggle(btn, name in settings["tracks"])
+                self.schedule_save()
+            btn.clicked.connect(toggle_track)
+            track_btns.append(btn)
+        for i in range(0, len(track_btns), 4):
+            add_row("Tracks" if i == 0 else "", track_btns[i:i + 4])
+
+        format_btns = {}
+        for fmt in ["wav", "flac"]:
+            btn = QPushButton(fmt.upper())
+            btn.setCursor(Qt.CursorShape.PointingHandCursor)
+            if fmt == "flac" and not self.recorder.flac_available():
+                btn.setEnabled(False)
+                btn.setToolTip("The flac encoder is not installed")
+            def pick_format(checked=False, fmt=fmt):
+                settings["format"] = fmt
+                for key, b in format_btns.items():
+                    set_toggle(b, key == fmt)
+                self.schedule_save()
+            btn.clicked.connect(pick_format)
+            set_toggle(btn, settings["format"] == fmt)
+            format_btns[fmt] = btn
+        add_row("Format", list(format_btns.values()))
+
+        dir_edit = QLineEdit(settings["dir"])
+        dir_edit.setStyleSheet(edit_style)
+        def set_dir():
+            settings["dir"] = dir_edit.text().strip() or REC_DEFAULTS["dir"]
+            self.schedule_save()
+        dir_edit.editingFinished.connect(set_dir)
+        add_row("Folder", [dir_edit])
+
+        hk = HotkeyEdit()
+        hk.setText(settings.get("hotkey", ""))
+        hk.setPlaceholderText("Start/stop hotkey...")
+        hk.setStyleSheet(edit_style)
+        def set_hotkey(value):
+            settings["hotkey"] = value
+            self.save_config()
+            self.register_hotkeys()
+        hk.hotkeyChanged.connect(set_hotkey)
+        add_row("Hotkey", [hk])
+
+        replay = self.replay_settings
+        replay_btn = QPushButton()
+        replay_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        if not self.replay.available():
+            replay_btn.setEnabled(False)
+            replay_btn.setToolTip("numpy is required for instant replay")
+        def refresh_replay_btn():
+            replay_btn.setText("REPLAY ON" if replay.get("enabled") else "REPLAY OFF")
+            set_toggle(replay_btn, replay.get("enabled") is True)
+        def toggle_replay():
+            replay["enabled"] = not replay.get("enabled")
+            refresh_replay_btn()
+            self.restart_replay()
+            self.schedule_save()
+        replay_btn.clicked.connect(toggle_replay)
+        refresh_replay_btn()
+        source_combo = QComboBox()
+        source_combo.addItems(list(self.recording_sources()))
+        source_combo.setCurrentText(replay["source"])
+        def set_source(text):
+            replay["source"] = text
+            self.restart_replay()
+            self.schedule_save()
+        source_combo.currentTextChanged.connect(set_source)
+        length_combo = QComboBox()
+        lengths = [15, 30, 60, 120, 300]
+        length_combo.addItems([f"{s} s" for s in lengths])
+        if replay["seconds"] in lengths:
+            length_combo.setCurrentIndex(lengths.index(replay["seconds"]))
+        def set_length(index):
+            replay["seconds"] = lengths[index]
+            self.restart_replay()
+            self.schedule_save()
+        length_combo.currentIndexChanged.connect(set_length)
+        add_row("Replay", [replay_btn, source_combo, length_combo])
+
+        replay_hk = HotkeyEdit()
+        replay_hk.setText(replay.get("hotkey", ""))
+        replay_hk.setPlaceholderText("Save replay hotkey...")
+        replay_hk.setStyleSheet(edit_style)
+        def set_replay_hotkey(value):
+            replay["hotkey"] = value
+            self.save_config()
+            self.register_hotkeys()
+        replay_hk.hotkeyChanged.connect(set_replay_hotkey)
+        add_row("", [replay_hk])
+
+        status_lbl = QLabel()
+        status_lbl.setStyleSheet("color: #8A93A6; font-size: 11px;")
+        record_btn = QPushButton()
+        record_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        def refresh():
+            status = self.recorder.status()
+            if status is not None:
+                record_btn.setText("STOP RECORDING")
+                set_toggle(record_btn, True, "rec")
+                failed = "".join(f", {name}: {why}" for name, why in status["failed"].items())
+                status_lbl.setText(f"Recording {status['seconds']:.0f} s, {status['dropped']} frames dropped{failed}")
+            elif self.recorder.finishing():
+                record_btn.setText("FINISHING...")
+                set_toggle(record_btn, False)
+                status_lbl.setText("Writing the last audio to disk")
+            else:
+                record_btn.setText("START RECORDING")
+                set_toggle(record_btn, False)
+                report = self.last_recording
+                if report:
+                    dropped = sum(report["dropped"].values())
+                    failed = "".join(f", {name}: {why}" for name, why in report["failed"].items())
+                    status_lbl.setText(f"Saved {report['seconds']:.1f} s to {report['folder']} ({dropped} frames dropped{failed})")
+                elif self.last_replay:
+                    status_lbl.setText(f"Saved replay of {self.last_replay[1]:.0f} s to {self.last_replay[0]}")
+        def on_record():
+            set_dir()
+            self.toggle_recording()
+            refresh()
+        record_btn.clicked.connect(on_record)
+        refresh()
+        status_timer = QTimer(d)
+        status_timer.timeout.connect(refresh)
+        status_timer.start(500)
+
+        l.addStretch()
+        l.addWidget(record_btn)
+        l.addWidget(status_lbl)
+        d.setFocus()
+        d.exec()
+
+    def restart_midi(self):
+        self.midi.stop()
+        self.midi.mapping = self.midi_settings["map"]
+        fields = {"volume": "volume", "stream_volume": "stream_volume", "mute": "muted", "stream_mute": "stream_muted"}
+        keys = {}
+        for key, action in self.midi_settings["map"].items():
+            field = fields.get(action.get("action"))
+            if field:
+                keys.setdefault((action.get("channel"), field), []).append(key)
+        self.midi_feedback_keys = keys
+        if self.midi_settings.get("enabled"):
+            devices = MidiController.devices()
+            device = self.midi_settings.get("device") or (devices[0] if devices else "")
+            if device and self.midi.start(device):
+                # Bring motor faders and LEDs to the current state
+                self.midi_feedback(0, {name: set(fields.values()) for name in self.channels}, "sync")
+        self.update_button_styles()
+
+    def on_midi_control(self, key, value):
+        # Dispatcher thread, like the hotkey listener: store and volume
+        # writer only, with loopback ids from the last sync. A control whose
+        # id isn't there yet is replayed on the GUI thread, which may refresh.
+        action = self.midi_settings["map"].get(key, {})
+        name = action.get("channel")
+        kind = action.get("action")
+        if kind == "scene":
+            if value >= 0.5:
+                self.signaler.recall_scene.emit(str(action.get("scene")))
+            return
+        if name not in self.channels:
+            return
+        if threading.current_thread() is not threading.main_thread():
+            if kind in ("stream_volume", "stream_mute"):
+                needed = "stream_input"
+            elif kind == "mute" or (kind == "volume" and name not in self.sinks and not (name == "Mic" and self.mic_input())):
+                needed = self.user_input_key(name)
+            else:
+                needed = None
+            if needed and self.active_inputs.get(name, {}).get(needed) is None:
+                self.signaler.midi_control.emit(key, value)
+                return
+        if kind == "volume":
+            self.set_user_volume(name, round(value * 100))
+        elif kind == "stream_volume":
+            self.set_stream_volume(name, round(value * 100))
+        elif kind == "mute" and value >= 0.5:
+            self.toggle_user_mute(name)
+        elif kind == "stream_mute" and value >= 0.5:
+            self.toggle_stream_mute(name)
+
+    def midi_feedback(self, version, changes, origin):
+        if not self.midi.running():
+            return
+        for name, fields in changes.items():
+            ch = self.channels.get(name)
+            if ch is None:
+                continue
+            for field in fields:
+                for key in self.midi_feedback_keys.get((name, field), ()):
+                    value = getattr(ch, field)
+                    self.midi.send_feedback(key, value / 100 if field in MIDI_CONTINUOUS else (1.0 if value else 0.0))
+
+    def open_midi_dialog(self):
+        settings = self.midi_settings
+        d = FixedDialog(self)
+        d.setWindowTitle("MIDI Controller")
+        d.setFixedSize(520, 260 + 44 * len(self.channels))
+        d.setObjectName("Panel")
+
+        l = QVBoxLayout(d)
+        l.setContentsMargins(12, 10, 12, 10)
+        l.setSpacing(8)
+
+        title = QLabel("MIDI CONTROLLER")
+        title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        title.setStyleSheet("font-size: 13px; font-weight: 700; color: #C8D0E0; margin: 0 0 8px 0;")
+        l.addWidget(title)
+
+
+        top_row = QHBoxLayout()
+        enable_btn = QPushButton()
+        enable_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        def refresh_enable_btn():
+            enable_btn.setText("MIDI ON" if settings.get("enabled") else "MIDI OFF")
+            set_toggle(enable_btn, settings.get("enabled") is True)
+        def toggle_enabled():
+            settings["enabled"] = not settings.get("enabled")
+            refresh_enable_btn()
+            self.restart_midi()
+            self.schedule_save()
+        enable_btn.clicked.connect(toggle_enabled)
+        refresh_enable_btn()
+        top_row.addWidget(enable_btn)
+
+        device_combo = QComboBox()
+        device_combo.addItem("First available")
+        device_combo.addItems(MidiController.devices())
+        if settings.get("device"):
+            if device_combo.findText(settings["device"]) < 0:
+                device_combo.addItem(settings["device"])
+            device_combo.setCurrentText(settings["device"])
+        def set_device(index):
+            settings["device"] = "" if index == 0 else device_combo.currentText()
+            self.restart_midi()
+            self.schedule_save()
+        device_combo.currentIndexChanged.connect(set_device)
+        top_row.addWidget(device_combo)
+        l.addLayout(top_row)
+
+        hint = QLabel("Click a slot, then move the control to bind it")
+        hint.setStyleSheet("color: #8A93A6; font-size: 11px;")
+        l.addWidget(hint)
+
+        learn_btns = {}
+        def binding(name, kind):
+            return next((key for key, action in settings["map"].items() if action.get("channel") == name and action.get("action") == kind), None)
+        def refresh_learn_btns(active=None):
+            for (name, kind), btn in learn_btns.items():
+                key = binding(name, kind)
+                btn.setText("..." if (name, kind) == active else (key or "—"))
+                set_toggle(btn, (name, kind) == active)
+
+        pending = {}
+        def learned(key):
+            target = pending.pop("slot", None)
+            if target is None:
+                return
+            name, kind = target
+            for old in [k for k, action in settings["map"].items() if (action.get("channel"), action.get("action")) == target]:
+                del settings["map"][old]
+            settings["map"][key] = {"action": kind, "channel": name}
+            self.restart_midi()
+            self.schedule_save()
+            refresh_learn_btns()
+        self.signaler.midi_learned.connect(learned)
+
+        for name in self.channels:
+            row = QHBoxLayout()
+            lbl = QLabel(self.channel_labels.get(name, name).upper())
+            lbl.setStyleSheet(f"color: {THEME.get(name, THEME['Text'])}; font-size: 12px; font-weight: 800;")
+            lbl.setFixedWidth(80)
+            row.addWidget(lbl)
+            for kind, text in [("volume", "VOL"), ("stream_volume", "STREAM"), ("mute", "MUTE")]:
+                tag = QLabel(text)
+                tag.setStyleSheet("color: #8A93A6; font-size: 10px; font-weight: 700;")
+                row.addWidget(tag)
+                btn = QPushButton()
+                btn.setCursor(Qt.CursorShape.PointingHandCursor)
+                btn.setFixedWidth(80)
+                def start_learn(checked=False, slot=(name, kind)):
+                    pending["slot"] = slot
+                    self.midi.learn = self.signaler.midi_learned.emit
+                    refresh_learn_btns(slot)
+                btn.clicked.connect(start_learn)
+                learn_btns[(name, kind)] = btn
+                row.addWidget(btn)
+            l.addLayout(row)
+        refresh_learn_btns()
+
+        l.addStretch()
+        d.setFocus()
+        d.exec()
+        self.midi.learn = None
+        self.signaler.midi_learned.disconnect(learned)
+
+    def restart_remote(self):
+        self.remote.stop()
+        settings = self.remote_settings
+        if settings.get("enabled"):
+            had_token = bool(settings.get("token"))
+            host, port, token = remote_bind(settings)
+            if token and not had_token:
+                self.schedule_save()
+            self.remote.start(host, port, token)
+        self.update_button_styles()
+
+    def remote_state(self):
+        # Read from the server thread: plain reads of GUI-owned values
+        return {
+            "streamer_mode": self.streamer_mode,
+            "scenes": list(self.scenes),
+            "recording": self.recorder.recording(),
+            "channel_labels": dict(self.channel_labels),
+        }
+
+    def remote_levels(self):
+        with self.ducker.lock:
+            levels = dict(self.ducker.levels)
+        named = {}
+        for device, db in levels.items():
+            named["Mic" if device == MIC_INTERNAL_ID else device.replace(".monitor", "")] = db
+        return named
+
+    def restart_metrics(self):
+        self.metrics_exporter.stop()
+        if self.metrics_settings.get("enabled"):
+            self.metrics_exporter.start(self.metrics_settings)
+
+    def metrics_gauges(self):
+        # Read from the exporter threads, like remote_state
+        with self.store.lock:
+            channels = {name: {"volume": ch.volume, "muted": ch.muted, "stream_volume": ch.stream_volume, "stream_muted": ch.stream_muted} for name, ch in self.channels.items()}
+        return {"channels": channels, "levels": self.remote_levels()}
+
+    def handle_remote_command(self, message):
+        cmd = message.get("cmd")
+        name = message.get("channel")
+        try:
+            if cmd == "set_volume" and name in self.channels:
+                self.set_user_volume(name, max(0, min(100, int(message.get("value")))))
+            elif cmd == "set_stream_volume" and name in self.channels:
+                self.set_stream_volume(name, max(0, min(100, int(message.get("value")))))
+            elif cmd == "toggle_mute" and name in self.channels:
+                self.toggle_user_mute(name)
+            elif cmd == "toggle_stream_mute" and name in self.channels:
+                self.toggle_stream_mute(name)
+            elif cmd == "move_apps" and name in self.sinks:
+                self.move_apps_to_sink([str(i) for i in message.get("ids", [])], name)
+            elif cmd == "recall_scene":
+                self.recall_scene(str(message.get("scene")))
+            elif cmd == "toggle_streamer_mode":
+                self.toggle_streamer_mode()
+            elif cmd == "toggle_recording":
+                self.toggle_recording()
+            elif cmd == "save_replay":
+                self.save_replay()
+        except (TypeError, ValueError):
+            pass
+
+    def open_remote_dialog(self):
+        settings = self.remote_settings
+        d = FixedDialog(self)
+        d.setWindowTitle("Remote Control")
+        d.setFixedSize(460, 440)
+        d.setObjectName("Panel")
+
+        l = QVBoxLayout(d)
+        l.setContentsMargins(12, 10, 12, 10)
+        l.setSpacing(8)
+
+        title = QLabel("REMOTE CONTROL")
+        title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        title.setStyleSheet("font-size: 13px; font-weight: 700; color: #C8D0E0; margin: 0 0 8px 0;")
+        l.addWidget(title)
+
+        edit_style = f"""
+            QLineEdit {{
+                background: #11141D;
+                padding: 8px 10px;
+                border: 1px solid transparent;
+                border-radius: 8px;
+                color: white;
+            }}
+            QLineEdit:focus {{
+                background: #141A24;
+                border: 2px solid {THEME['Accent']};
+            }}
+        """
+
+        status_lbl = QLabel()
+        status_lbl.setStyleSheet("color: #8A93A6; font-size: 11px;")
+        def refresh_status():
+            if self.remote.running():
+                port = self.remote.server.sockets[0].getsockname()[1]
+                query = f"?token={settings['token']}" if settings.get("token") else ""
+                status_lbl.setText(f"Listening on ws://{settings['host']}:{port}/{query}")
+            elif settings.get("enabled"):
+                status_lbl.setText("Could not open the port")
+            else:
+                status_lbl.setText("Stopped")
+
+        def changed():
+            self.schedule_save()
+            self.restart_remote()
+            refresh_status()
+
+        enable_btn = QPushButton()
+        enable_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        def refresh_enable_btn():
+            enable_btn.setText("SERVER ON" if settings.get("enabled") else "SERVER OFF")
+            set_toggle(enable_btn, settings.get("enabled") is True)
+        def toggle_enabled():
+            settings["enabled"] = not settings.get("enabled")
+            refresh_enable_btn()
+            changed()
+        enable_btn.clicked.connect(toggle_enabled)
+        refresh_enable_btn()
+        l.addWidget(enable_btn)
+
+        lan_btn = QPushButton()
+        lan_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        def refresh_lan_btn():
+            lan = settings["host"] != "127.0.0.1"
+            lan_btn.setText("REACHABLE ON LAN" if lan else "THIS COMPUTER ONLY")
+            set_toggle(lan_btn, lan)
+        def toggle_lan():
+            settings["host"] = "127.0.0.1" if settings["host"] != "127.0.0.1" else "0.0.0.0"
+            refresh_lan_btn()
+            changed()
+        lan_btn.clicked.connect(toggle_lan)
+        refresh_lan_btn()
+        l.addWidget(lan_btn)
+
+        for key, placeholder in [("port", "Port"), ("token", "Access token (required on LAN)")]:
+            edit = QLineEdit(str(settings[key]))
+            edit.setPlaceholderText(placeholder)
+            edit.setStyleSheet(edit_style)
+            def on_edit(edit=edit, key=key):
+                value = edit.text().strip()
+                if key == "port":
+                    value = int(value) if value.isdigit() and 0 < int(value) < 65536 else REMOTE_DEFAULTS["port"]
+                    edit.setText(str(value))
+                if settings[key] != value:
+                    settings[key] = value
+                    changed()
+            edit.editingFinished.connect(on_edit)
+            l.addWidget(edit)
+
+        metrics = self.metrics_settings
+        metrics_title = QLabel("METRICS EXPORTER")
+        metrics_title.setStyleSheet("font-size: 11px; font-weight: 700; color: #8A93A6; margin-top: 8px;")
+        l.addWidget(metrics_title)
+        metrics_row = QHBoxLayout()
+        metrics_btn = QPushButton()
+        metrics_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        metrics_edit = QLineEdit()
+        metrics_edit.setStyleSheet(edit_style)
+        def refresh_metrics_row():
+            mode = metrics["mode"] if metrics.get("enabled") else None
+            metrics_btn.setText({"http": "HTTP", "textfile": "TEXTFILE"}.get(mode, "OFF"))
+            set_toggle(metrics_btn, mode is not None)
+            if mode == "textfile":
+                metrics_edit.setText(metrics["textfile"])
+                metrics_edit.setPlaceholderText("node_exporter textfile path")
+            else:
+                metrics_edit.setText(str(metrics["port"]))
+                metrics_edit.setPlaceholderText("Port (serves /metrics on localhost)")
+        def cycle_metrics():
+            # OFF -> HTTP -> TEXTFILE -> OFF
+            if not metrics.get("enabled"):
+                metrics["enabled"], metrics["mode"] = True, "http"
+            elif metrics["mode"] == "http":
+                metrics["mode"] = "textfile"
+            else:
+                metrics["enabled"] = False
+            refresh_metrics_row()
+            self.schedule_save()
+            self.restart_metrics()
+        def on_metrics_edit():
+            value = metrics_edit.text().strip()
+            if metrics.get("enabled") and metrics["mode"] == "textfile":
+                key, value = "textfile", value or METRICS_DEFAULTS["textfile"]
+            else:
+                key = "port"
+                value = int(value) if value.isdigit() and 0 < int(value) < 65536 else METRICS_DEFAULTS["port"]
+            if metrics[key] != value:
+                metrics[key] = value
+                self.schedule_save()
+                self.restart_metrics()
+            refresh_metrics_row()
+        metrics_btn.clicked.connect(cycle_metrics)
+        metrics_edit.editingFinished.connect(on_metrics_edit)
+        refresh_metrics_row()
+        metrics_row.addWidget(metrics_btn)
+        metrics_row.addWidget(metrics_edit)
+        l.addLayout(metrics_row)
+
+        refresh_status()
+        l.addStretch()
+        l.addWidget(status_lbl)
+        d.setFocus()
+        d.exec()
+
+    def restart_obs(self):
+        self.obs.stop()
+        settings = self.obs_settings
+        self.obs.source = (OBS_SOURCE_NAME, f"{STREAM_MIX_NAME}.monitor") if settings.get("stream_source") else None
+        if settings.get("enabled"):
+            try:
+                port = int(settings["port"])
+            except (TypeError, ValueError):
+                port = OBS_DEFAULTS["port"]
+            self.obs.start(settings["host"], port, settings.get("password", ""))
+        self.update_button_styles()
+
+    def handle_obs_scene(self, obs_scene):
+        target = self.obs_settings["scene_map"].get(obs_scene)
+        if target:
+            self.recall_scene(target)
+
+    def open_obs_dialog(self):
+        settings = self.obs_settings
+        obs_scenes = list(self.obs.scenes)
+        obs_scenes += [name for name in settings["scene_map"] if name not in obs_scenes]
+        d = FixedDialog(self)
+        d.setWindowTitle("OBS")
+        d.setFixedSize(460, 330 + 44 * len(obs_scenes))
+        d.setObjectName("Panel")
+
+        l = QVBoxLayout(d)
+        l.setContentsMargins(12, 10, 12, 10)
+        l.setSpacing(8)
+
+        title = QLabel("OBS")
+        title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        title.setStyleSheet("font-size: 13px; font-weight: 700; color: #C8D0E0; margin: 0 0 8px 0;")
+        l.addWidget(title)
+
+        edit_style = f"""
+            QLineEdit {{
+                background: #11141D;
+                padding: 8px 10px;
+                border: 1px solid transparent;
+                border-radius: 8px;
+                color: white;
+            }}
+            QLineEdit:focus {{
+                background: #141A24;
+                border: 2px solid {THEME['Accent']};
+            }}
+        """
+
+        status_lbl = QLabel()
+        status_lbl.setStyleSheet("color: #8A93A6; font-size: 11px;")
+        def refresh_status():
+            if self.obs.connected:
+                status_lbl.setText(f"Connected, program scene: {self.obs.program_scene or '-'}")
+            elif settings.get("enabled"):
+                status_lbl.setText(f"Reconnecting... {self.obs.error}".strip())
+            else:
+                status_lbl.setText("Disconnected")
+        status_timer = QTimer(d)
+        status_timer.timeout.connect(refresh_status)
+        status_timer.start(500)
+
+        def changed():
+            self.schedule_save()
+            self.restart_obs()
+            refresh_status()
+
+        enable_btn = QPushButton()
+        enable_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        def refresh_enable_btn():
+            enable_btn.setText("OBS LINK ON" if settings.get("enabled") else "OBS LINK OFF")
+            set_toggle(enable_btn, settings.get("enabled") is True)
+        def toggle_enabled():
+            settings["enabled"] = not settings.get("enabled")
+            refresh_enable_btn()
+            changed()
+        enable_btn.clicked.connect(toggle_enabled)
+        refresh_enable_btn()
+        l.addWidget(enable_btn)
+
+        source_btn = QPushButton()
+        source_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        def refresh_source_btn():
+            source_btn.setText(f"ADD \"{OBS_SOURCE_NAME.upper()}\" SOURCE TO OBS")
+            set_toggle(source_btn, settings.get("stream_source") is True)
+        def toggle_source():
+            settings["stream_source"] = not settings.get("stream_source")
+            refresh_source_btn()
+            changed()
+        source_btn.clicked.connect(toggle_source)
+        refresh_source_btn()
+        l.addWidget(source_btn)
+
+        conn_row = QHBoxLayout()
+        for key, placeholder, width in [("host", "Host", None), ("port", "Port", 80), ("password", "Password", None)]:
+            edit = QLineEdit(str(settings[key]))
+            edit.setPlaceholderText(placeholder)
+            edit.setStyleSheet(edit_style)
+            if width:
+                edit.setFixedWidth(width)
+            if key == "password":
+                edit.setEchoMode(QLineEdit.EchoMode.Password)
+            def on_edit(edit=edit, key=key):
+                value = edit.text().strip()
+                if key == "port":
+                    value = int(value) if value.isdigit() and 0 < int(value) < 65536 else OBS_DEFAULTS["port"]
+                    edit.setText(str(value))
+                elif key == "host":
+                    value = value or OBS_DEFAULTS["host"]
+                    edit.setText(value)
+                if settings[key] != value:
+                    settings[key] = value
+                    changed()
+            edit.editingFinished.connect(on_edit)
+            conn_row.addWidget(edit)
+        l.addLayout(conn_row)
+
+        hint = QLabel("When OBS switches to a scene, recall a mixer scene:" if obs_scenes else "Connect to OBS to list its scenes")
+        hint.setStyleSheet("color: #8A93A6; font-size: 11px;")
+        l.addWidget(hint)
+
+        for obs_scene in obs_scenes:
+            row = QHBoxLayout()
+            lbl = QLabel(obs_scene)
+            lbl.setStyleSheet("font-weight: 700;")
+            row.addWidget(lbl)
+            combo = QComboBox()
+            combo.setFixedWidth(200)
+            combo.addItem("No change")
+            combo.addItems(list(self.scenes))
+            target = settings["scene_map"].get(obs_scene)
+            if target:
+                if combo.findText(target) < 0:
+                    combo.addItem(target)
+                combo.setCurrentText(target)
+            def set_target(index, obs_scene=obs_scene, combo=combo):
+                if index == 0:
+                    settings["scene_map"].pop(obs_scene, None)
+                else:
+                    settings["scene_map"][obs_scene] = combo.currentText()
+                self.schedule_save()
+            combo.currentIndexChanged.connect(set_target)
+            row.addWidget(combo)
+            l.addLayout(row)
+
+        refresh_status()
+        l.addStretch()
+        l.addWidget(status_lbl)
+        d.setFocus()
+        d.exec()
+        status_timer.stop()
+
+    def shutdown(self):
+        self.metrics_exporter.stop()
+        self.obs.stop()
+        self.midi.stop()
+        self.remote.stop()
+        self.replay.stop()
+        self.recorder.stop(timeout=10.0)
+        self.ducker.stop()
+        self.mic_chain.stop()
+        for chain in self.eq_chains.values():
+            chain.stop()
+        if TRACER is not None:
+            TRACER.write()
+
 if __name__ == "__main__":
+    if "--bench-eq" in sys.argv:
+        bench_eq()
+        sys.exit(0)
+    if "--bench-channels" in sys.argv:
+        bench_channels()
+        sys.exit(0)
+    if "--bench-style" in sys.argv:
+        bench_style()
+        sys.exit(0)
+    if "--bench-shadow" in sys.argv:
+        bench_shadow()
+        sys.exit(0)
+    if "--bench-midi" in sys.argv:
+        bench_midi()
+        sys.exit(0)
+    if "--bench-remote" in sys.argv:
+        bench_remote()
+        sys.exit(0)
+    for arg in sys.argv:
+        if arg == "--load-test" or arg.startswith("--load-test="):
+            steps = [int(n) for n in arg.partition("=")[2].split(",") if n.strip().isdigit()]
+            load_test(tuple(steps) or (10, 40, 100, 200), tone="--load-tone" in sys.argv)
+            sys.exit(0)
+    if "--bench-backend" in sys.argv:
+        bench_backend()
+        sys.exit(0)
+    if "--bench-obs" in sys.argv:
+        bench_obs()
+        sys.exit(0)
+    if "--fake-obs" in sys.argv:
+        run_fake_obs()
+        sys.exit(0)
+    for arg in sys.argv:
+        if arg == "--trace" or arg.startswith("--trace="):
+            TRACER = Tracer(os.path.expanduser(arg.partition("=")[2]) or None)
     app = QApplication(sys.argv)
     app.setQuitOnLastWindowClosed(False)
     win = MuxHome()
+    app.aboutToQuit.connect(win.shutdown)
     if "--minimized" in sys.argv:
         win.hide_to_tray()
     else:
@@ -0,0 +1,60 @@
+import os
+import stat
+import sys
+import threading
+
+import pytest
+
+# The mixer is a single script at the repo root; import it headless
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if not os.environ.get("DISPLAY"):
+    os.environ.setdefault("PYNPUT_BACKEND", "dummy")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# Stands in for parec: streams in real time (silence as s16, full scale as
+# float32), except for the "dead" device, which exits at once like a
+# missing source does.
+FAKE_PAREC = """#!{python}
+import struct, sys, time
+if "--device=dead" in sys.argv:
+    sys.exit(1)
+if "--format=float32le" in sys.argv:
+    block = struct.pack("<f", 1.0) * 160
+else:
+    block = bytes(48000 * 4 // 50)
+while True:
+    sys.stdout.buffer.write(block)
+    sys.stdout.buffer.flush()
+    time.sleep(0.01)
+"""
+
+
+@pytest.fixture
+def fake_parec(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    parec = bin_dir / "parec"
+    parec.write_text(FAKE_PAREC.format(python=sys.executable))
+    parec.chmod(parec.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+
+@pytest.fixture
+def win(tmp_path, monkeypatch):
+    # A headless MuxHome on the fake audio server: (app, window, server)
+    mixer = pytest.importorskip("testnewmixer", exc_type=ImportError)
+    # _headless_mixer points these globals at tmp_path; put them back after
+    for name in ("CONFIG_FILE", "MIC_CHAIN_CONF", "EQ_CONF_PREFIX", "ICON_CACHE_DIR", "HOST_CLEANUP"):
+        monkeypatch.setattr(mixer, name, getattr(mixer, name))
+    server = mixer.FakeAudioServer()
+    app, win = mixer._headless_mixer(server, "alsa_output.fake", "alsa_input.fake", state_dir=str(tmp_path))
+    yield app, win, server
+    # Ending the fake server's event stream lets the window's watcher exit
+    server.close()
+    for thread in threading.enumerate():
+        if getattr(thread, "_target", None) == win.watch_server_events:
+            thread.join(2)
+    win.shutdown()
+    win.close()
+    win.deleteLater()
+    app.processEvents()
@@ -0,0 +1,60 @@
+import pytest
+
+mixer = pytest.importorskip("testnewmixer", exc_type=ImportError)
+from PyQt6.QtCore import Qt
+from PyQt6.QtTest import QTest
+
+APPS = [(f"App{i}", str(100 + i), "") for i in range(6)]
+
+
+@pytest.fixture
+def card(win):
+    app, window, _ = win
+    card = next(iter(window.widgets.values()))
+    card.update_apps_list(APPS)
+    app.processEvents()
+    return card
+
+
+def label(card, app_id):
+    for i in range(card.app_layout.count()):
+        widget = card.app_layout.itemAt(i).widget()
+        if isinstance(widget, mixer.DraggableAppLabel) and widget.app_id == app_id:
+            return widget
+
+
+def click(card, app_id, modifiers):
+    QTest.mouseClick(label(card, app_id), Qt.MouseButton.LeftButton, modifiers)
+
+
+def test_shift_click_selects_a_contiguous_range(card):
+    click(card, "101", Qt.KeyboardModifier.ControlModifier)
+    click(card, "104", Qt.KeyboardModifier.ShiftModifier)
+    assert card.selected_ids == {"101", "102", "103", "104"}
+    # The anchor stays put: Shift-clicking back shrinks the range
+    click(card, "102", Qt.KeyboardModifier.ShiftModifier)
+    assert card.selected_ids == {"101", "102"}
+    assert label(card, "102").selected and not label(card, "104").selected
+
+
+def test_ctrl_toggles_and_ctrl_shift_extends(card):
+    click(card, "100", Qt.KeyboardModifier.ControlModifier)
+    click(card, "103", Qt.KeyboardModifier.ControlModifier)
+    assert card.selected_ids == {"100", "103"}
+    click(card, "105", Qt.KeyboardModifier.ControlModifier | Qt.KeyboardModifier.ShiftModifier)
+    assert card.selected_ids == {"100", "103", "104", "105"}
+    click(card, "100", Qt.KeyboardModifier.ControlModifier)
+    assert card.selected_ids == {"103", "104", "105"}
+
+
+def test_shift_click_without_anchor_selects_one(card):
+    click(card, "102", Qt.KeyboardModifier.ShiftModifier)
+    assert card.selected_ids == {"102"}
+
+
+def test_anchor_is_dropped_with_its_stream(card):
+    click(card, "101", Qt.KeyboardModifier.ControlModifier)
+    card.update_apps_list([a for a in APPS if a[1] != "101"])
+    assert card.select_anchor is None
+    click(card, "104", Qt.KeyboardModifier.ShiftModifier)
+    assert card.selected_ids == {"104"}
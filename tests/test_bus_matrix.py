@@ -0,0 +1,33 @@
+import pytest
+
+mixer = pytest.importorskip("testnewmixer", exc_type=ImportError)
+
+
+@pytest.fixture
+def matrix():
+    return mixer.BusMatrix(["Stream"], ["Game", "Chat"])
+
+
+def test_store_clamps_boosted_read_back(matrix):
+    matrix.set("Stream", "Game", gain=60)
+    assert matrix.store("Stream", "Game", 153, False)
+    assert matrix.get("Stream", "Game") == (100, False)
+    assert not matrix.store("Stream", "Game", 153, False)
+
+
+def test_store_reports_only_real_changes(matrix):
+    assert not matrix.store("Stream", "Game", 100, False)
+    assert matrix.store("Stream", "Game", 40, True)
+    assert not matrix.store("Stream", "Game", 40, True)
+    # A routed link read back at 0% stays routed
+    assert matrix.store("Stream", "Game", 0, True)
+    assert matrix.get("Stream", "Game") == (1, True)
+    assert not matrix.store("Stream", "Game", 0, True)
+
+
+def test_store_leaves_unrouted_cells_alone(matrix):
+    matrix.set("Stream", "Chat", gain=0)
+    assert not matrix.store("Stream", "Chat", 0, False)
+    assert not matrix.store("Stream", "Chat", 80, False)
+    assert matrix.get("Stream", "Chat") == (0, False)
+    assert not matrix.store("Stream", "Chat", None, None)
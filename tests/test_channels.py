@@ -0,0 +1,20 @@
+import json
+
+import pytest
+
+mixer = pytest.importorskip("testnewmixer", exc_type=ImportError)
+
+
+def test_reserved_channel_names_are_skipped(tmp_path, monkeypatch, capsys):
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"channels": [
+        {"name": "Game"},
+        {"name": "Accent", "color": "#000000"},
+        {"name": "Card"},
+        {"label": "Voice Chat", "color": "#123456"},
+    ]}))
+    monkeypatch.setattr(mixer, "CONFIG_FILE", str(config))
+    defs = mixer.load_channel_defs()
+    assert [d["name"] for d in defs] == ["Game", "VoiceChat"]
+    assert "'Accent' skipped" in capsys.readouterr().out
+    assert defs[1]["color"] == "#123456"
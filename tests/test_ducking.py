@@ -0,0 +1,41 @@
+import math
+import time
+
+import pytest
+
+mixer = pytest.importorskip("testnewmixer", exc_type=ImportError)
+
+
+def test_duck_percent_is_cubic():
+    gain = 10 ** (-12 / 20)
+    percent = mixer.duck_percent(100, gain)
+    assert percent == pytest.approx(63.1, abs=0.1)
+    # pactl maps percent to amplitude as (percent / 100) ** 3
+    assert 20 * math.log10((percent / 100) ** 3) == pytest.approx(-12)
+
+
+def test_duck_percent_scales_stream_volume():
+    gain = 10 ** (-12 / 20)
+    assert mixer.duck_percent(50, gain) == pytest.approx(50 * gain ** (1 / 3))
+    assert mixer.duck_percent(80, 1.0) == 80
+
+
+def test_stop_joins_followers_before_restoring_gain(fake_parec):
+    gains = []
+    settings = dict(mixer.DUCK_DEFAULTS, attack_ms=1)
+    ducker = mixer.Ducker(settings, gains.append)
+    assert ducker.start(["chat.monitor"])
+    deadline = time.monotonic() + 5
+    while not (gains and gains[-1] < 0.5) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert gains and gains[-1] < 0.5
+    followers = list(ducker.followers)
+    ducker.stop()
+    assert gains[-1] == 1.0
+    for follower in followers:
+        assert not follower.is_alive()
+        assert follower.proc.returncode is not None
+    # Nothing arrives after the gain was restored
+    count = len(gains)
+    time.sleep(0.1)
+    assert len(gains) == count
@@ -0,0 +1,16 @@
+import pytest
+
+mixer = pytest.importorskip("testnewmixer", exc_type=ImportError)
+
+
+def test_level_gauge_is_described_as_rms():
+    state = {"channels": {}, "levels": {"Chat": -23.04}}
+    text = mixer.Metrics(lambda: state).render()
+    assert "# HELP mux_channel_level_dbfs Last 10 ms RMS level of each channel that triggers ducking" in text
+    assert 'mux_channel_level_dbfs{channel="Chat"} -23.0' in text
+    assert "peak" not in text
+
+
+def test_level_gauge_is_left_out_without_triggers():
+    text = mixer.Metrics(lambda: {"channels": {}, "levels": {}}).render()
+    assert "mux_channel_level_dbfs" not in text
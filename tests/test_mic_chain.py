@@ -0,0 +1,45 @@
+import copy
+
+import pytest
+
+mixer = pytest.importorskip("testnewmixer", exc_type=ImportError)
+
+
+@pytest.fixture
+def chain():
+    chain = mixer.MicChain(copy.deepcopy(mixer.MIC_CHAIN_DEFAULTS))
+    # Pretend every LADSPA plugin is installed
+    chain.stages = list(mixer.MIC_CHAIN_STAGES)
+    return chain
+
+
+def test_disabled_suppression_leaves_the_graph(chain):
+    assert "name = suppression" in chain.render_config()
+    chain.update("suppression", "enabled", False)
+    config = chain.render_config()
+    assert "name = suppression" not in config
+    assert '{ output = "gate:Output" input = "compressor:Input" }' in config
+
+
+def test_report_counts_only_stages_in_the_graph(chain):
+    assert chain.report()["latency_ms"] == pytest.approx(10.0)
+    chain.update("suppression", "enabled", False)
+    report = chain.report()
+    suppression = next(st for st in report["stages"] if st["stage"] == "suppression")
+    assert not suppression["in_graph"]
+    assert report["latency_ms"] == 0.0
+    # Bypassable stages stay in the graph when switched off
+    chain.update("gate", "enabled", False)
+    gate = next(st for st in chain.report()["stages"] if st["stage"] == "gate")
+    assert gate["in_graph"] and not gate["enabled"]
+
+
+def test_structural_toggle_asks_for_a_rebuild(chain, monkeypatch):
+    stopped = []
+    monkeypatch.setattr(chain, "running", lambda: True)
+    monkeypatch.setattr(chain, "stop", lambda: stopped.append(True))
+    monkeypatch.setattr(chain, "set_controls", lambda controls: True)
+    assert chain.update("gate", "enabled", False) is False
+    assert chain.update("suppression", "vad_threshold", 30) is False
+    assert chain.update("suppression", "enabled", False) is True
+    assert stopped == [True]
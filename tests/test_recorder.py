@@ -0,0 +1,60 @@
+import threading
+import time
+import wave
+
+import pytest
+
+mixer = pytest.importorskip("testnewmixer", exc_type=ImportError)
+
+
+@pytest.fixture(autouse=True)
+def quick_start(monkeypatch):
+    monkeypatch.setattr(mixer, "REC_START_TIMEOUT", 0.5)
+
+
+def record(tmp_path, sources, seconds):
+    recorder = mixer.Recorder()
+    assert recorder.start(sources, str(tmp_path / "take"), "wav")
+    time.sleep(seconds)
+    reports = []
+    finished = threading.Event()
+    def done(report):
+        reports.append(report)
+        finished.set()
+    started = time.monotonic()
+    assert recorder.stop(done)
+    # stop() only signals; the files are finished in the background
+    assert time.monotonic() - started < 0.1
+    assert not recorder.recording()
+    assert finished.wait(5)
+    assert not recorder.finishing()
+    return reports[0]
+
+
+def test_dead_source_is_reported_not_recorded(tmp_path, fake_parec):
+    report = record(tmp_path, [("Game", "game.monitor"), ("Mic", "dead")], 1.5)
+    assert report["failed"] == {"Mic": "no audio"}
+    assert report["seconds"] > 0.5
+    assert not (tmp_path / "take" / "Mic.wav").exists()
+    with wave.open(str(tmp_path / "take" / "Game.wav")) as wav:
+        assert wav.getnframes() == int(report["seconds"] * mixer.REC_RATE)
+
+
+def test_healthy_tracks_share_one_length(tmp_path, fake_parec):
+    report = record(tmp_path, [("Game", "game.monitor"), ("Chat", "chat.monitor")], 1.0)
+    assert report["failed"] == {}
+    lengths = set()
+    for name in ("Game", "Chat"):
+        with wave.open(str(tmp_path / "take" / f"{name}.wav")) as wav:
+            lengths.add(wav.getnframes())
+    assert lengths == {int(report["seconds"] * mixer.REC_RATE)}
+    assert report["seconds"] > 0.5
+
+
+def test_readers_are_reaped(tmp_path, fake_parec):
+    recorder = mixer.Recorder()
+    recorder.start([("Game", "game.monitor")], str(tmp_path / "take"), "wav")
+    time.sleep(0.5)
+    tracks = list(recorder.tracks)
+    recorder.stop(timeout=5)
+    assert tracks[0].proc.returncode is not None
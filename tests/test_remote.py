@@ -0,0 +1,215 @@
+import json
+import os
+import queue
+import socket
+import time
+import urllib.parse
+
+import pytest
+
+mixer = pytest.importorskip("testnewmixer", exc_type=ImportError)
+
+# The handshake example from RFC 6455
+RFC_KEY = "dGhlIHNhbXBsZSBub25jZQ=="
+RFC_ACCEPT = "s3pPLMBiTxaQ9kYGzzhZRbK+xOo="
+
+
+class Remote:
+    # A real ControlServer and plain-socket local clients
+    def __init__(self):
+        self.store = mixer.StateStore(["Ch0", "Ch1"])
+        self.commands = queue.Queue()
+        self.server = mixer.ControlServer(self.store, self.commands.put)
+        self.store.subscribe(self.server.publish)
+        self.socks = []
+
+    def start(self, settings=None):
+        host, _, token = mixer.remote_bind(dict(settings or {"host": "127.0.0.1"}))
+        assert self.server.start(host, 0, token)
+        return self.server.server.sockets[0].getsockname()[1], token
+
+    def connect(self, port, path="/"):
+        sock = socket.create_connection(("127.0.0.1", port), timeout=2)
+        self.socks.append(sock)
+        sock.sendall(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nUpgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Key: {RFC_KEY}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode())
+        head = b""
+        while not head.endswith(b"\r\n\r\n"):
+            byte = sock.recv(1)
+            if not byte:
+                break
+            head += byte
+        return sock, head.decode("latin-1")
+
+    def close(self):
+        for sock in self.socks:
+            sock.close()
+        self.server.stop()
+
+
+@pytest.fixture
+def remote():
+    remote = Remote()
+    yield remote
+    remote.close()
+
+
+def recv_exact(sock, n):
+    data = b""
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def read_frame(sock):
+    # (opcode, payload) from the server, or None once it hung up
+    try:
+        head = recv_exact(sock, 2)
+        if head is None:
+            return None
+        assert not head[1] & 0x80, "server frames must not be masked"
+        length = head[1] & 0x7F
+        if length == 126:
+            length = int.from_bytes(recv_exact(sock, 2), "big")
+        elif length == 127:
+            length = int.from_bytes(recv_exact(sock, 8), "big")
+        return head[0] & 0x0F, recv_exact(sock, length)
+    except ConnectionError:
+        return None
+
+
+def read_message(sock, kind):
+    while True:
+        frame = read_frame(sock)
+        assert frame is not None
+        if frame[0] == 1:
+            message = json.loads(frame[1])
+            if message.get("type") == kind:
+                return message
+
+
+def read_close(sock):
+    frame = read_frame(sock)
+    while frame is not None and frame[0] != 8:
+        frame = read_frame(sock)
+    return frame
+
+
+def fragment(payload, opcode, fin):
+    # A masked client frame with FIN under our control
+    key = os.urandom(4)
+    head = bytes([(0x80 if fin else 0) | opcode, 0x80 | len(payload)])
+    return head + key + bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 2
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_handshake_accept_and_snapshot(remote):
+    port, _ = remote.start()
+    sock, head = remote.connect(port)
+    assert head.startswith("HTTP/1.1 101 ")
+    assert f"Sec-WebSocket-Accept: {RFC_ACCEPT}\r\n" in head
+    snapshot = read_message(sock, "snapshot")
+    assert set(snapshot["channels"]) == {"Ch0", "Ch1"}
+
+
+def test_not_a_websocket_is_refused(remote):
+    port, _ = remote.start()
+    sock = socket.create_connection(("127.0.0.1", port), timeout=2)
+    remote.socks.append(sock)
+    sock.sendall(b"GET / HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n")
+    assert sock.recv(64).startswith(b"HTTP/1.1 400 ")
+
+
+def test_store_changes_arrive_as_diffs(remote):
+    port, _ = remote.start()
+    sock, _ = remote.connect(port)
+    read_message(sock, "snapshot")
+    remote.store.update("Ch1", volume=42)
+    assert read_message(sock, "diff")["channels"] == {"Ch1": {"volume": 42}}
+
+
+def test_commands_are_dispatched(remote):
+    port, _ = remote.start()
+    sock, _ = remote.connect(port)
+    read_message(sock, "snapshot")
+    sock.sendall(mixer.ws_frame(b"not json", mask=True))
+    sock.sendall(mixer.ws_frame(b'["cmd"]', mask=True))
+    sock.sendall(mixer.ws_frame(json.dumps({"cmd": "toggle_mute", "channel": "Ch0"}).encode(), mask=True))
+    assert remote.commands.get(timeout=2) == {"cmd": "toggle_mute", "channel": "Ch0"}
+    assert remote.commands.empty()
+
+
+def test_fragmented_command_is_joined(remote):
+    port, _ = remote.start()
+    sock, _ = remote.connect(port)
+    read_message(sock, "snapshot")
+    text = json.dumps({"cmd": "toggle_mute", "channel": "Ch1"}).encode()
+    sock.sendall(fragment(text[:10], 1, False))
+    # A ping between fragments is answered without losing the message
+    sock.sendall(fragment(b"mid", 9, True))
+    sock.sendall(fragment(text[10:20], 0, False))
+    sock.sendall(fragment(text[20:], 0, True))
+    assert read_frame(sock) == (10, b"mid")
+    assert remote.commands.get(timeout=2) == {"cmd": "toggle_mute", "channel": "Ch1"}
+
+
+def test_stray_continuation_closes_with_protocol_error(remote):
+    port, _ = remote.start()
+    sock, _ = remote.connect(port)
+    read_message(sock, "snapshot")
+    sock.sendall(fragment(b"{}", 0, True))
+    assert read_close(sock) == (8, (1002).to_bytes(2, "big"))
+    wait_for(lambda: not remote.server.clients)
+
+
+def test_ping_gets_pong(remote):
+    port, _ = remote.start()
+    sock, _ = remote.connect(port)
+    read_message(sock, "snapshot")
+    sock.sendall(mixer.ws_frame(b"hi", 9, mask=True))
+    assert read_frame(sock) == (10, b"hi")
+
+
+def test_unmasked_client_frame_drops_the_client(remote):
+    port, _ = remote.start()
+    sock, _ = remote.connect(port)
+    read_message(sock, "snapshot")
+    sock.sendall(mixer.ws_frame(json.dumps({"cmd": "toggle_mute", "channel": "Ch0"}).encode()))
+    assert read_close(sock) == (8, (1002).to_bytes(2, "big"))
+    assert read_frame(sock) is None
+    wait_for(lambda: not remote.server.clients)
+    assert remote.commands.empty()
+
+
+def test_close_is_echoed_and_client_removed(remote):
+    port, _ = remote.start()
+    sock, _ = remote.connect(port)
+    read_message(sock, "snapshot")
+    assert len(remote.server.clients) == 1
+    sock.sendall(mixer.ws_frame((1000).to_bytes(2, "big"), 8, mask=True))
+    assert read_close(sock) == (8, (1000).to_bytes(2, "big"))
+    assert read_frame(sock) is None
+    wait_for(lambda: not remote.server.clients)
+
+
+def test_lan_bind_requires_token(remote):
+    settings = {"host": "0.0.0.0", "token": ""}
+    _, _, token = mixer.remote_bind(settings)
+    assert token
+    assert settings["token"] == token
+    assert mixer.remote_bind({"host": "127.0.0.1"})[2] == ""
+    port, token = remote.start({"host": "0.0.0.0", "token": token})
+    for path in ("/", "/?token=", "/?token=wrong", f"/?x={token}"):
+        _, head = remote.connect(port, path)
+        assert head.startswith("HTTP/1.1 403 "), path
+    assert not remote.server.clients
+    _, head = remote.connect(port, f"/?token={urllib.parse.quote(token)}")
+    assert head.startswith("HTTP/1.1 101 ")
@@ -0,0 +1,54 @@
+import threading
+import time
+
+import pytest
+
+mixer = pytest.importorskip("testnewmixer", exc_type=ImportError)
+
+
+def test_versions_are_delivered_in_order():
+    store = mixer.StateStore(["Game", "Chat"])
+    delivered = []
+    first = threading.Event()
+    def subscriber(version, changes, origin):
+        if version == 1:
+            first.set()
+            # Hold the first delivery open while another thread publishes
+            time.sleep(0.1)
+        delivered.append(version)
+    store.subscribe(subscriber)
+    writer = threading.Thread(target=store.update, args=("Game",), kwargs={"volume": 10})
+    writer.start()
+    assert first.wait(2)
+    store.update("Chat", volume=20)
+    writer.join(2)
+    assert delivered == [1, 2]
+
+
+def test_state_lock_is_free_during_delivery():
+    store = mixer.StateStore(["Game", "Chat"])
+    in_subscriber = threading.Event()
+    release = threading.Event()
+    def subscriber(version, changes, origin):
+        in_subscriber.set()
+        release.wait(2)
+    store.subscribe(subscriber)
+    writer = threading.Thread(target=store.update, args=("Game",), kwargs={"volume": 10})
+    writer.start()
+    assert in_subscriber.wait(2)
+    # Another thread can still read and write state meanwhile
+    assert store.lock.acquire(timeout=1)
+    store.lock.release()
+    release.set()
+    writer.join(2)
+
+
+def test_read_back_keeps_newer_user_writes():
+    store = mixer.StateStore(["Game"])
+    since = store.seq
+    store.update("Game", volume=40)
+    changed = store.update("Game", origin="sync", since=since, volume=70, muted=True)
+    assert changed == {"muted"}
+    assert store.channels["Game"].volume == 40
+    # The next sync starts after that write and may update it
+    assert store.update("Game", origin="sync", since=store.seq, volume=70) == {"volume"}
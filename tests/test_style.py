@@ -0,0 +1,43 @@
+import pytest
+
+mixer = pytest.importorskip("testnewmixer", exc_type=ImportError)
+from PyQt6.QtWidgets import QApplication, QPushButton
+
+
+@pytest.fixture
+def app():
+    app = QApplication.instance() or QApplication([])
+    app.setStyleSheet(mixer.compile_stylesheet())
+    yield app
+    app.setStyleSheet("")
+
+
+def centre(widget):
+    image = widget.grab().toImage()
+    return image.pixelColor(image.width() // 2, image.height() // 2).name()
+
+
+def test_property_flip_restyles_the_widget(app):
+    btn = QPushButton()
+    btn.setObjectName("MuteButton")
+    btn.setProperty("tone", "Accent")
+    btn.resize(60, 40)
+    btn.show()
+    app.processEvents()
+    unmuted = centre(btn)
+    mixer.set_style_state(btn, "muted", True)
+    assert centre(btn) == mixer.THEME["Muted"].lower()
+    mixer.set_style_state(btn, "muted", False)
+    assert centre(btn) == unmuted
+    btn.close()
+
+
+def test_unchanged_state_skips_polish(app, monkeypatch):
+    btn = QPushButton()
+    mixer.set_style_state(btn, "lit", "rec")
+    polished = []
+    monkeypatch.setattr(btn, "style", lambda: polished.append(btn) or QApplication.style())
+    mixer.set_style_state(btn, "lit", "rec")
+    assert polished == []
+    mixer.set_style_state(btn, "lit", "")
+    assert polished == [btn]
@@ -0,0 +1,35 @@
+import threading
+
+import pytest
+
+mixer = pytest.importorskip("testnewmixer", exc_type=ImportError)
+
+
+def run_watcher(app, win, lines):
+    win.backend = type("Backend", (), {"events": lambda self: iter(lines)})()
+    seen = []
+    win.signaler.server_events.connect(seen.append)
+    thread = threading.Thread(target=win.watch_server_events)
+    thread.start()
+    thread.join(2)
+    app.processEvents()
+    return seen
+
+
+def test_dead_subscription_keeps_polling_fast(win):
+    app, win, _ = win
+    seen = run_watcher(app, win, [])
+    assert seen == []
+    assert not win.events_available
+    assert win.sync_scheduler.slow_ms == mixer.SYNC_SLOW_MS
+
+
+def test_idle_interval_only_after_an_event(win):
+    app, win, _ = win
+    seen = run_watcher(app, win, ["Event 'change' on sink-input #12"])
+    # The subscription delivered, then ended: idle, then back to polling
+    assert seen == [True, False]
+    assert win.sync_scheduler.slow_ms == mixer.SYNC_SLOW_MS
+    win._on_server_events(True)
+    assert win.events_available
+    assert win.sync_scheduler.slow_ms == mixer.SYNC_IDLE_MS